@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Measures how fast StandardClient sends a chunked upload body of unknown
+length, such as an encrypted upload, with _send_chunked, which uses
+MSG_MORE over plain HTTP where it can, against _send_framed, which
+frames each chunk into one string as HTTPS uploads still do.
+
+The body is sent over loopback to a thread that discards it, laid out
+like the output of swiftly.dencrypt.aes_encrypt: a one byte preamble,
+a 16 byte IV, then chunk_size chunks. The chunks are made up front so
+only the sending is measured, not the encryption; pass --encrypt to
+measure real encrypted uploads instead.
+
+Example::
+
+    python bench/chunked_upload.py --size 1024 --runs 9
+
+Where MSG_MORE is not supported, both send the same way.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import optparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from swiftly.client import standardclient
+from swiftly.client.timeouts import Timeouts
+from swiftly.dencrypt import AES256CBC, AES256CBC_Support, aes_encrypt
+
+
+class _Body(object):
+    # A body of size bytes read as chunk_size chunks, each the same
+    # string, as an encrypted upload would be read.
+
+    def __init__(self, size, chunk_size):
+        self.head = AES256CBC + os.urandom(16)
+        self.chunk = os.urandom(chunk_size)
+        self.left = size
+
+    def read(self, size=-1):
+        if self.head:
+            head, self.head = self.head, None
+            return head
+        if self.left <= 0:
+            return ''
+        self.left -= len(self.chunk)
+        return self.chunk
+
+
+class _Encrypted(object):
+    # A body of size bytes encrypted as it is read.
+
+    def __init__(self, size, chunk_size):
+        self.iterator = aes_encrypt(
+            'benchmark', open('/dev/zero', 'rb'), preamble=AES256CBC,
+            chunk_size=chunk_size, content_length=size)
+
+    def read(self, size=-1):
+        return next(self.iterator, '')
+
+
+class _Conn(object):
+    # Just enough of an HTTPConnection for StandardClient._send_chunked.
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+
+def _discard(listener, counts):
+    sock = listener.accept()[0]
+    total = 0
+    buf = bytearray(1024 * 1024)
+    size = sock.recv_into(buf)
+    while size:
+        total += size
+        size = sock.recv_into(buf)
+    sock.close()
+    counts.append(total)
+
+
+def _run(send, body):
+    # Returns the (wall seconds, cpu seconds, bytes sent) of sending the
+    # body once.
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    counts = []
+    thread = threading.Thread(target=_discard, args=(listener, counts))
+    thread.start()
+    sock = socket.create_connection(listener.getsockname())
+    start_times = os.times()
+    start = time.time()
+    send(_Conn(sock), body, Timeouts().start())
+    sock.shutdown(socket.SHUT_WR)
+    thread.join()
+    elapsed = time.time() - start
+    end_times = os.times()
+    sock.close()
+    listener.close()
+    # The discarding thread's CPU is included, the same for both ways.
+    cpu = (end_times[0] - start_times[0]) + (end_times[1] - start_times[1])
+    return elapsed, cpu, counts[0]
+
+
+def main(args):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option(
+        '--size', type='int', default=1024,
+        help='The MiB to send in each run. Default: 1024')
+    parser.add_option(
+        '--chunk-size', type='int', default=65536,
+        help='The bytes in each chunk. Default: 65536')
+    parser.add_option(
+        '--runs', type='int', default=9,
+        help='The runs of each way to take the median of. Default: 9')
+    parser.add_option(
+        '--encrypt', action='store_true',
+        help='Encrypts the body as it is sent, as a real encrypted upload '
+             'would be.')
+    options, args = parser.parse_args(args)
+    if options.encrypt and not AES256CBC_Support:
+        parser.error('--encrypt needs pycrypto installed')
+    if not standardclient.MSG_MORE:
+        print 'MSG_MORE is not supported here; both send the same way.'
+    size = options.size * 1024 * 1024
+    source = _Encrypted if options.encrypt else _Body
+    client = standardclient.StandardClient(
+        auth_url='http://127.0.0.1/', chunk_size=options.chunk_size)
+    results = {}
+    for name, send in (('framed', client._send_framed),
+                       ('chunked', client._send_chunked)):
+        runs = sorted(
+            _run(send, source(size, options.chunk_size))
+            for _ in xrange(options.runs))
+        elapsed, cpu, sent = runs[len(runs) // 2]
+        results[name] = (sent / elapsed, cpu * (1 << 30) / sent)
+        print '%-8s %8.1f MB/s %8.3f cpu s/GiB' % (
+            name, results[name][0] / 1e6, results[name][1])
+    print 'gain     %+7.1f%% MB/s %+7.1f%% cpu s/GiB' % (
+        (results['chunked'][0] / results['framed'][0] - 1) * 100,
+        (results['chunked'][1] / results['framed'][1] - 1) * 100)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
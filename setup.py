@@ -23,4 +23,6 @@ setup(
     author='Gregory Holt', author_email='swiftly@brim.net',
     url='http://gholt.github.com/swiftly/',
     packages=['swiftly', 'swiftly.cli', 'swiftly.client'],
+    extras_require={'sendfile': ['pysendfile']},
+    test_suite='tests',
     scripts=['bin/swiftly'])
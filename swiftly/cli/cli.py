@@ -22,15 +22,21 @@ import os
 import sys
 import tempfile
 import textwrap
+import threading
 import time
 import traceback
 
 from swiftly import VERSION
+from swiftly.concurrency import AIMDController, BACKENDS, \
+    ConcurrencyBudget, Spread, default_backend
 from swiftly.cli.context import CLIContext
 from swiftly.cli.iomanager import IOManager
 from swiftly.cli.optionparser import OptionParser
-from swiftly.client import ClientManager, DirectClient, LocalClient, \
-    StandardClient
+from swiftly.client import AuthStore, ClientManager, DirectClient, \
+    EndpointPool, HedgePolicy, LocalClient, ReplicaPolicy, RetryBudget, \
+    RetryPolicy, StandardClient, Timeouts
+from swiftly.client.replicas import node_key
+from swiftly.client.retry import DEFAULT_RETRY_RULES, parse_retry_rules
 
 
 #: The list of CLICommand classes avaiable to CLI. You'll want to add any new
@@ -54,6 +60,15 @@ TRUE_VALUES = ['1', 'on', 't', 'true', 'y', 'yes']
 """A list of lowercase string values that equate to True."""
 
 
+def _device_keys(get_object_nodes, path):
+    # Returns the devices holding the object at the container/object
+    # path, for spreading bulk work across them.
+    container, _junk, obj = path.lstrip('/').partition('/')
+    if not obj:
+        return []
+    return [node_key(node) for node in get_object_nodes(container, obj)]
+
+
 class CLI(object):
 
     """
@@ -84,6 +99,20 @@ class CLI(object):
         #: client_manager  The :py:class:`swiftly.client.manager.ClientManager`
         #:                 to use for obtaining clients.
         #: concurrency     Number of concurrent actions to allow.
+        #: concurrency_backend
+        #:                 The name of the
+        #:                 :py:class:`swiftly.concurrency.Concurrency`
+        #:                 backend to use.
+        #: concurrency_budget
+        #:                 The
+        #:                 :py:class:`swiftly.concurrency.ConcurrencyBudget`
+        #:                 shared by all Concurrency instances, limiting the
+        #:                 total number of concurrent actions.
+        #: concurrency_controller
+        #:                 The
+        #:                 :py:class:`swiftly.concurrency.AIMDController`
+        #:                 adjusting the concurrency_budget, if
+        #:                 --adaptive-concurrency is in use.
         #: io_manager      The :py:class:`swiftly.cli.iomanager.IOManager` to
         #:                 use for input and output.
         #: eventlet        True if Eventlet is in use.
@@ -96,6 +125,8 @@ class CLI(object):
         #: ==============  ====================================================
         self.context = CLIContext()
         self.context.verbose = None
+        self._shared_client_manager = False
+        self._endpoint_pool = None
         self.context.io_manager = IOManager()
 
         #: A dictionary of the available commands and their CLICommand
@@ -158,7 +189,17 @@ configuration file variables.
                  'best order will try to be determined for you; but if you '
                  'notice it keeps making useless auth attempts and that '
                  'drives you crazy, you can override that here. All the '
-                 'available auth methods are listed in the example.')
+                 'available auth methods are listed in the example. Without '
+                 'this, the method that last succeeded, as remembered in the '
+                 'auth cache, is tried first.')
+        self.option_parser.add_option(
+            '--auth-race', dest='auth_race', action='store_true',
+            help='Tries all the auth methods at once and uses the first to '
+                 'succeed, rather than trying them one after another.')
+        self.option_parser.add_option(
+            '--no-auth-race', dest='no_auth_race', action='store_true',
+            help='Disables the above auth-race value if it had been set '
+                 'true in the environment or configuration file.')
         self.option_parser.add_option(
             '--region', dest='region', metavar='VALUE',
             help='Region to use, if supported by auth, example: DFW Default: '
@@ -189,12 +230,40 @@ configuration file variables.
             '-R', '--retries', dest='retries', metavar='INTEGER',
             help='Indicates how many times to retry the request on a server '
                  'error. Default: 4')
+        self.option_parser.add_option(
+            '--retry-backoff', dest='retry_backoff', metavar='SECONDS',
+            help='Sets the shortest wait before retrying a request. Each '
+                 'further wait is a random time up to three times the one '
+                 'before, so that requests failing together do not all retry '
+                 'together. A Retry-After header in the response lengthens '
+                 'the wait to match. Default: 1')
+        self.option_parser.add_option(
+            '--retry-max-backoff', dest='retry_max_backoff',
+            metavar='SECONDS',
+            help='Sets the longest wait before retrying a request, even if a '
+                 'Retry-After header asks for more. Default: 60')
+        self.option_parser.add_option(
+            '--retry-budget', dest='retry_budget', metavar='RATIO',
+            help='Limits the retries the command makes, beyond its first 10, '
+                 'to this fraction of its requests. Once spent, failed '
+                 'requests are not retried, so a failing cluster is not '
+                 'flooded with retries. Default: 0.2')
+        self.option_parser.add_option(
+            '--retry-rules', dest='retry_rules',
+            metavar='STATUS:FACTOR[,...]',
+            help='Sets which response statuses are retried and a factor for '
+                 'the backoff of each. A status may be exact, such as 503, or '
+                 'a class, such as 5xx; 0 means no response was received. A '
+                 'factor of 0 disables retrying that status. Default: '
+                 '0:1,5xx:1,429:4,498:4')
         self.option_parser.add_option(
             '-C', '--cache-auth', dest='cache_auth', action='store_true',
             help='If set true, the storage URL and auth token are cached in '
                  'your OS temporary directory as <user>.swiftly for reuse. If '
                  'there are already cached values, they are used without '
-                 'authenticating first.')
+                 'authenticating first. Concurrent swiftly processes take '
+                 'turns to authenticate and share the tokens obtained until '
+                 'they expire.')
         self.option_parser.add_option(
             '--no-cache-auth', dest='no_cache_auth', action='store_true',
             help='Disables the above cache-auth value if it had been set '
@@ -209,14 +278,114 @@ configuration file variables.
         self.option_parser.add_option(
             '--concurrency', dest='concurrency', metavar='INTEGER',
             help='Sets the the number of actions that can be done '
-                 'simultaneously when possible (currently requires using '
-                 'Eventlet too). Default: 1 Note that some nested actions may '
-                 'amplify the number of concurrent actions. For instance, a '
-                 'put of an entire directory will use up to this number of '
-                 'concurrent actions. A put of a segmented object will use up '
-                 'to this number of concurrent actions. But, if a directory '
-                 'structure put is uploading segmented objects, this nesting '
-                 'could cause up to INTEGER * INTEGER concurrent actions.')
+                 'simultaneously when possible. Default: 1 This is a limit on '
+                 'the total, even for nested actions. For instance, if a '
+                 'directory structure put is uploading segmented objects, the '
+                 'files and their segments will share this one limit.')
+        self.option_parser.add_option(
+            '--concurrency-backend', dest='concurrency_backend',
+            metavar='NAME',
+            help='Sets how concurrent actions are run: eventlet (green '
+                 'threads), threads (operating system threads), or serial '
+                 '(one at a time, regardless of --concurrency). The threads '
+                 'backend is useful where Eventlet is not installed or cannot '
+                 'be used; it also disables Eventlet for all other uses. '
+                 'Default: eventlet if Eventlet is in use; threads otherwise.')
+        self.option_parser.add_option(
+            '--adaptive-concurrency', dest='adaptive_concurrency',
+            action='store_true',
+            help='Adjusts the number of concurrent actions while running, up '
+                 'to the --concurrency value. Concurrency starts at a quarter '
+                 'of that value, rises by one while throughput grows and '
+                 'latency holds steady, and is halved whenever the cluster '
+                 'responds with 429, 498, or 503 or a request fails to get a '
+                 'response.')
+        self.option_parser.add_option(
+            '--no-adaptive-concurrency', dest='no_adaptive_concurrency',
+            action='store_true',
+            help='Disables the above adaptive-concurrency value if it had '
+                 'been set true in the environment or configuration file.')
+        self.option_parser.add_option(
+            '--pool-size', dest='pool_size', metavar='INTEGER',
+            help='Sets the most clients, and so connections, that may be in '
+                 'use at once. Actions beyond this wait for a client to be '
+                 'free. Default: no limit.')
+        self.option_parser.add_option(
+            '--pool-timeout', dest='pool_timeout', metavar='SECONDS',
+            help='Sets how long an action will wait for a free client when '
+                 'the pool-size limit is reached before giving up. Default: '
+                 '60')
+        self.option_parser.add_option(
+            '--keepalive-timeout', dest='keepalive_timeout', metavar='SECONDS',
+            help='Sets how long a connection may sit idle and still be reused '
+                 'for the next request. Idle connections are checked before '
+                 'reuse, and a request that finds its reused connection '
+                 'closed by the server is retried on a new one without '
+                 'counting as a retry. 0 disables connection reuse. Default: '
+                 '30')
+        self.option_parser.add_option(
+            '--endpoints', dest='endpoints', metavar='HOST[:PORT][,...]',
+            help='Spreads storage connections across these Swift proxy '
+                 'endpoints instead of sending them all to the host in the '
+                 'storage URL, which is still sent as the Host header. Use '
+                 '"dns" to spread them across every address the storage '
+                 'URL\'s host name resolves to. Endpoints failing 3 requests '
+                 'in a row are left out for 30 seconds and then probed. With '
+                 'HTTPS, list host names the certificates are valid for.')
+        self.option_parser.add_option(
+            '--endpoint-selection', dest='endpoint_selection',
+            metavar='NAME',
+            help='Sets how the endpoint for each new connection is chosen: '
+                 'least-outstanding (fewest requests in progress) or ewma '
+                 '(lowest average response time). Default: '
+                 'least-outstanding')
+        self.option_parser.add_option(
+            '--hedge-percentile', dest='hedge_percentile', metavar='PERCENT',
+            help='Hedges object GETs: if a response has not started within '
+                 'this percentile of recent response times, the GET is sent '
+                 'again on a new connection, to another endpoint if '
+                 '--endpoints is in use, and the first to respond is used. '
+                 'With --direct, the proxy GETs from another replica instead, '
+                 'if supported. Example: 95 Default: no hedging.')
+        self.option_parser.add_option(
+            '--expect-continue', dest='expect_continue', metavar='BYTES',
+            help='Sends request bodies larger than BYTES, or of unknown '
+                 'length, with "Expect: 100-continue" so that the body is '
+                 'only sent once the server is ready for it. A PUT that is '
+                 'going to fail, such as for a missing container or an '
+                 'expired token, then fails without sending its body. '
+                 'Default: bodies are sent right after the headers.')
+        self.option_parser.add_option(
+            '--connect-timeout', dest='connect_timeout', metavar='SECONDS',
+            help='Sets how long to wait for a connection to be established. '
+                 '0 waits as long as the operating system does. Default: 10')
+        self.option_parser.add_option(
+            '--read-timeout', dest='read_timeout', metavar='SECONDS',
+            help='Sets how long any one read or write on a connection may '
+                 'wait, such as for the response to a request or the next '
+                 'part of a response body. 0 waits forever. Default: 300')
+        self.option_parser.add_option(
+            '--request-timeout', dest='request_timeout', metavar='SECONDS',
+            help='Sets how long a request may take, from sending it to '
+                 'reading the last of the response. Default: no limit.')
+        self.option_parser.add_option(
+            '--speed-limit', dest='speed_limit', metavar='BYTES',
+            help='Aborts a transfer that moves fewer than BYTES per second '
+                 'over --speed-time seconds. Requests that time out or are '
+                 'aborted are retried like those that got no response. '
+                 'Default: no limit.')
+        self.option_parser.add_option(
+            '--speed-time', dest='speed_time', metavar='SECONDS',
+            help='Sets the seconds over which --speed-limit is measured. '
+                 'Default: 30')
+        self.option_parser.add_option(
+            '--spool-memory', dest='spool_memory', metavar='BYTES',
+            help='Keeps a copy of request bodies that cannot seek, such as '
+                 'standard input, --sub-command output, or encrypted '
+                 'uploads, as they are sent, so that failed uploads can be '
+                 'retried instead of aborting. Up to BYTES are kept in memory '
+                 'and the rest in a temporary file. Default: such uploads '
+                 'are not retried.')
         self.option_parser.add_option(
             '--eventlet', dest='eventlet', action='store_true',
             help='Enables Eventlet, if installed. This is disabled by default '
@@ -243,6 +412,28 @@ configuration file variables.
                  'will enable direct client to use this ring for all the '
                  'queries. Use of this also requires the main Swift code  '
                  'is installed and importable.')
+        self.option_parser.add_option(
+            '--direct-replica-reads', dest='direct_replica_reads',
+            action='store_true',
+            help='With --direct, reads objects straight from the object '
+                 'servers holding their replicas, as found in the object '
+                 'ring, trying the fastest responding first and moving on to '
+                 'the others should one fail. Requests the replicas cannot '
+                 'answer, and all other requests, go through the Swift proxy '
+                 'code as usual.')
+        self.option_parser.add_option(
+            '--no-direct-replica-reads', dest='no_direct_replica_reads',
+            action='store_true',
+            help='Disables the above direct-replica-reads value if it had '
+                 'been set true in the environment or configuration file.')
+        self.option_parser.add_option(
+            '--device-spread', dest='device_spread', metavar='INTEGER',
+            help='With --direct, spreads the objects of bulk puts, get '
+                 '--all-objects, and delete --recursive across the disks of '
+                 'the cluster, as found in the object ring, running at most '
+                 'this many requests for objects on any one disk at once. '
+                 'Objects are taken out of listing order to keep every disk '
+                 'busy. Default: 0, objects are handled in listing order.')
 
         self.option_parser.raw_epilog = 'Commands:\n'
         for name in sorted(self.commands):
@@ -307,28 +498,63 @@ configuration file variables.
 
         for option_name in (
                 'auth_url', 'auth_user', 'auth_key', 'auth_tenant',
-                'auth_methods', 'region', 'direct', 'local', 'proxy', 'snet',
-                'no_snet', 'retries', 'cache_auth', 'no_cache_auth', 'cdn',
-                'no_cdn', 'concurrency', 'eventlet', 'no_eventlet', 'verbose',
-                'no_verbose', 'direct_object_ring'):
+                'auth_methods', 'auth_race', 'no_auth_race', 'region',
+                'direct', 'local', 'proxy', 'snet', 'no_snet', 'retries',
+                'retry_backoff', 'retry_max_backoff',
+                'retry_budget', 'retry_rules', 'cache_auth', 'no_cache_auth',
+                'cdn', 'no_cdn', 'concurrency', 'concurrency_backend',
+                'adaptive_concurrency', 'no_adaptive_concurrency', 'pool_size',
+                'pool_timeout', 'keepalive_timeout', 'endpoints',
+                'endpoint_selection', 'hedge_percentile', 'expect_continue',
+                'connect_timeout', 'read_timeout', 'request_timeout',
+                'speed_limit', 'speed_time', 'spool_memory', 'eventlet',
+                'no_eventlet', 'verbose', 'no_verbose',
+                'direct_object_ring', 'direct_replica_reads',
+                'no_direct_replica_reads', 'device_spread'):
             self._resolve_option(options, option_name, 'swiftly')
         for option_name in (
-                'snet', 'no_snet', 'cache_auth', 'no_cache_auth', 'cdn',
-                'no_cdn', 'eventlet', 'no_eventlet', 'verbose', 'no_verbose'):
+                'auth_race', 'no_auth_race', 'snet', 'no_snet', 'cache_auth',
+                'no_cache_auth', 'cdn', 'no_cdn', 'adaptive_concurrency',
+                'no_adaptive_concurrency', 'eventlet', 'no_eventlet',
+                'verbose', 'no_verbose', 'direct_replica_reads',
+                'no_direct_replica_reads'):
             if isinstance(getattr(options, option_name), basestring):
                 setattr(
                     options, option_name,
                     getattr(options, option_name).lower() in TRUE_VALUES)
-        for option_name in ('retries', 'concurrency'):
+        for option_name in (
+                'retries', 'concurrency', 'pool_size', 'expect_continue',
+                'spool_memory', 'device_spread'):
             if isinstance(getattr(options, option_name), basestring):
                 setattr(
                     options, option_name, int(getattr(options, option_name)))
+        for option_name in (
+                'retry_backoff', 'retry_max_backoff', 'retry_budget',
+                'pool_timeout', 'keepalive_timeout', 'hedge_percentile',
+                'connect_timeout', 'read_timeout', 'request_timeout',
+                'speed_limit', 'speed_time'):
+            if isinstance(getattr(options, option_name), basestring):
+                setattr(
+                    options, option_name,
+                    float(getattr(options, option_name)))
+        if options.auth_race is None:
+            options.auth_race = False
+        if options.no_auth_race:
+            options.auth_race = False
         if options.snet is None:
             options.snet = False
         if options.no_snet is None:
             options.no_snet = False
         if options.retries is None:
             options.retries = 4
+        if options.retry_backoff is None:
+            options.retry_backoff = 1
+        if options.retry_max_backoff is None:
+            options.retry_max_backoff = 60
+        if options.retry_budget is None:
+            options.retry_budget = 0.2
+        if options.retry_rules is None:
+            options.retry_rules = DEFAULT_RETRY_RULES
         if options.cache_auth is None:
             options.cache_auth = False
         if options.no_cache_auth is None:
@@ -339,6 +565,24 @@ configuration file variables.
             options.no_cdn = False
         if options.concurrency is None:
             options.concurrency = 1
+        if options.pool_timeout is None:
+            options.pool_timeout = 60
+        if options.keepalive_timeout is None:
+            options.keepalive_timeout = 30
+        if options.connect_timeout is None:
+            options.connect_timeout = 10
+        if options.read_timeout is None:
+            options.read_timeout = 300
+        if options.speed_time is None:
+            options.speed_time = 30
+        if options.direct_replica_reads is None:
+            options.direct_replica_reads = False
+        if options.no_direct_replica_reads:
+            options.direct_replica_reads = False
+        if options.adaptive_concurrency is None:
+            options.adaptive_concurrency = False
+        if options.no_adaptive_concurrency:
+            options.adaptive_concurrency = False
         if options.eventlet is None:
             options.eventlet = False
         if options.no_eventlet is None:
@@ -363,6 +607,29 @@ configuration file variables.
             except ImportError:
                 pass
 
+        self.context.concurrency_backend = options.concurrency_backend
+        if not self.context.concurrency_backend:
+            self.context.concurrency_backend = default_backend(
+                self.context.eventlet)
+        if self.context.concurrency_backend not in BACKENDS:
+            with self.context.io_manager.with_stderr() as fp:
+                fp.write(
+                    'Unknown concurrency backend %r; should be one of %s\n' %
+                    (self.context.concurrency_backend, ', '.join(BACKENDS)))
+                fp.flush()
+            return None, None
+        if self.context.concurrency_backend == 'eventlet' and \
+                not self.context.eventlet:
+            with self.context.io_manager.with_stderr() as fp:
+                fp.write(
+                    'The eventlet concurrency backend requires Eventlet to be '
+                    'installed and enabled.\n')
+                fp.flush()
+            return None, None
+        if self.context.concurrency_backend == 'threads':
+            self.context.eventlet = False
+            self.context.io_manager.lock_class = threading.RLock
+
         subprocess_module = None
         if self.context.eventlet:
             try:
@@ -381,18 +648,96 @@ configuration file variables.
             self.context.io_manager.verbose = functools.partial(
                 self._verbose, skip_sub_command=True)
 
+        self.context.concurrency = int(options.concurrency)
+        budget = self.context.concurrency_budget
+        if not budget or \
+                budget.backend != self.context.concurrency_backend:
+            limit = self.context.concurrency
+            if options.adaptive_concurrency:
+                limit = max(1, limit // 4)
+            self.context.concurrency_budget = ConcurrencyBudget(
+                limit, backend=self.context.concurrency_backend)
+            self.context.concurrency_controller = None
+        if options.adaptive_concurrency and \
+                not self.context.concurrency_controller:
+            self.context.concurrency_controller = AIMDController(
+                self.context.concurrency_budget,
+                maximum=self.context.concurrency, verbose=self._verbose)
+        response_callback = None
+        if self.context.concurrency_controller:
+            response_callback = self.context.concurrency_controller.observe
+
         options.retries = int(options.retries)
+        try:
+            retry_rules = parse_retry_rules(options.retry_rules)
+        except ValueError:
+            with self.context.io_manager.with_stderr() as fp:
+                fp.write('Invalid retry rules %r\n' % options.retry_rules)
+                fp.flush()
+            return None, None
+        retry_policy = RetryPolicy(
+            backoff=options.retry_backoff,
+            max_backoff=options.retry_max_backoff, rules=retry_rules,
+            budget=RetryBudget(ratio=options.retry_budget))
+        hedge = None
+        if options.hedge_percentile:
+            try:
+                hedge = HedgePolicy(options.hedge_percentile)
+            except ValueError as err:
+                with self.context.io_manager.with_stderr() as fp:
+                    fp.write('%s\n' % err)
+                    fp.flush()
+                return None, None
+        endpoint_pool = None
+        if options.endpoints:
+            endpoints = None
+            if options.endpoints.strip().lower() != 'dns':
+                endpoints = [
+                    e.strip() for e in options.endpoints.split(',')
+                    if e.strip()]
+            try:
+                endpoint_pool = EndpointPool(
+                    endpoints,
+                    selection=options.endpoint_selection or
+                    'least-outstanding',
+                    verbose=self._verbose)
+            except ValueError as err:
+                with self.context.io_manager.with_stderr() as fp:
+                    fp.write('%s\n' % err)
+                    fp.flush()
+                return None, None
+        pool_kwargs = {
+            'max_clients': options.pool_size,
+            'acquire_timeout': options.pool_timeout,
+            'backend': self.context.concurrency_backend}
         if args and args[0] == 'help':
             return options, args
+        elif self.context.client_manager:
+            # Shared from an outer CLI, such as by "for ... do", so its
+            # pooled clients and connections are reused.
+            self._shared_client_manager = True
         elif options.local:
             self.context.client_manager = ClientManager(
-                LocalClient, local_path=options.local, verbose=self._verbose)
+                LocalClient, local_path=options.local, verbose=self._verbose,
+                **pool_kwargs)
         elif options.direct:
             self.context.client_manager = ClientManager(
                 DirectClient, swift_proxy_storage_path=options.direct,
                 attempts=options.retries + 1, eventlet=self.context.eventlet,
                 verbose=self._verbose,
-                direct_object_ring=options.direct_object_ring)
+                direct_object_ring=options.direct_object_ring,
+                response_callback=response_callback,
+                retry_policy=retry_policy, hedge=hedge,
+                spool_memory=options.spool_memory,
+                replica_policy=ReplicaPolicy()
+                if options.direct_replica_reads else None,
+                **pool_kwargs)
+            if options.device_spread:
+                with self.context.client_manager.with_client() as client:
+                    get_object_nodes = client.get_object_nodes
+                self.context.device_spread = Spread(
+                    functools.partial(_device_keys, get_object_nodes),
+                    limit=options.device_spread)
         else:
             auth_cache_path = None
             if options.cache_auth:
@@ -408,13 +753,26 @@ configuration file variables.
                 StandardClient, auth_methods=options.auth_methods,
                 auth_url=options.auth_url, auth_tenant=options.auth_tenant,
                 auth_user=options.auth_user, auth_key=options.auth_key,
-                auth_cache_path=auth_cache_path, region=options.region,
+                auth_cache_path=auth_cache_path, auth_race=options.auth_race,
+                region=options.region,
                 snet=options.snet, attempts=options.retries + 1,
                 eventlet=self.context.eventlet, verbose=self._verbose,
-                http_proxy=options.proxy)
+                http_proxy=options.proxy, response_callback=response_callback,
+                auth_store=AuthStore(),
+                keepalive_timeout=options.keepalive_timeout,
+                retry_policy=retry_policy, endpoint_pool=endpoint_pool,
+                hedge=hedge, expect_continue=options.expect_continue,
+                timeouts=Timeouts(
+                    connect=options.connect_timeout or None,
+                    read=options.read_timeout or None,
+                    total=options.request_timeout or None,
+                    speed_limit=options.speed_limit or None,
+                    speed_time=options.speed_time),
+                spool_memory=options.spool_memory,
+                **pool_kwargs)
+            self._endpoint_pool = endpoint_pool
 
         self.context.cdn = options.cdn
-        self.context.concurrency = int(options.concurrency)
 
         return options, args
 
@@ -470,8 +828,29 @@ configuration file variables.
                     fp.write('\n')
                     fp.flush()
             return getattr(err, 'code', 1)
+        finally:
+            self._verbose_pool_stats()
         return 0
 
+    def _verbose_pool_stats(self):
+        manager = self.context.client_manager
+        if manager and not self._shared_client_manager:
+            self._verbose(
+                'Client pool: %s', ' '.join(
+                    '%s=%s' % item for item in sorted(manager.stats.items())))
+            conn_stats = manager.conn_stats()
+            if conn_stats:
+                self._verbose(
+                    'Connections: %s', ' '.join(
+                        '%s=%s' % item for item in sorted(conn_stats.items())))
+        if self._endpoint_pool and not self._shared_client_manager:
+            for netloc, requests, errors, latency in \
+                    self._endpoint_pool.stats():
+                self._verbose(
+                    'Endpoint %s: requests=%s errors=%s latency=%s', netloc,
+                    requests, errors,
+                    '-' if latency is None else '%.03f' % latency)
+
     def _verbose(self, msg, *args, **kwargs):
         if self.context.verbosity:
             skip_sub_command = kwargs.get('skip_sub_command', False)
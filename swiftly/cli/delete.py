@@ -3,17 +3,20 @@ Contains a CLICommand that can issue DELETE requests.
 
 Uses the following from :py:class:`swiftly.cli.context.CLIContext`:
 
-==============  =====================================================
-cdn             True if the CDN Management URL should be used instead
-                of the Storage URL.
-client_manager  For connecting to Swift.
-concurrency     The number of concurrent actions that can be
-                performed.
-headers         A dict of headers to send.
-ignore_404      True if 404s should be silently ignored.
-io_manager      For directing output.
-query           A dict of query parameters to send.
-==============  =====================================================
+===================  =====================================================
+cdn                  True if the CDN Management URL should be used instead
+                     of the Storage URL.
+client_manager       For connecting to Swift.
+concurrency          The number of concurrent actions that can be
+                     performed.
+concurrency_backend  The name of the Concurrency backend to use.
+concurrency_budget   The ConcurrencyBudget limiting the total number of
+                     concurrent actions, including nested ones.
+headers              A dict of headers to send.
+ignore_404           True if 404s should be silently ignored.
+io_manager           For directing output.
+query                A dict of query parameters to send.
+===================  =====================================================
 """
 """
 Copyright 2011-2013 Gregory Holt
@@ -63,20 +66,23 @@ def cli_empty_account(context, yes_empty_account=False, until_empty=False):
         with context.client_manager.with_client() as client:
             status, reason, headers, contents = client.get_account(
                 marker=marker, headers=context.headers, query=context.query,
-                cdn=context.cdn)
-        if status // 100 != 2:
-            if status == 404 and context.ignore_404:
-                return
-            raise ReturnCode('listing account: %s %s' % (status, reason))
-        if not contents:
+                cdn=context.cdn, stream=True)
+            if status // 100 != 2:
+                if hasattr(contents, 'read'):
+                    contents.read()
+                if status == 404 and context.ignore_404:
+                    return
+                raise ReturnCode('listing account: %s %s' % (status, reason))
+            # Only the names are kept from the streamed listing.
+            names = [item['name'] for item in contents]
+        if not names:
             if until_empty and marker:
                 marker = None
                 continue
             break
-        for item in contents:
-            cli_delete(
-                context, item['name'], context.headers, recursive=True)
-        marker = item['name']
+        for name in names:
+            cli_delete(context, name, context.headers, recursive=True)
+        marker = name
 
 
 def cli_empty_container(context, path, until_empty=False):
@@ -98,42 +104,51 @@ def cli_empty_container(context, path, until_empty=False):
     See :py:class:`CLIDelete` for more information.
     """
     path = path.rstrip('/').decode('utf8')
-    conc = Concurrency(context.concurrency)
 
-    def check_conc():
-        for (exc_type, exc_value, exc_tb, result) in \
-                conc.get_results().itervalues():
-            if exc_value:
-                with context.io_manager.with_stderr() as fp:
-                    fp.write(str(exc_value))
-                    fp.write('\n')
-                    fp.flush()
+    def report_error(ident, exc_type, exc_value, exc_tb, result):
+        if exc_value:
+            with context.io_manager.with_stderr() as fp:
+                fp.write(str(exc_value))
+                fp.write('\n')
+                fp.flush()
+
+    conc = Concurrency(
+        context.concurrency, callback=report_error,
+        backend=context.concurrency_backend,
+        budget=context.concurrency_budget, fail_fast=False)
+    if context.device_spread:
+        conc = context.device_spread.scheduler(conc)
 
     marker = None
     while True:
         with context.client_manager.with_client() as client:
             status, reason, headers, contents = client.get_container(
                 path, marker=marker, headers=context.headers,
-                query=context.query, cdn=context.cdn)
-        if status // 100 != 2:
-            if status == 404 and context.ignore_404:
-                return
-            raise ReturnCode(
-                'listing container %r: %s %s' % (path, status, reason))
-        if not contents:
+                query=context.query, cdn=context.cdn, stream=True)
+            if status // 100 != 2:
+                if hasattr(contents, 'read'):
+                    contents.read()
+                if status == 404 and context.ignore_404:
+                    return
+                raise ReturnCode(
+                    'listing container %r: %s %s' % (path, status, reason))
+            # Only the names are kept from the streamed listing.
+            names = [item['name'] for item in contents]
+        if not names:
             if until_empty and marker:
                 marker = None
                 continue
             break
-        for item in contents:
-            newpath = '%s/%s' % (path, item['name'])
+        if not marker:
+            context.client_manager.warm(min(context.concurrency, len(names)))
+        for name in names:
+            newpath = '%s/%s' % (path, name)
             new_context = context.copy()
             new_context.ignore_404 = True
-            check_conc()
+            conc.check()
             conc.spawn(newpath, cli_delete, new_context, newpath)
-        marker = item['name']
-        conc.join()
-        check_conc()
+        marker = name
+        conc.finish()
 
 
 def cli_delete(context, path, body=None, recursive=False,
@@ -10,6 +10,10 @@ cdn                      True if the CDN Management URL should be
 client_manager           For connecting to Swift.
 concurrency              The number of concurrent actions that can be
                          performed.
+concurrency_backend      The name of the Concurrency backend to use.
+concurrency_budget       The ConcurrencyBudget limiting the total
+                         number of concurrent actions, including
+                         nested ones.
 headers                  A dict of headers to send.
 ignore_404               True if 404s should be silently ignored.
 io_manager               For directing output.
@@ -64,7 +68,14 @@ def _cli_call(context, name, args):
             fp.write(urllib.quote(name.encode('utf8')))
             fp.write('\n')
             fp.flush()
-    return CLI()(context.original_main_args + args)
+    cli = CLI()
+    # Shares the budget so nested "for ... do" runs stay within the overall
+    # concurrency limit, and the client manager so they reuse its pooled
+    # connections.
+    cli.context.concurrency_budget = context.concurrency_budget
+    cli.context.concurrency_controller = context.concurrency_controller
+    cli.context.client_manager = context.client_manager
+    return cli(context.original_main_args + args)
 
 
 def cli_fordo(context, path=None):
@@ -84,19 +95,24 @@ def cli_fordo(context, path=None):
     prefix = context.query.get('prefix')
     marker = context.query.get('marker')
     end_marker = context.query.get('end_marker')
-    conc = Concurrency(context.concurrency)
+    warmed = False
+    conc = Concurrency(
+        context.concurrency, backend=context.concurrency_backend,
+        budget=context.concurrency_budget)
     while True:
         with context.client_manager.with_client() as client:
             if not path:
                 status, reason, headers, contents = client.get_account(
                     headers=context.headers, prefix=prefix,
                     delimiter=delimiter, marker=marker, end_marker=end_marker,
-                    limit=limit, query=context.query, cdn=context.cdn)
+                    limit=limit, query=context.query, cdn=context.cdn,
+                    stream=True)
             else:
                 status, reason, headers, contents = client.get_container(
                     path, headers=context.headers, prefix=prefix,
                     delimiter=delimiter, marker=marker, end_marker=end_marker,
-                    limit=limit, query=context.query, cdn=context.cdn)
+                    limit=limit, query=context.query, cdn=context.cdn,
+                    stream=True)
             if status // 100 != 2:
                 if status == 404 and context.ignore_404:
                     return
@@ -108,11 +124,16 @@ def cli_fordo(context, path=None):
                 else:
                     raise ReturnCode(
                         'listing container %r: %s %s' % (path, status, reason))
-        if not contents:
+            # Only the names are kept from the streamed listing.
+            names = [item.get('name', item.get('subdir')) for item in contents]
+        if not names:
             break
-        for item in contents:
-            name = (path + '/' if path else '') + item.get(
-                'name', item.get('subdir'))
+        if not warmed:
+            context.client_manager.warm(min(context.concurrency, len(names)))
+            warmed = True
+        for name in names:
+            marker = name
+            name = (path + '/' if path else '') + name
             args = list(context.remaining_args)
             try:
                 index = args.index('<item>')
@@ -120,21 +141,11 @@ def cli_fordo(context, path=None):
                 raise ReturnCode(
                     'No "<item>" designation found in the "do" clause.')
             args[index] = name
-            for (exc_type, exc_value, exc_tb, result) in \
-                    conc.get_results().itervalues():
-                if exc_value:
-                    conc.join()
-                    raise exc_value
+            conc.check()
             conc.spawn(name, _cli_call, context, name, args)
-        marker = contents[-1]['name']
         if limit:
             break
-    conc.join()
-    for (exc_type, exc_value, exc_tb, result) in \
-            conc.get_results().itervalues():
-        if exc_value:
-            conc.join()
-            raise exc_value
+    conc.finish()
 
 
 class CLIForDo(CLICommand):
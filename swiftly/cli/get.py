@@ -12,6 +12,10 @@ cdn                      True if the CDN Management URL should be
 client_manager           For connecting to Swift.
 concurrency              The number of concurrent actions that can be
                          performed.
+concurrency_backend      The name of the Concurrency backend to use.
+concurrency_budget       The ConcurrencyBudget limiting the total
+                         number of concurrent actions, including
+                         nested ones.
 full                     True if you want a full listing (additional
                          information like object count, bytes used,
                          and upload date) instead of just the item
@@ -49,6 +53,16 @@ suppress_container_name  True if files created on disk should have
                          this is usually desired.
 write_headers            A function used to output the response
                          headers if output_headers is set True.
+range_concurrency        The number of byte ranges or segments of one
+                         object that can be downloaded at once.
+range_size               The size of each byte range when downloading
+                         an object as byte ranges.
+range_threshold          Objects larger than this are downloaded as
+                         concurrent byte ranges when written straight
+                         to files; None never does so.
+segments                 True if the segments of segmented objects
+                         should be downloaded concurrently when
+                         written straight to files.
 =======================  ============================================
 """
 """
@@ -66,8 +80,12 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import hashlib
+import json
 import os
+import stat
 import time
+import urllib
 
 from swiftly.cli.command import CLICommand, ReturnCode
 from swiftly.concurrency import Concurrency
@@ -107,57 +125,59 @@ def cli_get_account_listing(context):
             fp.write(contents)
             fp.flush()
         return
-    with context.client_manager.with_client() as client:
-        status, reason, headers, contents = client.get_account(
-            headers=context.headers, limit=limit, marker=marker,
-            end_marker=end_marker, query=context.query, cdn=context.cdn)
-        if status // 100 != 2:
-            if status == 404 and context.ignore_404:
-                return
-            if hasattr(contents, 'read'):
-                contents.read()
-            raise ReturnCode('listing account: %s %s' % (status, reason))
-    if context.output_headers and not context.all_objects:
-        with context.io_manager.with_stdout() as fp:
-            context.write_headers(
-                fp, headers, context.muted_account_headers)
-    while contents:
-        if context.all_objects:
-            new_context = context.copy()
-            new_context.query = dict(new_context.query)
-            for remove in (
-                    'limit', 'delimiter', 'prefix', 'marker', 'end_marker'):
-                if remove in new_context.query:
-                    del new_context.query[remove]
-            for item in contents:
-                if 'name' in item:
-                    new_path = item['name'].encode('utf8')
-                    cli_get_container_listing(new_context, new_path)
-        else:
-            with context.io_manager.with_stdout() as fp:
-                for item in contents:
-                    if context.full:
-                        fp.write('%13s %13s ' % (
-                            item.get('bytes', '-'),
-                            item.get('count', '-')))
-                    fp.write(item.get(
-                        'name', item.get('subdir')).encode('utf8'))
-                    fp.write('\n')
-                fp.flush()
-        if limit:
-            break
-        marker = contents[-1].get('name', contents[-1].get('subdir', ''))
+    new_context = context.copy()
+    new_context.query = dict(new_context.query)
+    for remove in ('limit', 'delimiter', 'prefix', 'marker', 'end_marker'):
+        if remove in new_context.query:
+            del new_context.query[remove]
+    first = True
+    while True:
+        # Each page of the listing is streamed and handled as its items
+        # are decoded, so no page is ever held whole.
         with context.client_manager.with_client() as client:
             status, reason, headers, contents = client.get_account(
                 headers=context.headers, limit=limit, delimiter=delimiter,
                 prefix=prefix, end_marker=end_marker, marker=marker,
-                query=context.query, cdn=context.cdn)
+                query=context.query, cdn=context.cdn, stream=True)
             if status // 100 != 2:
                 if status == 404 and context.ignore_404:
                     return
                 if hasattr(contents, 'read'):
                     contents.read()
                 raise ReturnCode('listing account: %s %s' % (status, reason))
+            last = None
+            if context.all_objects:
+                names = []
+                for item in contents:
+                    last = item.get('name', item.get('subdir', ''))
+                    if 'name' in item:
+                        names.append(item['name'].encode('utf8'))
+            else:
+                with context.io_manager.with_stdout() as fp:
+                    if first and context.output_headers:
+                        context.write_headers(
+                            fp, headers, context.muted_account_headers)
+                    for item in contents:
+                        if context.full:
+                            fp.write('%13s %13s ' % (
+                                item.get('bytes', '-'),
+                                item.get('count', '-')))
+                        last = item.get('name', item.get('subdir', ''))
+                        fp.write(last.encode('utf8'))
+                        fp.write('\n')
+                    fp.flush()
+        if last is None:
+            break
+        if context.all_objects:
+            if first:
+                context.client_manager.warm(
+                    min(context.concurrency, len(names)))
+            for new_path in names:
+                cli_get_container_listing(new_context, new_path)
+        first = False
+        if limit:
+            break
+        marker = last
 
 
 def cli_get_container_listing(context, path=None):
@@ -199,62 +219,26 @@ def cli_get_container_listing(context, path=None):
             fp.write(contents)
             fp.flush()
         return
-    with context.client_manager.with_client() as client:
-        status, reason, headers, contents = client.get_container(
-            path, headers=context.headers, limit=limit, delimiter=delimiter,
-            prefix=prefix, marker=marker, end_marker=end_marker,
-            query=context.query, cdn=context.cdn)
-        if status // 100 != 2:
-            if status == 404 and context.ignore_404:
-                return
-            if hasattr(contents, 'read'):
-                contents.read()
-            raise ReturnCode(
-                'listing container %r: %s %s' % (path, status, reason))
-    if context.output_headers and not context.all_objects:
-        with context.io_manager.with_stdout() as fp:
-            context.write_headers(
-                fp, headers, context.muted_container_headers)
-    conc = Concurrency(context.concurrency)
-    while contents:
-        if context.all_objects:
-            new_context = context.copy()
-            new_context.query = dict(new_context.query)
-            for remove in (
-                    'limit', 'delimiter', 'prefix', 'marker', 'end_marker'):
-                if remove in new_context.query:
-                    del new_context.query[remove]
-            for item in contents:
-                if 'name' in item:
-                    for (exc_type, exc_value, exc_tb, result) in \
-                            conc.get_results().itervalues():
-                        if exc_value:
-                            conc.join()
-                            raise exc_value
-                    new_path = path + '/' + item['name'].encode('utf8')
-                    conc.spawn(new_path, cli_get, new_context, new_path)
-        else:
-            with context.io_manager.with_stdout() as fp:
-                for item in contents:
-                    if context.full:
-                        fp.write('%13s %22s %32s %25s ' % (
-                            item.get('bytes', '-'),
-                            item.get('last_modified', '-')[:22].replace(
-                                'T', ' '),
-                            item.get('hash', '-'),
-                            item.get('content_type', '-')))
-                    fp.write(item.get(
-                        'name', item.get('subdir')).encode('utf8'))
-                    fp.write('\n')
-                fp.flush()
-        if limit:
-            break
-        marker = contents[-1].get('name', contents[-1].get('subdir', ''))
+    new_context = context.copy()
+    new_context.query = dict(new_context.query)
+    for remove in ('limit', 'delimiter', 'prefix', 'marker', 'end_marker'):
+        if remove in new_context.query:
+            del new_context.query[remove]
+    conc = Concurrency(
+        context.concurrency, backend=context.concurrency_backend,
+        budget=context.concurrency_budget)
+    if context.device_spread:
+        conc = context.device_spread.scheduler(conc)
+    first = True
+    while True:
+        # Each page of the listing is streamed and handled as its items
+        # are decoded, so no page is ever held whole.
         with context.client_manager.with_client() as client:
             status, reason, headers, contents = client.get_container(
                 path, headers=context.headers, limit=limit,
                 delimiter=delimiter, prefix=prefix, end_marker=end_marker,
-                marker=marker, query=context.query, cdn=context.cdn)
+                marker=marker, query=context.query, cdn=context.cdn,
+                stream=True)
             if status // 100 != 2:
                 if status == 404 and context.ignore_404:
                     return
@@ -262,11 +246,44 @@ def cli_get_container_listing(context, path=None):
                     contents.read()
                 raise ReturnCode(
                     'listing container %r: %s %s' % (path, status, reason))
-    conc.join()
-    for (exc_type, exc_value, exc_tb, result) in \
-            conc.get_results().itervalues():
-        if exc_value:
-            raise exc_value
+            last = None
+            if context.all_objects:
+                names = []
+                for item in contents:
+                    last = item.get('name', item.get('subdir', ''))
+                    if 'name' in item:
+                        names.append(path + '/' + item['name'].encode('utf8'))
+            else:
+                with context.io_manager.with_stdout() as fp:
+                    if first and context.output_headers:
+                        context.write_headers(
+                            fp, headers, context.muted_container_headers)
+                    for item in contents:
+                        if context.full:
+                            fp.write('%13s %22s %32s %25s ' % (
+                                item.get('bytes', '-'),
+                                item.get('last_modified', '-')[:22].replace(
+                                    'T', ' '),
+                                item.get('hash', '-'),
+                                item.get('content_type', '-')))
+                        last = item.get('name', item.get('subdir', ''))
+                        fp.write(last.encode('utf8'))
+                        fp.write('\n')
+                    fp.flush()
+        if last is None:
+            break
+        if context.all_objects:
+            if first:
+                context.client_manager.warm(
+                    min(context.concurrency, len(names)))
+            for new_path in names:
+                conc.check()
+                conc.spawn(new_path, cli_get, new_context, new_path)
+        first = False
+        if limit:
+            break
+        marker = last
+    conc.finish()
 
 
 def cli_get(context, path=None):
@@ -282,7 +299,11 @@ def cli_get(context, path=None):
         return cli_get_account_listing(context)
     elif '/' not in path.rstrip('/'):
         return cli_get_container_listing(context, path)
+    to_file = _output_is_file(context) and not context.decrypt and \
+        not context.output_headers and 'range' not in context.headers and \
+        'multipart-manifest' not in context.query
     status, reason, headers, contents = 0, 'Unknown', {}, ''
+    fetch = None
     with context.client_manager.with_client() as client:
         status, reason, headers, contents = client.get_object(
             *path.split('/', 1), headers=context.headers, query=context.query,
@@ -294,59 +315,334 @@ def cli_get(context, path=None):
                 contents.read()
             raise ReturnCode(
                 'getting object %r: %s %s' % (path, status, reason))
-        if context.decrypt:
-            crypt_type = contents.read(1)
-            if crypt_type == AES256CBC:
-                contents = FileLikeIter(aes_decrypt(
-                    context.decrypt, contents,
-                    chunk_size=getattr(client, 'chunk_size', 65536)))
-            else:
-                raise ReturnCode(
-                    'getting object %r: contents encrypted with unsupported '
-                    'type %r' % (path, crypt_type))
-
-        def disk_closed_callback(disk_path):
-            if context.remove_empty_files and not os.path.getsize(disk_path):
-                os.unlink(disk_path)
-                if context.io_manager.stdout_root:
-                    dirname = os.path.dirname(disk_path)
-                    while dirname and dirname.startswith(
-                            context.io_manager.stdout_root):
-                        try:
-                            os.rmdir(dirname)
-                        except OSError:
-                            pass
-                        dirname = os.path.dirname(dirname)
-                return
-            if (headers.get('content-type') in
-                    ['text/directory', 'application/directory'] and
-                    headers.get('content-length') == '0'):
-                os.unlink(disk_path)
-                os.makedirs(disk_path)
-            mtime = 0
-            if 'x-object-meta-mtime' in headers:
-                mtime = float(headers['x-object-meta-mtime'])
-            elif 'last-modified' in headers:
-                mtime = time.mktime(time.strptime(
-                    headers['last-modified'], '%a, %d %b %Y %H:%M:%S %Z'))
-            if mtime:
-                os.utime(disk_path, (mtime, mtime))
-
-        out_path = path
-        if context.suppress_container_name:
-            out_path = out_path.split('/', 1)[1]
-        out_path = context.io_manager.client_path_to_os_path(out_path)
-        with context.io_manager.with_stdout(
-                out_path, disk_closed_callback=disk_closed_callback) as fp:
-            if context.output_headers:
-                context.write_headers(
-                    fp, headers, context.muted_object_headers)
-                fp.write('\n')
+        if to_file and context.segments and _is_manifest(headers):
+            fetch = _cli_get_segments
+        elif to_file and context.range_threshold and \
+                int(headers.get('content-length') or 0) > \
+                context.range_threshold:
+            fetch = _cli_get_ranges
+        if fetch:
+            # The object is fetched in parts instead, so the response is
+            # abandoned along with its connection.
+            contents.close()
+            client.reset()
+        else:
+            _write_object(context, path, headers, contents, client)
+    if fetch:
+        return fetch(context, path, headers)
+
+
+def _write_object(context, path, headers, contents, client):
+    # Writes the contents of the object's GET response to the output.
+    if context.decrypt:
+        crypt_type = contents.read(1)
+        if crypt_type == AES256CBC:
+            contents = FileLikeIter(aes_decrypt(
+                context.decrypt, contents,
+                chunk_size=getattr(client, 'chunk_size', 65536)))
+        else:
+            raise ReturnCode(
+                'getting object %r: contents encrypted with unsupported '
+                'type %r' % (path, crypt_type))
+    out_path, disk_closed_callback = _output(context, path, headers)
+    with context.io_manager.with_stdout(
+            out_path, disk_closed_callback=disk_closed_callback) as fp:
+        if context.output_headers:
+            context.write_headers(
+                fp, headers, context.muted_object_headers)
+            fp.write('\n')
+        readinto = getattr(contents, 'readinto', None)
+        if readinto:
+            # Reuses one buffer for the whole object rather than making a
+            # new string for every chunk.
+            buf = bytearray(65536)
+            size = readinto(buf)
+            while size:
+                fp.write(buffer(buf, 0, size))
+                size = readinto(buf)
+        else:
             chunk = contents.read(65536)
             while chunk:
                 fp.write(chunk)
                 chunk = contents.read(65536)
-            fp.flush()
+        fp.flush()
+
+
+def _output(context, path, headers):
+    # Returns the os path to give with_stdout for the object and the
+    # disk_closed_callback to give with it.
+
+    def disk_closed_callback(disk_path):
+        if context.remove_empty_files and not os.path.getsize(disk_path):
+            os.unlink(disk_path)
+            if context.io_manager.stdout_root:
+                dirname = os.path.dirname(disk_path)
+                while dirname and dirname.startswith(
+                        context.io_manager.stdout_root):
+                    try:
+                        os.rmdir(dirname)
+                    except OSError:
+                        pass
+                    dirname = os.path.dirname(dirname)
+            return
+        if (headers.get('content-type') in
+                ['text/directory', 'application/directory'] and
+                headers.get('content-length') == '0'):
+            os.unlink(disk_path)
+            os.makedirs(disk_path)
+        mtime = 0
+        if 'x-object-meta-mtime' in headers:
+            mtime = float(headers['x-object-meta-mtime'])
+        elif 'last-modified' in headers:
+            mtime = time.mktime(time.strptime(
+                headers['last-modified'], '%a, %d %b %Y %H:%M:%S %Z'))
+        if mtime:
+            os.utime(disk_path, (mtime, mtime))
+
+    out_path = path
+    if context.suppress_container_name:
+        out_path = out_path.split('/', 1)[1]
+    out_path = context.io_manager.client_path_to_os_path(out_path)
+    return out_path, disk_closed_callback
+
+
+def _output_is_file(context):
+    # Returns True if objects will be written straight to regular files,
+    # which byte ranges can be written into at any offset.
+    io_manager = context.io_manager
+    if io_manager.stdout_sub_command:
+        return False
+    if io_manager.stdout_root:
+        return True
+    try:
+        return stat.S_ISREG(os.fstat(io_manager.stdout.fileno()).st_mode) \
+            and os.path.isfile(io_manager.stdout.name)
+    except (AttributeError, IOError, OSError, ValueError):
+        return False
+
+
+def _cli_get_ranges(context, path, headers):
+    """
+    Performs a GET of the object as several concurrent GETs of byte
+    ranges, each written at its offset in the output file.
+
+    See :py:mod:`swiftly.cli.get` for context usage information.
+    """
+    size = int(headers['content-length'])
+    parts = []
+    for start in xrange(0, size, context.range_size):
+        end = min(size, start + context.range_size) - 1
+        parts.append((start, path, start, end, headers.get('etag')))
+    _get_parts(context, path, headers, size, parts, False)
+
+
+def _is_manifest(headers):
+    # Returns True if the headers are those of a segmented object.
+    return bool(headers.get('x-object-manifest')) or \
+        headers.get('x-static-large-object', '').lower() == 'true'
+
+
+def _cli_get_segments(context, path, headers):
+    """
+    Performs a GET of the segmented object as concurrent GETs of its
+    segments, each written at its offset in the output file and checked
+    against its ETag.
+
+    See :py:mod:`swiftly.cli.get` for context usage information.
+    """
+    segments = _manifest_segments(context, path, headers)
+    if segments is None:
+        # Nested or partial segments, or segments that could not be
+        # listed, are left to the proxy to assemble.
+        return _cli_get_whole(context, path)
+    size = 0
+    parts = []
+    for segment_path, segment_size, etag in segments:
+        if segment_size:
+            parts.append(
+                (size, segment_path, 0, segment_size - 1, etag))
+        size += segment_size
+    if 'content-length' in headers and \
+            int(headers['content-length']) != size:
+        if context.verbose:
+            context.verbose(
+                'Segments of %r total %d bytes, not %s; getting it whole.',
+                path, size, headers['content-length'])
+        return _cli_get_whole(context, path)
+    _get_parts(context, path, headers, size, parts, True)
+
+
+def _cli_get_whole(context, path):
+    # GETs the object with a single request, just as cli_get would if
+    # segments were not fetched on their own.
+    with context.client_manager.with_client() as client:
+        status, reason, headers, contents = client.get_object(
+            *path.split('/', 1), headers=context.headers, query=context.query,
+            cdn=context.cdn)
+        if status // 100 != 2:
+            if hasattr(contents, 'read'):
+                contents.read()
+            raise ReturnCode(
+                'getting object %r: %s %s' % (path, status, reason))
+        _write_object(context, path, headers, contents, client)
+
+
+def _manifest_segments(context, path, headers):
+    # Returns a list of (path, size, etag) for each segment of the
+    # segmented object, in order, or None if the object has nested or
+    # partial segments or its segments cannot be listed, such as by a
+    # user who may read the object but not list its segments.
+    segments = []
+    manifest = headers.get('x-object-manifest')
+    if manifest:
+        container, prefix = urllib.unquote(manifest).split('/', 1)
+        marker = None
+        while True:
+            with context.client_manager.with_client() as client:
+                status, reason, headers, contents = client.get_container(
+                    container, prefix=prefix, marker=marker, cdn=context.cdn)
+                if status // 100 != 2:
+                    if hasattr(contents, 'read'):
+                        contents.read()
+                    if context.verbose:
+                        context.verbose(
+                            'Listing segments of %r: %s %s; getting it '
+                            'whole.', path, status, reason)
+                    return None
+            if not contents:
+                break
+            for item in contents:
+                segments.append((
+                    container + '/' + item['name'].encode('utf8'),
+                    item['bytes'], item['hash']))
+            marker = contents[-1]['name'].encode('utf8')
+        return segments
+    with context.client_manager.with_client() as client:
+        status, reason, headers, contents = client.get_object(
+            *path.split('/', 1), stream=False,
+            query={'multipart-manifest': 'get'}, cdn=context.cdn)
+        if status // 100 != 2:
+            if context.verbose:
+                context.verbose(
+                    'Getting manifest of %r: %s %s; getting it whole.',
+                    path, status, reason)
+            return None
+    for item in json.loads(contents):
+        if item.get('sub_slo') or 'range' in item:
+            return None
+        segments.append((
+            item.get('name', item.get('path')).encode('utf8').lstrip('/'),
+            item.get('bytes', item.get('size_bytes')),
+            item.get('hash', item.get('etag'))))
+    return segments
+
+
+def _get_parts(context, path, headers, size, parts, segments):
+    # Writes the object to the output file as the parts given, each an
+    # (offset, path, start, end, etag) fetched concurrently; segments is
+    # True if the parts are the object's segments rather than byte ranges
+    # of it.
+    out_path, disk_closed_callback = _output(context, path, headers)
+    with context.io_manager.with_stdout(
+            out_path, disk_closed_callback=disk_closed_callback) as fp:
+        fp.flush()
+        base = fp.tell()
+        # Sizing the file up front lets the parts be written in any order.
+        fp.truncate(base + size)
+        conc = Concurrency(
+            context.range_concurrency, backend=context.concurrency_backend,
+            budget=context.concurrency_budget)
+        for offset, part_path, start, end, etag in parts:
+            conc.check()
+            conc.spawn(
+                offset, _get_range, context, part_path, fp.name,
+                base + offset, start, end, etag, segments)
+        conc.finish()
+        fp.seek(base + size)
+
+
+def _get_range(context, path, disk_path, offset, start, end, etag,
+               segment=False):
+    # Downloads the bytes from start to end of the object into the file
+    # at disk_path, starting at offset. A range that fails part way is
+    # resumed from where it stopped. If segment is True, the object is a
+    # segment of the one being downloaded: the request's headers and
+    # query are not sent for it and its bytes are checked against the
+    # etag.
+    fd = os.open(disk_path, os.O_WRONLY)
+    try:
+        os.lseek(fd, offset, os.SEEK_SET)
+        buf = bytearray(65536)
+        failures = 0
+        first = start
+        md5 = hashlib.md5() if segment and etag else None
+        etag = etag.strip('"') if etag else None
+        while start <= end:
+            req_headers = {} if segment else dict(context.headers)
+            req_headers['range'] = 'bytes=%d-%d' % (start, end)
+            with context.client_manager.with_client() as client:
+                status, reason, headers, contents = client.get_object(
+                    *path.split('/', 1), headers=req_headers,
+                    query=None if segment else context.query,
+                    cdn=context.cdn)
+                if status != 206:
+                    # Retried like any other failure, as a replica may
+                    # not have caught up yet.
+                    if hasattr(contents, 'read'):
+                        contents.read()
+                    failures += 1
+                    if failures >= getattr(client, 'attempts', 5):
+                        raise ReturnCode(
+                            'getting object %r bytes %d-%d: %s %s' %
+                            (path, start, end, status, reason))
+                    if context.verbose:
+                        context.verbose(
+                            'Retrying %r bytes %d-%d: %s %s', path, start,
+                            end, status, reason)
+                    continue
+                if etag and \
+                        headers.get('etag', etag).strip('"') != etag:
+                    contents.close()
+                    raise ReturnCode(
+                        'getting object %r: object changed during download' %
+                        path)
+                readinto = getattr(contents, 'readinto', None)
+                try:
+                    while start <= end:
+                        if readinto:
+                            size = readinto(buf)
+                            chunk = buffer(buf, 0, size)
+                        else:
+                            chunk = contents.read(65536)
+                            size = len(chunk)
+                        if not size:
+                            raise IOError('Early EOF from object')
+                        if md5:
+                            md5.update(chunk)
+                        while chunk:
+                            chunk = buffer(chunk, os.write(fd, chunk))
+                        start += size
+                    if md5 and md5.hexdigest() != etag:
+                        # Corrupted on the way; the whole segment is
+                        # downloaded again.
+                        err = IOError(
+                            'MD5 %s does not match ETag %s' %
+                            (md5.hexdigest(), etag))
+                        start = first
+                        md5 = hashlib.md5()
+                        os.lseek(fd, offset, os.SEEK_SET)
+                        raise err
+                except Exception as err:
+                    failures += 1
+                    if failures >= getattr(client, 'attempts', 5):
+                        raise
+                    if context.verbose:
+                        context.verbose(
+                            'Retrying %r bytes %d-%d: %s', path, start, end,
+                            err)
+                    client.reset()
+    finally:
+        os.close(fd)
 
 
 class CLIGet(CLICommand):
@@ -465,6 +761,28 @@ Outputs the resulting contents from a GET request of the [path] given. If no
             help='Removes files that result as empty. This can be useful in '
                  'conjunction with --sub-command so you are left only with '
                  'the files that generated output.')
+        self.option_parser.add_option(
+            '--range-threshold', dest='range_threshold', metavar='BYTES',
+            help='Downloads objects larger than BYTES as several byte ranges '
+                 'at once, over as many connections as --concurrency allows, '
+                 'writing each range into place in the output file. A range '
+                 'that fails is retried on its own. Only used when writing '
+                 'objects to files without --headers, --decrypt, or '
+                 '--sub-command. Default: objects are downloaded whole.')
+        self.option_parser.add_option(
+            '--range-size', dest='range_size', metavar='BYTES',
+            help='Sets the size of each byte range for --range-threshold. '
+                 'Default: 67108864 (64 MiB)')
+        self.option_parser.add_option(
+            '--segments', dest='segments', action='store_true',
+            help='Downloads the segments of segmented objects at once, over '
+                 'as many connections as --concurrency allows, each checked '
+                 'against its ETag and written into place in the output '
+                 'file. The segments are listed first, and the GET already '
+                 'begun for the object is abandoned. Only used when writing '
+                 'objects to files without --headers, --decrypt, or '
+                 '--sub-command. Default: segmented objects are downloaded '
+                 'as the proxy serves them, one segment after another.')
         self.option_parser.add_option(
             '--decrypt', dest='decrypt', metavar='KEY',
             help='Will decrypt the downloaded object data with KEY. This '
@@ -475,6 +793,7 @@ Outputs the resulting contents from a GET request of the [path] given. If no
 
     def __call__(self, args):
         options, args, context = self.parse_args_and_create_context(args)
+        context.range_concurrency = context.concurrency
         if options.output:
             if options.output.endswith(os.path.sep):
                 context.io_manager.stdout_root = options.output
@@ -491,6 +810,13 @@ Outputs the resulting contents from a GET request of the [path] given. If no
         context.all_objects = options.all_objects
         context.full = options.full
         context.remove_empty_files = options.remove_empty_files
+        context.segments = options.segments
+        context.range_threshold = None
+        if options.range_threshold:
+            context.range_threshold = int(options.range_threshold)
+        context.range_size = int(options.range_size or 64 * 1024 * 1024)
+        if context.range_size < 1:
+            raise ReturnCode('invalid range size %s' % options.range_size)
         if options.limit:
             context.query['limit'] = int(options.limit)
         if options.delimiter:
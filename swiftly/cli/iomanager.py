@@ -58,13 +58,19 @@ class IOManager(object):
     :param verbose: A function to call with ``(msg)`` when waiting
         for subcommands to complete and for logging the subcommands'
         return codes.
+    :param lock_class: Default: None. If set, uses of the default
+        stdin, stdout, stderr, and debug file-like objects by the
+        with_* context managers will be serialized by a lock of this
+        class; for instance, you might use threading.RLock when the
+        IOManager is in use by several threads.
     """
 
     def __init__(self, stdin=None, stdout=None, stderr=None, debug=None,
                  stdin_root=None, stdout_root=None, stderr_root=None,
                  debug_root=None, stdin_sub_command=None,
                  stdout_sub_command=None, stderr_sub_command=None,
-                 debug_sub_command=None, subprocess_module=None, verbose=None):
+                 debug_sub_command=None, subprocess_module=None, verbose=None,
+                 lock_class=None):
         self.stdin = stdin or sys.stdin
         self.stdout = stdout or sys.stdout
         self.stderr = stderr or sys.stderr
@@ -82,6 +88,8 @@ class IOManager(object):
             import subprocess
             self.subprocess_module = subprocess
         self.verbose = verbose
+        self.lock_class = lock_class
+        self._locks = {}
 
     def client_path_to_os_path(self, client_path):
         """
@@ -212,6 +220,16 @@ class IOManager(object):
                     msg += ' and closed %s' % path
                 self.verbose(msg)
 
+    @contextlib.contextmanager
+    def _lock(self, name, item, default):
+        if not self.lock_class or item is not default:
+            yield
+            return
+        # dict.setdefault is atomic, so all callers get the same lock.
+        lock = self._locks.setdefault(name, self.lock_class())
+        with lock:
+            yield
+
     def _close(self, item):
         if item not in (self.stdin, self.stdout, self.stderr, self.debug):
             if hasattr(item, 'close'):
@@ -238,10 +256,11 @@ class IOManager(object):
         inn, path = self._get_in_and_path(
             self.stdin, self.stdin_root, sub_command, os_path)
         try:
-            if hasattr(inn, 'stdout'):
-                yield inn.stdout
-            else:
-                yield inn
+            with self._lock('stdin', inn, self.stdin):
+                if hasattr(inn, 'stdout'):
+                    yield inn.stdout
+                else:
+                    yield inn
         finally:
             if hasattr(inn, 'stdout'):
                 self._close(inn.stdout)
@@ -271,10 +290,11 @@ class IOManager(object):
         out, path = self._get_out_and_path(
             self.stdout, self.stdout_root, sub_command, os_path)
         try:
-            if hasattr(out, 'stdin'):
-                yield out.stdin
-            else:
-                yield out
+            with self._lock('stdout', out, self.stdout):
+                if hasattr(out, 'stdin'):
+                    yield out.stdin
+                else:
+                    yield out
         finally:
             if hasattr(out, 'stdin'):
                 self._close(out.stdin)
@@ -304,10 +324,11 @@ class IOManager(object):
         out, path = self._get_out_and_path(
             self.stderr, self.stderr_root, sub_command, os_path)
         try:
-            if hasattr(out, 'stdin'):
-                yield out.stdin
-            else:
-                yield out
+            with self._lock('stderr', out, self.stderr):
+                if hasattr(out, 'stdin'):
+                    yield out.stdin
+                else:
+                    yield out
         finally:
             if hasattr(out, 'stdin'):
                 self._close(out.stdin)
@@ -337,10 +358,11 @@ class IOManager(object):
         out, path = self._get_out_and_path(
             self.debug, self.debug_root, sub_command, os_path)
         try:
-            if hasattr(out, 'stdin'):
-                yield out.stdin
-            else:
-                yield out
+            with self._lock('debug', out, self.debug):
+                if hasattr(out, 'stdin'):
+                    yield out.stdin
+                else:
+                    yield out
         finally:
             if hasattr(out, 'stdin'):
                 self._close(out.stdin)
@@ -3,26 +3,29 @@ Contains a CLICommand that implements ping test functionality.
 
 Uses the following from :py:class:`swiftly.cli.context.CLIContext`:
 
-===============  ====================================================
-client_manager   For connecting to Swift.
-concurrency      The number of concurrent actions that can be
-                 performed.
-io_manager       For directing output.
-limit            The maximum number of Swift nodes to output
-                 information about.
-object_ring      An instance of swift.common.ring.ring.Ring if you
-                 want a report based on Swift nodes with implied
-                 usage during the ping test.
-ping_begin       The first time.time() when the entire ping test
-                 began.
-ping_begin_last  The time.time() the last ping task started.
-ping_count       The number of objects to use.
-ping_verbose     True if you want a full ping report rather than just
-                 the overall time.
-threshold        Defines the threshold for the threshold node report.
-                 This is the multiplier over the average request
-                 time.
-===============  ====================================================
+===================  ====================================================
+client_manager       For connecting to Swift.
+concurrency          The number of concurrent actions that can be
+                     performed.
+concurrency_backend  The name of the Concurrency backend to use.
+concurrency_budget   The ConcurrencyBudget limiting the total number of
+                     concurrent actions, including nested ones.
+io_manager           For directing output.
+limit                The maximum number of Swift nodes to output
+                     information about.
+object_ring          An instance of swift.common.ring.ring.Ring if you
+                     want a report based on Swift nodes with implied
+                     usage during the ping test.
+ping_begin           The first time.time() when the entire ping test
+                     began.
+ping_begin_last      The time.time() the last ping task started.
+ping_count           The number of objects to use.
+ping_verbose         True if you want a full ping report rather than just
+                     the overall time.
+threshold            Defines the threshold for the threshold node report.
+                     This is the multiplier over the average request
+                     time.
+===================  ====================================================
 """
 """
 Copyright 2011-2013 Gregory Holt
@@ -77,22 +80,9 @@ def _cli_ping_objects(context, heading, conc, container, objects, func,
                       results):
     begin = time.time()
     for obj in objects:
-        for (exc_type, exc_value, exc_tb, result) in \
-                conc.get_results().itervalues():
-            if exc_value:
-                with context.io_manager.with_stderr() as fp:
-                    fp.write(str(exc_value))
-                    fp.write('\n')
-                    fp.flush()
+        conc.check()
         conc.spawn(obj, func, context, results, container, obj)
-    conc.join()
-    for (exc_type, exc_value, exc_tb, result) in \
-            conc.get_results().itervalues():
-        if exc_value:
-            with context.io_manager.with_stderr() as fp:
-                fp.write(str(exc_value))
-                fp.write('\n')
-                fp.flush()
+    conc.finish()
     elapsed = time.time() - begin
     _cli_ping_status(
         context,
@@ -287,7 +277,18 @@ def cli_ping(context, prefix):
     context.ping_begin = context.ping_begin_last = time.time()
     container = prefix + '-' + uuid.uuid4().hex
     objects = [uuid.uuid4().hex for x in xrange(context.ping_count)]
-    conc = Concurrency(context.concurrency)
+
+    def report_error(ident, exc_type, exc_value, exc_tb, result):
+        if exc_value:
+            with context.io_manager.with_stderr() as fp:
+                fp.write(str(exc_value))
+                fp.write('\n')
+                fp.flush()
+
+    conc = Concurrency(
+        context.concurrency, callback=report_error,
+        backend=context.concurrency_backend,
+        budget=context.concurrency_budget, fail_fast=False)
     with context.client_manager.with_client() as client:
         client.auth()
         _cli_ping_status(context, 'auth', '-', None, None, None, None)
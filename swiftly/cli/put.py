@@ -3,37 +3,40 @@ Contains a CLICommand that can issue PUT requests.
 
 Uses the following from :py:class:`swiftly.cli.context.CLIContext`:
 
-===============  ====================================================
-cdn              True if the CDN Management URL should be used
-                 instead of the Storage URL.
-client_manager   For connecting to Swift.
-concurrency      The number of concurrent actions that can be
-                 performed.
-different        Set to True to check if the local file is different
-                 than an existing object before uploading.
-empty            Set to True if you wish to send an empty body with
-                 the PUT rather than reading from the io_manager's
-                 stdin.
-headers          A dict of headers to send.
-input\_          A string representing where input should be obtained
-                 from. If None, the io_manager's stdin will be used.
-                 If a directory path is specified, a set of PUTs will
-                 be generated for each item in the directory
-                 structure. If a file path is specified, that single
-                 file will be used as input.
-io_manager       For directing output and obtaining input if needed.
-newer            Set to True to check if the local file is newer than
-                 an existing object before uploading.
-query            A dict of query parameters to send.
-seek             Where to seek to in the input\_ before uploading;
-                 usually just used by recursive calls with segmented
-                 objects.
-segment_size     The max size of a file before switching to a
-                 segmented object and the max size of each object
-                 segment.
-static_segments  Set to True to use static large object support
-                 instead of dynamic large object support.
-===============  ====================================================
+===================  ====================================================
+cdn                  True if the CDN Management URL should be used
+                     instead of the Storage URL.
+client_manager       For connecting to Swift.
+concurrency          The number of concurrent actions that can be
+                     performed.
+concurrency_backend  The name of the Concurrency backend to use.
+concurrency_budget   The ConcurrencyBudget limiting the total number of
+                     concurrent actions, including nested ones.
+different            Set to True to check if the local file is different
+                     than an existing object before uploading.
+empty                Set to True if you wish to send an empty body with
+                     the PUT rather than reading from the io_manager's
+                     stdin.
+headers              A dict of headers to send.
+input\_              A string representing where input should be obtained
+                     from. If None, the io_manager's stdin will be used.
+                     If a directory path is specified, a set of PUTs will
+                     be generated for each item in the directory
+                     structure. If a file path is specified, that single
+                     file will be used as input.
+io_manager           For directing output and obtaining input if needed.
+newer                Set to True to check if the local file is newer than
+                     an existing object before uploading.
+query                A dict of query parameters to send.
+seek                 Where to seek to in the input\_ before uploading;
+                     usually just used by recursive calls with segmented
+                     objects.
+segment_size         The max size of a file before switching to a
+                     segmented object and the max size of each object
+                     segment.
+static_segments      Set to True to use static large object support
+                     instead of dynamic large object support.
+===================  ====================================================
 """
 """
 Copyright 2011-2013 Gregory Holt
@@ -85,7 +88,11 @@ def cli_put_directory_structure(context, path):
     ilen = len(context.input_)
     if not context.input_.endswith(os.sep):
         ilen += 1
-    conc = Concurrency(context.concurrency)
+    conc = Concurrency(
+        context.concurrency, backend=context.concurrency_backend,
+        budget=context.concurrency_budget)
+    if context.device_spread:
+        conc = context.device_spread.scheduler(conc)
     for (dirpath, dirnames, filenames) in os.walk(context.input_):
         if not dirnames and not filenames:
             new_context = context.copy()
@@ -99,11 +106,7 @@ def cli_put_directory_structure(context, path):
             if path[-1] != '/':
                 new_path += '/'
             new_path += dirpath[ilen:]
-            for (exc_type, exc_value, exc_tb, result) in \
-                    conc.get_results().itervalues():
-                if exc_value:
-                    conc.join()
-                    raise exc_value
+            conc.check()
             conc.spawn(new_path, cli_put_object, new_context, new_path)
         else:
             for fname in filenames:
@@ -115,17 +118,9 @@ def cli_put_directory_structure(context, path):
                 if dirpath[ilen:]:
                     new_path += dirpath[ilen:] + '/'
                 new_path += fname
-                for (exc_type, exc_value, exc_tb, result) in \
-                        conc.get_results().itervalues():
-                    if exc_value:
-                        conc.join()
-                        raise exc_value
+                conc.check()
                 conc.spawn(new_path, cli_put_object, new_context, new_path)
-    conc.join()
-    for (exc_type, exc_value, exc_tb, result) in \
-            conc.get_results().itervalues():
-        if exc_value:
-            raise exc_value
+    conc.finish()
 
 
 def cli_put_account(context):
@@ -256,10 +251,18 @@ def cli_put_object(context, path):
             cli_put_container(new_context, container)
             prefix = container + '/' + path.split('/', 1)[1]
             prefix = '%s/%s/%s/' % (prefix, l_mtime, size)
-            conc = Concurrency(context.concurrency)
+            path2info = {}
+
+            def segment_done(ident, exc_type, exc_value, exc_tb, result):
+                if not exc_value:
+                    path2info[ident] = result
+
+            conc = Concurrency(
+                context.concurrency, callback=segment_done,
+                backend=context.concurrency_backend,
+                budget=context.concurrency_budget)
             start = 0
             segment = 0
-            path2info = {}
             while start < size:
                 new_context = context.copy()
                 new_context.headers = dict(context.headers)
@@ -267,22 +270,12 @@ def cli_put_object(context, path):
                     size - start, context.segment_size))
                 new_context.seek = start
                 new_path = '%s%08d' % (prefix, segment)
-                for (ident, (exc_type, exc_value, exc_tb, result)) in \
-                        conc.get_results().iteritems():
-                    if exc_value:
-                        conc.join()
-                        raise exc_value
-                    path2info[ident] = result
+                conc.check()
                 conc.spawn(
                     new_path, cli_put_object, new_context, new_path)
                 segment += 1
                 start += context.segment_size
-            conc.join()
-            for (ident, (exc_type, exc_value, exc_tb, result)) in \
-                    conc.get_results().iteritems():
-                if exc_value:
-                    raise exc_value
-                path2info[ident] = result
+            conc.finish()
             if context.static_segments:
                 body = json.dumps([
                     {'path': '/' + p, 'size_bytes': s, 'etag': e}
@@ -8,6 +8,15 @@ StandardClient     :py:class:`swiftly.client.standardclient.StandardClient`
 DirectClient       :py:class:`swiftly.client.directclient.DirectClient`
 LocalClient        :py:class:`swiftly.client.localclient.LocalClient`
 ClientManager      :py:class:`swiftly.client.manager.ClientManager`
+AuthStore          :py:class:`swiftly.client.authstore.AuthStore`
+AuthCache          :py:class:`swiftly.client.authcache.AuthCache`
+RetryPolicy        :py:class:`swiftly.client.retry.RetryPolicy`
+RetryBudget        :py:class:`swiftly.client.retry.RetryBudget`
+EndpointPool       :py:class:`swiftly.client.endpoints.EndpointPool`
+HedgePolicy        :py:class:`swiftly.client.hedge.HedgePolicy`
+Timeouts           :py:class:`swiftly.client.timeouts.Timeouts`
+Spool              :py:class:`swiftly.client.spool.Spool`
+ReplicaPolicy      :py:class:`swiftly.client.replicas.ReplicaPolicy`
 generate_temp_url  :py:func:`swiftly.client.utils.generate_temp_url`
 get_trans_id_time  :py:func:`swiftly.client.utils.get_trans_id_time`
 =================  ========================================================
@@ -32,4 +41,12 @@ from swiftly.client.directclient import DirectClient
 from swiftly.client.localclient import LocalClient
 from swiftly.client.standardclient import StandardClient
 from swiftly.client.manager import ClientManager
+from swiftly.client.authstore import AuthStore
+from swiftly.client.authcache import AuthCache
+from swiftly.client.retry import RetryBudget, RetryPolicy
+from swiftly.client.endpoints import EndpointPool
+from swiftly.client.hedge import HedgePolicy
+from swiftly.client.timeouts import Timeouts
+from swiftly.client.spool import Spool
+from swiftly.client.replicas import ReplicaPolicy
 from swiftly.client.utils import generate_temp_url, get_trans_id_time
@@ -0,0 +1,215 @@
+"""
+Contains the AuthCache class that shares auth tokens between swiftly
+processes through a file.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import contextlib
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+#: The entry fields that say which auth settings an entry is for.
+IDENTITY = ('auth_url', 'auth_user', 'auth_tenant', 'region', 'snet')
+
+
+class AuthCache(object):
+    """
+    Shares auth tokens between processes, such as the many short-lived
+    swiftly invocations a cron job may start at once, through a JSON
+    file.
+
+    The file holds one entry for each set of auth settings, see
+    :py:data:`IDENTITY`, with the storage URL, the auth token, when it
+    expires, and the auth method that obtained it. Expired entries are
+    dropped whenever the file is written. The auth key itself is not
+    stored, only a hash of it to tell when it has changed.
+
+    A process that needs to authenticate holds the lock while it does
+    so, see :py:meth:`lock`. Any other process needing to authenticate
+    waits for the lock, then reads the token just obtained instead of
+    authenticating again; so a fleet of processes makes about one auth
+    request per token lifetime. The file is replaced by renaming a new
+    one over it, so it can always be read without the lock.
+
+    A process waits at most lock_timeout seconds for the lock, so a
+    hung or hostile lock holder cannot block every other process; after
+    that it authenticates without the cache.
+
+    Locking needs the fcntl module; where it is missing, processes
+    simply do not wait for each other.
+
+    :param path: The path to the cache file. The lock is held on a
+        file of the same name with ``.lock`` appended.
+    :param sleep: Default: time.sleep. The ``func(seconds)`` to call
+        while waiting for the lock.
+    :param verbose: Set to a ``func(msg, *args)`` that will be called
+        with debug messages.
+    :param lock_timeout: Default: 60. The seconds to wait for the lock
+        before giving up on it.
+    """
+
+    def __init__(self, path, sleep=None, verbose=None, lock_timeout=60):
+        self.path = path
+        self.sleep = sleep or time.sleep
+        self.verbose = verbose or (lambda *a, **k: None)
+        self.lock_timeout = lock_timeout
+
+    @contextlib.contextmanager
+    def lock(self):
+        """
+        A context manager holding the cache's lock, for as long as it
+        takes to authenticate and :py:meth:`save` the result.
+
+        It gives True if the lock is held, or False if the lock could
+        not be had within lock_timeout seconds, in which case the cache
+        should be left alone.
+        """
+        if not fcntl:
+            yield True
+            return
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            waiting = False
+            give_up = time.time() + self.lock_timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except IOError as err:
+                    if err.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                if not waiting:
+                    self.verbose(
+                        'Waiting for another process to authenticate.')
+                    waiting = True
+                if time.time() >= give_up:
+                    self.verbose(
+                        'Gave up waiting %ss for auth cache lock %r.',
+                        self.lock_timeout, self.path + '.lock')
+                    yield False
+                    return
+                # Polling rather than blocking so other green threads
+                # keep running.
+                self.sleep(0.05)
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as fp:
+                entries = json.load(fp)
+            if not isinstance(entries, list):
+                raise ValueError('not a list')
+            return entries
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                self.verbose(
+                    'Could not read auth cache %r: %s', self.path, err)
+        except ValueError as err:
+            self.verbose(
+                'Auth cache %r was unrecognized format; discarding: %s',
+                self.path, err)
+        return []
+
+    def load(self, identity, auth_key, expired=False):
+        """
+        Returns the cached entry for the auth settings, a dict, or None
+        if there is no entry, it is for a different auth key, or it has
+        expired.
+
+        :param identity: A dict of the :py:data:`IDENTITY` settings.
+        :param auth_key: The key used to authenticate.
+        :param expired: Default: False. If True, an expired entry is
+            returned as well, for the values that outlive its token,
+            such as the ``auth_method`` that obtained it.
+        """
+        now = time.time()
+        for entry in self._read():
+            if not isinstance(entry, dict) or \
+                    any(entry.get(n) != identity[n] for n in IDENTITY):
+                continue
+            if entry.get('key_hash') != _key_hash(auth_key):
+                self.verbose(
+                    'Auth cache %r is for a different key; ignoring.',
+                    self.path)
+                return None
+            if not expired and entry.get('auth_expires') and \
+                    entry['auth_expires'] <= now:
+                self.verbose(
+                    'Auth cache %r holds an expired token; ignoring.',
+                    self.path)
+                return None
+            return entry
+        return None
+
+    def save(self, identity, auth_key, values):
+        """
+        Stores the auth values for the auth settings, replacing any
+        earlier entry for them and dropping any expired entries. This
+        should be called while holding the :py:meth:`lock`.
+
+        :param identity: A dict of the :py:data:`IDENTITY` settings.
+        :param auth_key: The key used to authenticate.
+        :param values: A dict of the values to store, such as
+            ``storage_url``, ``auth_token`` and ``auth_expires``.
+        """
+        now = time.time()
+        entries = []
+        for entry in self._read():
+            if not isinstance(entry, dict) or \
+                    all(entry.get(n) == identity[n] for n in IDENTITY) or \
+                    (entry.get('auth_expires') and
+                     entry['auth_expires'] <= now):
+                continue
+            entries.append(entry)
+        entry = dict(values)
+        entry.update(identity)
+        entry['key_hash'] = _key_hash(auth_key)
+        entries.append(entry)
+        # The new file is made next to the cache so the rename cannot
+        # cross file systems; mkstemp makes it readable by the owner
+        # only.
+        fd, path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix='.' + os.path.basename(self.path))
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(entries, fp)
+            os.rename(path, self.path)
+        except Exception:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            raise
+
+
+def _key_hash(auth_key):
+    return hashlib.sha256(auth_key or '').hexdigest()
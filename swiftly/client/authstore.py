@@ -0,0 +1,84 @@
+"""
+Contains the AuthStore class that lets a set of clients share one
+auth token.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+
+
+class AuthStore(object):
+    """
+    Holds the auth values, such as the storage URL and auth token,
+    shared by a set of clients, usually all those created by one
+    :py:class:`swiftly.client.manager.ClientManager`.
+
+    Only one client authenticates at a time; any other client needing
+    new auth values while that is happening waits for it to finish and
+    then uses the values it obtained. This way a burst of concurrent
+    requests, or a burst of 401 responses when a token is revoked,
+    causes just one auth request.
+
+    Each time new values are stored the generation is incremented, so
+    a client can tell whether the values it is using are current.
+    """
+
+    def __init__(self):
+        #: The auth values last stored, a dict, or None if no client
+        #: has authenticated yet.
+        self.values = None
+        #: Incremented each time new values are stored.
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def store(self, values):
+        """
+        Stores new auth values, such as those read from a cache, for
+        all clients to use.
+        """
+        with self._lock:
+            self.values = values
+            self.generation += 1
+
+    def refresh(self, generation, auth_func, sleep):
+        """
+        Obtains new auth values unless some other client already has
+        since the given generation was seen.
+
+        :param generation: The generation of the values the caller is
+            using.
+        :param auth_func: The function to call to authenticate; it
+            should return the new values. This is called only if the
+            values are still at the given generation and no other
+            client is already authenticating.
+        :param sleep: The ``func(seconds)`` to call while waiting for
+            another client to finish authenticating.
+        :returns: True if auth_func was called, False if another
+            client obtained the new values.
+        """
+        while True:
+            if self.generation != generation:
+                return False
+            if self._lock.acquire(False):
+                try:
+                    if self.generation != generation:
+                        return False
+                    self.values = auth_func()
+                    self.generation += 1
+                    return True
+                finally:
+                    self._lock.release()
+            sleep(0.01)
@@ -16,8 +16,12 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import json
+import zlib
+
 from swiftly import VERSION
-from swiftly.client.utils import quote
+from swiftly.client.utils import iter_gunzip, iter_json_list, quote
+from swiftly.filelikeiter import FileLikeIter
 
 
 class Client(object):
@@ -30,7 +34,8 @@ class Client(object):
 
     To form a new concrete subclass, you would need to implement
     :py:func:`request` and :py:func:`get_account_hash` minimally and
-    optionally :py:func:`reset` and :py:func:`auth`.
+    optionally :py:func:`reset`, :py:func:`auth`, :py:func:`connect`,
+    and :py:func:`probe`.
     """
 
     def __init__(self):
@@ -48,6 +53,23 @@ class Client(object):
         """
         pass
 
+    def connect(self):
+        """
+        Opens any connections the client would need for its next
+        request, authenticating first if needed. This can be used to
+        warm up a set of clients before a burst of requests.
+        """
+        pass
+
+    def probe(self):
+        """
+        Checks any open but idle connections, closing those no longer
+        usable so the next request does not fail on them.
+
+        :returns: The number of connections closed.
+        """
+        return 0
+
     def auth(self):
         """
         Just performs any authentication steps without making an
@@ -149,7 +171,7 @@ class Client(object):
 
     def get_account(self, headers=None, prefix=None, delimiter=None,
                     marker=None, end_marker=None, limit=None, query=None,
-                    cdn=False, decode_json=True):
+                    cdn=False, decode_json=True, stream=False):
         """
         GETs the account and returns the results. This is done to list
         the containers for the account. Some useful headers are also
@@ -208,6 +230,13 @@ class Client(object):
         :param decode_json: If set False, the usual decoding of the
             JSON response will be skipped and the raw contents will
             be returned instead.
+        :param stream: If set True, the listing is read as it arrives
+            rather than all at once: with decode_json, contents is a
+            generator of the listing's items, decoded one at a time;
+            otherwise it is a file-like object of the raw JSON. Either
+            must be read to the end before the client is used again.
+            For responses other than 2xx, contents is a file-like
+            object of the response body.
         :returns: A tuple of (status, reason, headers, contents).
 
             :status: is an int for the HTTP status code.
@@ -216,7 +245,7 @@ class Client(object):
                 headers; if a header has multiple values, it will be a
                 list.
             :contents: is the decoded JSON response or the raw str
-                for the HTTP body.
+                for the HTTP body, or as described for stream.
         """
         query = dict(query or {})
         query['format'] = 'json'
@@ -230,9 +259,8 @@ class Client(object):
             query['end_marker'] = end_marker
         if limit:
             query['limit'] = limit
-        return self.request(
-            'GET', '', '', headers, decode_json=decode_json, query=query,
-            cdn=cdn)
+        return self._get_listing(
+            '', headers, query, cdn, decode_json, stream)
 
     def put_account(self, headers=None, query=None, cdn=False, body=None):
         """
@@ -370,7 +398,8 @@ class Client(object):
 
     def get_container(self, container, headers=None, prefix=None,
                       delimiter=None, marker=None, end_marker=None,
-                      limit=None, query=None, cdn=False, decode_json=True):
+                      limit=None, query=None, cdn=False, decode_json=True,
+                      stream=False):
         """
         GETs the container and returns the results. This is done to
         list the objects for the container. Some useful headers are
@@ -428,6 +457,13 @@ class Client(object):
         :param decode_json: If set False, the usual decoding of the
             JSON response will be skipped and the raw contents will
             be returned instead.
+        :param stream: If set True, the listing is read as it arrives
+            rather than all at once: with decode_json, contents is a
+            generator of the listing's items, decoded one at a time;
+            otherwise it is a file-like object of the raw JSON. Either
+            must be read to the end before the client is used again.
+            For responses other than 2xx, contents is a file-like
+            object of the response body.
         :returns: A tuple of (status, reason, headers, contents).
 
             :status: is an int for the HTTP status code.
@@ -436,7 +472,7 @@ class Client(object):
                 headers; if a header has multiple values, it will be a
                 list.
             :contents: is the decoded JSON response or the raw str
-                for the HTTP body.
+                for the HTTP body, or as described for stream.
         """
         query = dict(query or {})
         query['format'] = 'json'
@@ -450,9 +486,37 @@ class Client(object):
             query['end_marker'] = end_marker
         if limit:
             query['limit'] = limit
-        return self.request(
-            'GET', self._container_path(container), '', headers,
-            decode_json=decode_json, query=query, cdn=cdn)
+        return self._get_listing(
+            self._container_path(container), headers, query, cdn,
+            decode_json, stream)
+
+    def _get_listing(self, path, headers, query, cdn, decode_json, stream):
+        # GETs a listing, asking for it gzipped to save bandwidth, and
+        # decompresses and decodes it as get_account and get_container
+        # describe.
+        headers = dict(headers or {})
+        if not any(h.lower() == 'accept-encoding' for h in headers):
+            headers['accept-encoding'] = 'gzip'
+        status, reason, hdrs, contents = self.request(
+            'GET', path, '', headers, query=query, stream=stream, cdn=cdn)
+        if status // 100 != 2:
+            return status, reason, hdrs, contents
+        gzipped = hdrs.get('content-encoding', '').lower() == 'gzip'
+        if stream:
+            read = contents.read
+            chunks = iter(lambda: read(65536), '')
+            if gzipped:
+                chunks = iter_gunzip(chunks)
+            if decode_json:
+                contents = iter_json_list(chunks)
+            elif gzipped:
+                contents = FileLikeIter(chunks)
+        else:
+            if gzipped:
+                contents = zlib.decompress(contents, 16 + zlib.MAX_WBITS)
+            if decode_json:
+                contents = json.loads(contents) if contents else None
+        return status, reason, hdrs, contents
 
     def put_container(self, container, headers=None, query=None, cdn=False,
                       body=None):
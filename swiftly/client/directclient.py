@@ -17,11 +17,18 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import functools
 import json
 import StringIO
+import urllib
+from time import time
 
 from swiftly.client.client import Client
-from swiftly.client.utils import quote, headers_to_dict
+from swiftly.client.replicas import node_key
+from swiftly.client.retry import RetryPolicy
+from swiftly.client.spool import Spool
+from swiftly.client.utils import headers_to_dict, iter_reader, quote, \
+    response_readinto
 
 
 class DirectClient(Client):
@@ -37,7 +44,8 @@ class DirectClient(Client):
     :param swift_proxy_cdn_path: The path to the Swift account to use
         for CDN management (example: /v1/AUTH_test).
     :param attempts: The number of times to try requests if a server
-        error occurs (5xx response). Default: 5
+        error occurs (5xx response), or another status the retry_policy
+        retries. Default: 5
     :param eventlet: Default: None. If True, Eventlet will be used if
         installed. If False, Eventlet will not be used even if
         installed. If None, the default, Eventlet will be used if
@@ -50,14 +58,48 @@ class DirectClient(Client):
     :param verbose_id: Set to a string you wish verbose messages to
         be prepended with; can help in identifying output when
         multiple Clients are in use.
+    :param response_callback: Set to a ``func(status, elapsed)`` that
+        will be called after each request attempt with the response
+        status (0 if no response was obtained) and the seconds taken
+        to obtain it. See
+        :py:class:`swiftly.concurrency.AIMDController` for an
+        example use.
     :param direct_object_ring: The path to custom object ring to used
         by the DirectClient
+    :param retry_policy: Default: None. The
+        :py:class:`swiftly.client.retry.RetryPolicy` deciding which
+        failed requests are retried and how long to wait first. None
+        means a RetryPolicy with its defaults.
+    :param hedge: Default: None. A
+        :py:class:`swiftly.client.hedge.HedgePolicy`; if set, and the
+        Swift proxy code supports concurrent GETs, the proxy is told to
+        GET an object from another replica as well whenever the first
+        has not responded within the policy's delay, using whichever
+        responds first.
+    :param spool_memory: Default: None. If set, request bodies that
+        cannot seek, such as standard input or a pipe, are copied as
+        they are sent so that the request can be retried; up to this
+        many bytes are kept in memory and the rest in a temporary
+        file. See :py:class:`swiftly.client.spool.Spool`. None leaves
+        such requests unable to be retried.
+    :param replica_policy: Default: None. A
+        :py:class:`swiftly.client.replicas.ReplicaPolicy`; if set, object
+        GETs and HEADs without a query go straight to the object servers
+        holding the object's primary replicas, as found in the object
+        ring, rather than through the Swift proxy code. The replicas are
+        tried in the order the policy gives, moving on to the next should
+        one fail or not have the object. If none of them can answer, the
+        request goes through the proxy code after all, which also
+        handles handoff nodes. Only the ring of the default storage
+        policy, or the direct_object_ring, is used.
     """
 
     def __init__(self, swift_proxy=None, swift_proxy_storage_path=None,
                  swift_proxy_cdn_path=None, attempts=5, eventlet=None,
                  chunk_size=65536, verbose=None, verbose_id='',
-                 direct_object_ring=None):
+                 direct_object_ring=None, response_callback=None,
+                 retry_policy=None, hedge=None, spool_memory=None,
+                 replica_policy=None):
         super(DirectClient, self).__init__()
         self.storage_path = swift_proxy_storage_path
         self.cdn_path = swift_proxy_cdn_path
@@ -72,7 +114,13 @@ class DirectClient(Client):
         self._verbose_id = self.verbose_id
         if self._verbose_id:
             self._verbose_id += ' '
+        self.response_callback = response_callback
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge = hedge
+        self.spool_memory = spool_memory
+        self.replica_policy = replica_policy
         self.swift_proxy = swift_proxy
+        self.oring = None
         if not swift_proxy:
             self.verbose('Creating default proxy instance.')
             import swift.proxy.server
@@ -86,7 +134,7 @@ class DirectClient(Client):
                 self.Request = webob.Request
             self.swift_proxy = swift.proxy.server.Application(
                 {}, memcache=LocalMemcache(), logger=NullLogger())
-            self.oring = None
+
             def get_oring(*args):
                 return self.oring
 
@@ -122,6 +170,13 @@ class DirectClient(Client):
         """
         See :py:func:`swiftly.client.client.Client.request`
         """
+        if self.replica_policy and method in ('GET', 'HEAD') and \
+                not query and not cdn:
+            result = self._replica_request(method, path, headers, stream)
+            if result:
+                return result
+        # Only object GETs are hedged; listings are left alone.
+        object_get = method == 'GET' and '/' in path.lstrip('/')
         if query:
             path += '?' + '&'.join(
                 ('%s=%s' % (quote(k), quote(v)) if v else quote(k))
@@ -139,9 +194,29 @@ class DirectClient(Client):
                 tell = seek = None
         elif not contents:
             reset_func = lambda: None
+        if not tell and contents and self.spool_memory is not None:
+            # A copy is kept as the body is sent so it can be sent again,
+            # and discarded once the request is done.
+            spool = Spool(contents, self.spool_memory)
+            try:
+                return self._request(
+                    method, path, spool, headers, decode_json, stream, cdn,
+                    object_get, spool.reset)
+            finally:
+                spool.close()
+        return self._request(
+            method, path, contents, headers, decode_json, stream, cdn,
+            object_get, reset_func)
+
+    def _request(self, method, path, contents, headers, decode_json, stream,
+                 cdn, object_get, reset_func):
+        # Sends the request, retrying as the retry_policy allows; path
+        # already has any query string on it.
         status = 0
         reason = 'Unknown'
         attempt = 0
+        delay = 0
+        self.retry_policy.record_request()
         while attempt < self.attempts:
             attempt += 1
             if cdn:
@@ -154,6 +229,14 @@ class DirectClient(Client):
                 titled_headers.update(
                     (k.title(), v) for k, v in headers.iteritems())
             resp = None
+            hedge = self.hedge and method == 'GET' and \
+                hasattr(self.swift_proxy, 'concurrency_timeout')
+            if hedge:
+                hedge_delay = self.hedge.delay() if object_get else None
+                self.swift_proxy.concurrent_gets = hedge_delay is not None
+                if hedge_delay is not None:
+                    self.swift_proxy.concurrency_timeout = hedge_delay
+            begin = time()
             if not hasattr(contents, 'read'):
                 if method not in self.no_content_methods and contents and \
                         'Content-Length' not in titled_headers and \
@@ -194,32 +277,155 @@ class DirectClient(Client):
             status = resp.status_int
             reason = resp.status.split(' ', 1)[1]
             hdrs = headers_to_dict(resp.headers.items())
+            if hedge and object_get and status // 100 == 2:
+                self.hedge.record(time() - begin)
             if stream:
-                def iter_reader(size=-1):
-                    if size == -1:
-                        return ''.join(resp.app_iter)
-                    else:
-                        try:
-                            return resp.app_iter.next()
-                        except StopIteration:
-                            return ''
-                iter_reader.read = iter_reader
-                value = iter_reader
+                app_iter = resp.app_iter
+                if app_iter is None:
+                    app_iter = [resp.body]
+                value = iter_reader(app_iter, self.chunk_size)
             else:
                 value = resp.body
             self.verbose('< %s %s', status, reason)
-            if status and status // 100 != 5:
+            if self.response_callback:
+                self.response_callback(status, time() - begin)
+            if attempt < self.attempts:
+                delay = self.retry_policy.delay(status, delay, hdrs)
+            else:
+                delay = None
+            if delay is None and status and status // 100 != 5:
                 if not stream and decode_json and status // 100 == 2:
                     if value:
                         value = json.loads(value)
                     else:
                         value = None
                 return (status, reason, hdrs, value)
+            if stream:
+                value.close()
+            if delay is None:
+                break
+            self.verbose('Retrying in %.2fs', delay)
             if reset_func:
                 reset_func()
-            self.sleep(2 ** attempt)
+            self.sleep(delay)
         raise Exception('%s %s failed: %s %s' % (method, path, status, reason))
 
+    def _object_ring(self):
+        if self.oring:
+            return self.oring
+        get_object_ring = getattr(self.swift_proxy, 'get_object_ring', None)
+        if get_object_ring:
+            return get_object_ring(None)
+        return getattr(self.swift_proxy, 'object_ring', None)
+
+    def get_object_nodes(self, container, obj):
+        """
+        Returns the list of primary nodes holding the object, dicts as
+        given by the object ring's get_nodes, or an empty list if there
+        is no object ring.
+        """
+        ring = self._object_ring()
+        if not ring:
+            return []
+        if isinstance(container, unicode):
+            container = container.encode('utf8')
+        if isinstance(obj, unicode):
+            obj = obj.encode('utf8')
+        account = urllib.unquote(self.storage_path.rsplit('/', 1)[1])
+        return ring.get_nodes(account, container, obj)[1]
+
+    def _replica_request(self, method, path, headers, stream):
+        # Sends the object request straight to the object servers holding
+        # its primary replicas, in the replica_policy's order. Returns
+        # None if no replica could answer, or the object is segmented,
+        # leaving the request to the proxy code.
+        try:
+            container, obj = urllib.unquote(path).lstrip('/').split('/', 1)
+        except ValueError:
+            return None
+        ring = self._object_ring()
+        if not container or not obj or not ring:
+            return None
+        from swift.common.bufferedhttp import BufferedHTTPConnection
+        account = urllib.unquote(self.storage_path.rsplit('/', 1)[1])
+        backend_path = '/%s/%s/%s' % (account, container, obj)
+        part, nodes = ring.get_nodes(account, container, obj)
+        titled_headers = {'User-Agent': self.user_agent}
+        if headers:
+            titled_headers.update(
+                (k.title(), v) for k, v in headers.iteritems())
+        conn_timeout = getattr(self.swift_proxy, 'conn_timeout', 0.5)
+        node_timeout = getattr(self.swift_proxy, 'node_timeout', 10)
+        start = time()
+        for node in self.replica_policy.order(nodes):
+            self.verbose(
+                '> %s %s/%s%s', method, node_key(node), part, backend_path)
+            begin = time()
+            conn = None
+            try:
+                # Socket timeouts rather than eventlet's, so they hold
+                # with any concurrency backend; node_timeout then limits
+                # each read, including those of a streamed body.
+                conn = BufferedHTTPConnection(
+                    '%s:%s' % (node['ip'], node['port']),
+                    timeout=conn_timeout)
+                conn.connect()
+                conn.sock.settimeout(node_timeout)
+                conn.putrequest(
+                    method, quote('/%s/%s%s' % (
+                        node['device'], part, backend_path)),
+                    skip_host='Host' in titled_headers)
+                for name, value in titled_headers.iteritems():
+                    conn.putheader(name, value)
+                conn.endheaders()
+                resp = conn.getresponse()
+            except Exception as err:
+                self.verbose('< - %s', err)
+                self.replica_policy.record(node, time() - begin, False)
+                if conn:
+                    conn.close()
+                continue
+            elapsed = time() - begin
+            status = resp.status
+            self.verbose('< %s %s', status, resp.reason)
+            self.replica_policy.record(node, elapsed, status // 100 != 5)
+            if status == 404 or status // 100 == 5:
+                # Another replica, or a handoff node the proxy code knows
+                # of, may well have it.
+                resp.close()
+                conn.close()
+                continue
+            hdrs = headers_to_dict(resp.getheaders())
+            if hdrs.get('x-object-manifest') or \
+                    hdrs.get('x-static-large-object', '').lower() == 'true':
+                # Only the proxy middleware assembles segmented objects;
+                # an object server would give back the manifest itself.
+                self.verbose(
+                    'Segmented object; trying through the proxy code.')
+                resp.close()
+                conn.close()
+                return None
+            if stream:
+                value = resp
+                value.readinto = functools.partial(response_readinto, resp)
+            else:
+                try:
+                    value = resp.read()
+                except Exception as err:
+                    self.verbose('< - %s', err)
+                    self.replica_policy.record(node, time() - begin, False)
+                    conn.close()
+                    continue
+                resp.close()
+            # Only the outcome is reported, not the replicas that failed
+            # on the way, so a concurrency controller is not told to
+            # back off from a request that succeeded.
+            if self.response_callback:
+                self.response_callback(status, time() - start)
+            return (status, resp.reason, hdrs, value)
+        self.verbose('No replica answered; trying through the proxy code.')
+        return None
+
     def get_account_hash(self):
         """
         See :py:func:`swiftly.client.client.Client.get_account_hash`
@@ -0,0 +1,270 @@
+"""
+Contains the EndpointPool class that spreads requests across several
+Swift proxy endpoints.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import random
+import socket
+import threading
+import time
+import urlparse
+
+
+#: The selection methods available to
+#: :py:class:`EndpointPool`.
+SELECTIONS = ('least-outstanding', 'ewma')
+
+
+def resolve_endpoints(host, port):
+    """
+    Returns the list of ``address:port`` netlocs for every address the
+    host name resolves to, IPv6 addresses in brackets.
+
+    :raises socket.gaierror: If the host name cannot be resolved.
+    """
+    netlocs = []
+    for family, _junk, _junk, _junk, sockaddr in socket.getaddrinfo(
+            host, port, 0, socket.SOCK_STREAM):
+        if family == socket.AF_INET6:
+            netloc = '[%s]:%s' % (sockaddr[0], sockaddr[1])
+        else:
+            netloc = '%s:%s' % (sockaddr[0], sockaddr[1])
+        if netloc not in netlocs:
+            netlocs.append(netloc)
+    return netlocs
+
+
+class Endpoint(object):
+    """
+    One Swift proxy endpoint and its health, as tracked by an
+    :py:class:`EndpointPool`.
+
+    :param netloc: The ``host[:port]`` of the endpoint.
+    """
+
+    def __init__(self, netloc):
+        #: The ``host[:port]`` of the endpoint.
+        self.netloc = netloc
+        #: The number of requests in progress with the endpoint.
+        self.outstanding = 0
+        #: The moving average of the seconds for a response, or None
+        #: if none has been received yet.
+        self.latency = None
+        #: The number of requests to the endpoint that failed in a row.
+        self.failures = 0
+        #: The time the endpoint may be probed again if it has been
+        #: ejected, 0 if it is in use.
+        self.ejected_until = 0
+        #: True while a request is probing an ejected endpoint.
+        self.probing = False
+        #: The number of requests sent to the endpoint.
+        self.requests = 0
+        #: The number of requests to the endpoint that failed.
+        self.errors = 0
+
+    def __repr__(self):
+        return 'Endpoint(%r)' % self.netloc
+
+
+class EndpointPool(object):
+    """
+    Spreads requests across several Swift proxy endpoints, choosing one
+    for each new connection and keeping unhealthy endpoints out of use.
+
+    The endpoints may be given as a list, or resolved from every
+    address the storage URL's host name resolves to. In the latter
+    case, the addresses are resolved again every resolve_interval
+    seconds.
+
+    Each new connection goes to the endpoint with the fewest requests
+    in progress (``least-outstanding``) or with the lowest average
+    response time weighted by its requests in progress (``ewma``);
+    ties are broken at random. An endpoint that fails max_failures
+    requests in a row, by giving no response or a 5xx response, is
+    ejected for eject_time seconds. After that, one request probes it:
+    if that succeeds the endpoint is put back in use, otherwise it is
+    ejected again. If every endpoint is ejected, the one due to be
+    probed soonest is used anyway rather than failing outright.
+
+    An EndpointPool may be shared by many clients, even from several
+    threads at once, so that all of their requests are counted.
+
+    :param endpoints: Default: None. A list of ``host[:port]`` values
+        or URLs, only their host and port being used. If None, the
+        endpoints are resolved from the storage URL's host name.
+    :param selection: Default: ``least-outstanding``. One of
+        :py:data:`SELECTIONS`.
+    :param max_failures: Default: 3. The failures in a row that eject
+        an endpoint.
+    :param eject_time: Default: 30. The seconds an ejected endpoint is
+        left out of use before it is probed.
+    :param decay: Default: 0.3. The weight given to each new response
+        time in an endpoint's moving average.
+    :param resolve_interval: Default: 300. The seconds between
+        resolving the storage URL's host name again, if endpoints is
+        None.
+    :param verbose: Set to a ``func(msg, *args)`` that will be called
+        when endpoints are ejected or put back in use.
+    """
+
+    def __init__(self, endpoints=None, selection='least-outstanding',
+                 max_failures=3, eject_time=30, decay=0.3,
+                 resolve_interval=300, verbose=None):
+        if selection not in SELECTIONS:
+            raise ValueError(
+                'Unknown endpoint selection %r; should be one of %s' %
+                (selection, ', '.join(SELECTIONS)))
+        self.selection = selection
+        self.max_failures = max_failures
+        self.eject_time = eject_time
+        self.decay = decay
+        self.resolve_interval = resolve_interval
+        self.verbose = verbose or (lambda *a, **k: None)
+        #: The list of :py:class:`Endpoint` instances.
+        self.endpoints = []
+        self._resolve = not endpoints
+        self._resolved_for = None
+        self._resolve_at = 0
+        self._lock = threading.Lock()
+        for endpoint in endpoints or []:
+            if '//' in endpoint:
+                endpoint = urlparse.urlparse(endpoint).netloc
+            self.endpoints.append(Endpoint(endpoint))
+
+    def _refresh(self, host, port):
+        # Resolves the endpoints again, keeping the health of those
+        # still resolved to.
+        now = time.time()
+        if (host, port) == self._resolved_for and now < self._resolve_at:
+            return
+        self._resolve_at = now + self.resolve_interval
+        try:
+            netlocs = resolve_endpoints(host, port)
+        except socket.error as err:
+            self.verbose('Could not resolve %s: %s', host, err)
+            if self.endpoints:
+                return
+            netlocs = ['%s:%s' % (host, port)]
+        self._resolved_for = (host, port)
+        existing = dict((e.netloc, e) for e in self.endpoints)
+        self.endpoints = [existing.get(n) or Endpoint(n) for n in netlocs]
+        self.verbose('Resolved %s to %s', host, ' '.join(netlocs))
+
+    def _cost(self, endpoint):
+        if self.selection == 'ewma':
+            # Endpoints without a response yet cost nothing so each gets
+            # tried.
+            return (endpoint.latency or 0) * (endpoint.outstanding + 1)
+        return endpoint.outstanding
+
+    def choose(self, url=None):
+        """
+        Returns the :py:class:`Endpoint` a new connection should go to.
+
+        :param url: The storage URL; its host name is resolved if the
+            pool was not given a list of endpoints.
+        """
+        with self._lock:
+            if self._resolve and url:
+                parsed = urlparse.urlparse(url)
+                self._refresh(
+                    parsed.hostname,
+                    parsed.port or (443 if parsed.scheme == 'https' else 80))
+            now = time.time()
+            healthy = []
+            for endpoint in self.endpoints:
+                if not endpoint.ejected_until:
+                    healthy.append(endpoint)
+                elif endpoint.ejected_until <= now:
+                    # Should the probe never report back, the endpoint is
+                    # probed again after another eject_time.
+                    endpoint.ejected_until = now + self.eject_time
+                    endpoint.probing = True
+                    self.verbose('Probing endpoint %s', endpoint.netloc)
+                    return endpoint
+            if not healthy:
+                return min(self.endpoints, key=lambda e: e.ejected_until)
+            random.shuffle(healthy)
+            return min(healthy, key=self._cost)
+
+    def usable(self, endpoint):
+        """
+        Returns False if the endpoint has been ejected since it was
+        chosen, in which case its connections should not be reused.
+        """
+        return not endpoint.ejected_until or endpoint.probing
+
+    def start(self, endpoint):
+        """
+        Records that a request to the endpoint has begun.
+        """
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+    def release(self, endpoint):
+        """
+        Records that a request to the endpoint has ended without saying
+        anything of the endpoint's health or latency, such as when the
+        request was abandoned or failed on a connection the server had
+        already closed.
+        """
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+
+    def finish(self, endpoint, elapsed, ok):
+        """
+        Records that a request to the endpoint has ended.
+
+        :param endpoint: The :py:class:`Endpoint` the request went to.
+        :param elapsed: The seconds taken to get the response.
+        :param ok: False if there was no response or a 5xx response.
+        """
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if ok:
+                if endpoint.latency is None:
+                    endpoint.latency = elapsed
+                else:
+                    endpoint.latency += \
+                        self.decay * (elapsed - endpoint.latency)
+                endpoint.failures = 0
+                if endpoint.ejected_until:
+                    self.verbose(
+                        'Endpoint %s is back in use', endpoint.netloc)
+                    endpoint.ejected_until = 0
+                    endpoint.probing = False
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.probing or (
+                    not endpoint.ejected_until and
+                    endpoint.failures >= self.max_failures):
+                self.verbose(
+                    'Ejecting endpoint %s for %ss after %s failures',
+                    endpoint.netloc, self.eject_time, endpoint.failures)
+                endpoint.ejected_until = time.time() + self.eject_time
+                endpoint.probing = False
+
+    def stats(self):
+        """
+        Returns a list of ``(netloc, requests, errors, latency)`` for
+        each endpoint.
+        """
+        with self._lock:
+            return [(e.netloc, e.requests, e.errors, e.latency)
+                    for e in self.endpoints]
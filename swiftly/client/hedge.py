@@ -0,0 +1,79 @@
+"""
+Contains the HedgePolicy class that decides when clients send a
+duplicate of a slow GET request.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import collections
+import math
+import threading
+
+
+class HedgePolicy(object):
+    """
+    Decides when clients hedge GET requests: if the response to a GET
+    has not started arriving within a percentile of the recent times
+    to the first byte, a duplicate request is sent on another
+    connection and whichever responds first is used.
+
+    With a percentile of 95, about one request in twenty is hedged,
+    while the occasional request stuck behind a slow proxy or disk
+    takes little longer than a typical one.
+
+    A policy may be shared by many clients so they all learn from each
+    other's response times.
+
+    :param percentile: Default: 95. The percentile of recent times to
+        the first byte after which a request is hedged.
+    :param window: Default: 100. The number of recent times kept.
+    :param minimum_samples: Default: 10. The number of times needed
+        before any request is hedged.
+    :param minimum_delay: Default: 0.01. The fewest seconds to wait
+        before hedging a request.
+    """
+
+    def __init__(self, percentile=95, window=100, minimum_samples=10,
+                 minimum_delay=0.01):
+        if not 0 < percentile <= 100:
+            raise ValueError(
+                'Hedge percentile should be more than 0 and at most 100; '
+                'got %r' % percentile)
+        self.percentile = percentile
+        self.minimum_samples = minimum_samples
+        self.minimum_delay = minimum_delay
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Records the seconds a GET request took to start receiving its
+        response.
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def delay(self):
+        """
+        Returns the seconds to wait for the first byte of a response
+        before hedging the request, or None if not enough times have
+        been recorded yet.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.minimum_samples:
+            return None
+        index = int(math.ceil(self.percentile / 100.0 * len(samples))) - 1
+        return max(self.minimum_delay, samples[max(0, index)])
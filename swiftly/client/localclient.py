@@ -54,6 +54,38 @@ SUBS = [
 # Note that _- is reserved for use as the start of internal data file names.
 
 
+class _RangeFile(object):
+    # Reads just size bytes of an open file from where it is positioned,
+    # closing it once they have been read.
+
+    def __init__(self, fp, size):
+        self.fp = fp
+        self.left = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self.left:
+            size = self.left
+        data = self.fp.read(size) if size else ''
+        self.left -= len(data)
+        if not data:
+            self.close()
+        return data
+
+    def readinto(self, b):
+        view = memoryview(b)
+        if len(view) > self.left:
+            view = view[:self.left]
+        size = self.fp.readinto(view) if len(view) else 0
+        self.left -= size
+        if not size:
+            self.close()
+        return size
+
+    def close(self):
+        self.left = 0
+        self.fp.close()
+
+
 def _encode_name(name):
     for a, b in SUBS:
         name = name.replace(a, b)
@@ -66,6 +98,25 @@ def _decode_name(name):
     return name
 
 
+def _parse_range(value, size):
+    # Returns the (start, end) of a single byte range header value, or None
+    # if there is no usable range; multiple ranges are not supported.
+    if not value or not value.startswith('bytes=') or ',' in value:
+        return None
+    try:
+        start, end = value[6:].split('-', 1)
+        if not start:
+            start, end = max(0, size - int(end)), size - 1
+        else:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start > end:
+        return None
+    return start, end
+
+
 @contextmanager
 def lock_dir(path):
     path = path_join(path, '_-lock')
@@ -494,8 +545,25 @@ class LocalClient(Client):
                 content_length = getsize(local_path)
                 hdrs['content-length'] = str(content_length)
                 status = 200 if content_length else 204
+                byte_range = None
+                if method == 'GET':
+                    byte_range = _parse_range(
+                        dict((k.lower(), v) for k, v in headers.iteritems()
+                             ).get('range'), content_length)
                 if method == 'HEAD':
                     body = ''
+                elif byte_range:
+                    start, end = byte_range
+                    status = 206
+                    reason = 'Partial Content'
+                    hdrs['content-length'] = str(end - start + 1)
+                    hdrs['content-range'] = 'bytes %d-%d/%d' % (
+                        start, end, content_length)
+                    body = open(local_path, 'rb')
+                    body.seek(start)
+                    body = _RangeFile(body, end - start + 1)
+                    if not stream:
+                        body = body.read()
                 else:
                     body = open(local_path, 'rb')
                     if not stream:
@@ -18,13 +18,62 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import contextlib
-import Queue
+import threading
+import time
+
+from swiftly.concurrency import default_backend
+
+
+class ClientManagerTimeout(Exception):
+    """
+    Raised by :py:func:`ClientManager.get_client` when no client became
+    available within the acquire_timeout.
+    """
+    pass
 
 
 class ClientManager(object):
     """
     Can be used to manage a set of clients.
 
+    The ClientManager may be used from several threads at once, with
+    each client being handed to just one thread at a time.
+
+    Unused clients are kept in a pool and handed out most recently
+    used first, so a steady set of clients and their keep-alive
+    connections stays busy while the rest sit idle until evicted.
+    Each client's idle connections are probed before the client is
+    handed out again, so connections the server has closed are not
+    used.
+
+    The following keyword args are used by the ClientManager itself
+    rather than being given to the client constructor:
+
+    ===============  ===================================================
+    max_clients      Default: None. The most clients that may exist at
+                     once; get_client waits for one to be put back when
+                     this many are in use. None means no limit.
+    acquire_timeout  Default: None. The seconds get_client will wait
+                     for a client before raising
+                     :py:class:`ClientManagerTimeout`. None means wait
+                     as long as it takes.
+    idle_timeout     Default: 60. The seconds a client may sit unused
+                     in the pool before it is reset and discarded.
+                     None means never discard.
+    backend          Default: None. The name of the concurrency backend
+                     the clients are used with, one of
+                     :py:data:`swiftly.concurrency.BACKENDS`; waits for
+                     a client are green only with ``eventlet``.
+                     If None, it is chosen by
+                     :py:func:`swiftly.concurrency.default_backend`
+                     from any ``eventlet`` keyword arg.
+    ===============  ===================================================
+
+    :py:attr:`stats` counts ``hits`` (pooled clients handed out),
+    ``creates`` (new clients), ``waits`` (calls that had to wait), and
+    ``evictions`` (idle clients discarded). See conn_stats for
+    connection counts.
+
     :param client_class: The class to create when a new client is
         needed.
     :param args: The args for the client constructor.
@@ -33,27 +82,122 @@ class ClientManager(object):
 
     def __init__(self, client_class, *args, **kwargs):
         self.client_class = client_class
+        self.max_clients = kwargs.pop('max_clients', None)
+        self.acquire_timeout = kwargs.pop('acquire_timeout', None)
+        self.idle_timeout = kwargs.pop('idle_timeout', 60)
+        self.backend = kwargs.pop('backend', None) or \
+            default_backend(kwargs.get('eventlet'))
         self.args = args
         self.kwargs = kwargs
-        self.clients = Queue.Queue()
+        #: The unused clients as (last_used, client) tuples, most
+        #: recently used last.
+        self.clients = []
         self.client_id = 0
+        self.client_count = 0
+        self.stats = {'hits': 0, 'creates': 0, 'waits': 0, 'evictions': 0}
+        self._retired_conn_stats = {}
+        self._lock = threading.Lock()
+        condition_class = threading.Condition
+        if self.backend == 'eventlet':
+            from eventlet.green import threading as green_threading
+            condition_class = green_threading.Condition
+        #: Notified whenever a client is put back or a place for a new
+        #: one frees up.
+        self._available = condition_class(self._lock)
+
+    def _evict(self, now):
+        # Called with self._lock held; the oldest clients are first.
+        evicted = []
+        if self.idle_timeout is not None:
+            while self.clients and \
+                    now - self.clients[0][0] >= self.idle_timeout:
+                client = self.clients.pop(0)[1]
+                self._add_conn_stats(self._retired_conn_stats, client)
+                evicted.append(client)
+                self.client_count -= 1
+                self.stats['evictions'] += 1
+        return evicted
 
-    def get_client(self):
+    def _add_conn_stats(self, totals, client):
+        for name, count in getattr(client, 'conn_stats', {}).iteritems():
+            totals[name] = totals.get(name, 0) + count
+
+    def conn_stats(self):
+        """
+        Returns the connection counts, such as those of
+        :py:attr:`swiftly.client.standardclient.StandardClient.conn_stats`,
+        totalled across the pooled clients and those already evicted.
+        Clients in use at the time are not included.
+        """
+        with self._lock:
+            totals = dict(self._retired_conn_stats)
+            for last_used, client in self.clients:
+                self._add_conn_stats(totals, client)
+        return totals
+
+    def get_client(self, block=True):
         """
         Obtains a client for use, whether an existing unused client
         or a brand new one if none are available.
+
+        :param block: Default: True. If max_clients are already in use,
+            True waits for one to be put back, up to the
+            acquire_timeout, while False returns None right away.
+        :raises ClientManagerTimeout: If no client became available
+            within the acquire_timeout.
         """
         client = None
+        create = False
+        began = None
+        evicted = []
         try:
-            client = self.clients.get(block=False)
-        except Queue.Empty:
-            pass
-        if not client:
-            self.client_id += 1
+            with self._available:
+                while True:
+                    now = time.time()
+                    evicted.extend(self._evict(now))
+                    if self.clients:
+                        client = self.clients.pop()[1]
+                        self.stats['hits'] += 1
+                        break
+                    if not self.max_clients or \
+                            self.client_count < self.max_clients:
+                        self.client_count += 1
+                        self.client_id += 1
+                        client_id = self.client_id
+                        create = True
+                        break
+                    if not block:
+                        break
+                    if began is None:
+                        began = now
+                        self.stats['waits'] += 1
+                    timeout = None
+                    if self.acquire_timeout is not None:
+                        timeout = began + self.acquire_timeout - now
+                        if timeout <= 0:
+                            raise ClientManagerTimeout(
+                                'No client became available within %ss; '
+                                'all %s are in use.' %
+                                (self.acquire_timeout, self.max_clients))
+                    self._available.wait(timeout)
+        finally:
+            for old in evicted:
+                old.reset()
+        if create:
             kwargs = dict(self.kwargs)
-            kwargs['verbose_id'] = kwargs.get(
-                'verbose_id', '') + str(self.client_id)
-            client = self.client_class(*self.args, **kwargs)
+            kwargs['verbose_id'] = \
+                kwargs.get('verbose_id', '') + str(client_id)
+            try:
+                client = self.client_class(*self.args, **kwargs)
+            except BaseException:
+                with self._available:
+                    self.client_count -= 1
+                    self._available.notify()
+                raise
+            with self._lock:
+                self.stats['creates'] += 1
+        elif client:
+            client.probe()
         return client
 
     def put_client(self, client):
@@ -63,7 +207,33 @@ class ClientManager(object):
         get_client was used to obtain the client; with_client is a
         context manager that does this for you.
         """
-        self.clients.put(client)
+        now = time.time()
+        with self._available:
+            self.clients.append((now, client))
+            evicted = self._evict(now)
+            self._available.notify()
+        for old in evicted:
+            old.reset()
+
+    def warm(self, count):
+        """
+        Makes sure up to count clients, within max_clients, have their
+        connections open and are ready in the pool. Call this before a
+        burst of concurrent requests so the connections are not all
+        opened at once.
+        """
+        clients = []
+        try:
+            while len(clients) < count:
+                client = self.get_client(block=False)
+                if not client:
+                    break
+                clients.append(client)
+            for client in clients:
+                client.connect()
+        finally:
+            for client in clients:
+                self.put_client(client)
 
     @contextlib.contextmanager
     def with_client(self):
@@ -71,7 +241,16 @@ class ClientManager(object):
         A context manager that obtains a client for use, whether an
         existing unused client or a brand new one if none are
         available.
+
+        If the block raises an exception, or its green thread is
+        killed, the client is reset before it is put back since the
+        state of its connections can no longer be certain.
         """
         client = self.get_client()
-        yield client
-        self.put_client(client)
+        try:
+            yield client
+        except BaseException:
+            client.reset()
+            raise
+        finally:
+            self.put_client(client)
@@ -0,0 +1,104 @@
+"""
+Contains the ReplicaPolicy class that decides which object server a
+DirectClient reads an object's replica from.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import random
+import threading
+import time
+
+
+def node_key(node):
+    """
+    Returns the ``ip:port/device`` string identifying a ring node, a
+    dict as returned by the ring's get_nodes.
+    """
+    return '%s:%s/%s' % (node['ip'], node['port'], node['device'])
+
+
+class ReplicaPolicy(object):
+    """
+    Decides the order in which a
+    :py:class:`swiftly.client.directclient.DirectClient` tries the
+    primary nodes of an object when reading it from the object servers
+    directly rather than through the Swift proxy code.
+
+    Each device keeps a moving average of its response times. The
+    replicas are tried fastest first, with devices not yet timed tried
+    before any that have been so that each gets measured; ties are
+    broken at random. A device that gives no response or a 5xx
+    response is tried last for eject_time seconds.
+
+    A policy may be shared by many clients so they all learn from each
+    other's response times.
+
+    :param decay: Default: 0.3. The weight given to each new response
+        time in a device's moving average.
+    :param eject_time: Default: 30. The seconds a device that failed
+        is tried after the others.
+    """
+
+    def __init__(self, decay=0.3, eject_time=30):
+        self.decay = decay
+        self.eject_time = eject_time
+        self._latency = {}
+        self._ejected_until = {}
+        self._lock = threading.Lock()
+
+    def order(self, nodes):
+        """
+        Returns the list of nodes given in the order they should be
+        tried.
+        """
+        now = time.time()
+        with self._lock:
+            ranked = []
+            for node in nodes:
+                key = node_key(node)
+                ranked.append((
+                    self._ejected_until.get(key, 0) > now,
+                    self._latency.get(key, 0), random.random(), node))
+        ranked.sort(key=lambda r: r[:3])
+        return [r[3] for r in ranked]
+
+    def record(self, node, elapsed, ok):
+        """
+        Records the seconds a node took to respond to a request.
+
+        :param node: The ring node, a dict, the request went to.
+        :param elapsed: The seconds taken to get the response.
+        :param ok: False if there was no response or a 5xx response.
+        """
+        key = node_key(node)
+        with self._lock:
+            if not ok:
+                self._ejected_until[key] = time.time() + self.eject_time
+                return
+            self._ejected_until.pop(key, None)
+            latency = self._latency.get(key)
+            if latency is None:
+                self._latency[key] = elapsed
+            else:
+                self._latency[key] = latency + self.decay * (elapsed - latency)
+
+    def stats(self):
+        """
+        Returns a dict of ``ip:port/device`` to the moving average of
+        the seconds each device has taken to respond.
+        """
+        with self._lock:
+            return dict(self._latency)
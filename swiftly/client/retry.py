@@ -0,0 +1,210 @@
+"""
+Contains the RetryPolicy and RetryBudget classes that decide whether
+clients retry failed requests and how long they wait first.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import email.utils
+import random
+import threading
+import time
+
+
+#: The default retry rules, in the format accepted by
+#: :py:func:`parse_retry_rules`: requests that got no response or a 5xx
+#: response are retried with the normal backoff, and requests that got
+#: 429 Too Many Requests or 498 Rate Limited with four times that.
+DEFAULT_RETRY_RULES = '0:1,5xx:1,429:4,498:4'
+
+
+def parse_retry_rules(value):
+    """
+    Returns a dict of retry rules parsed from a string such as
+    ``0:1,5xx:1,429:4,498:4``.
+
+    Each comma separated rule is a status and a backoff factor. The
+    status may be an exact status, such as ``503``, or a class of
+    statuses, such as ``5xx``; ``0`` stands for requests that got no
+    response at all. The factor multiplies the backoff for that
+    status; a factor of 0 disables retries for it. Exact statuses take
+    precedence over classes.
+
+    :raises ValueError: If the string cannot be parsed.
+    """
+    rules = {}
+    for rule in value.split(','):
+        rule = rule.strip()
+        if not rule:
+            continue
+        status, factor = rule.split(':', 1)
+        status = status.strip().lower()
+        if len(status) == 3 and status.endswith('xx'):
+            status = status[0] + 'xx'
+            int(status[0])
+        else:
+            status = int(status)
+        rules[status] = float(factor)
+    return rules
+
+
+def parse_retry_after(value):
+    """
+    Returns the seconds to wait indicated by a Retry-After header
+    value, which may be a number of seconds or an HTTP date, or None if
+    the value cannot be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if not parsed:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+
+class RetryBudget(object):
+    """
+    Limits the retries made by a set of clients, usually all those used
+    by one command, to a fraction of the requests they make.
+
+    Without a budget, a cluster that is failing most requests sees
+    each of them retried every attempt, multiplying the load just when
+    it can least take it. With a budget, once the retries reach the
+    minimum plus the ratio of requests made, further failures are
+    returned without retrying until more requests have succeeded in
+    earning retries back.
+
+    :param ratio: Default: 0.2. The retries allowed per request made.
+    :param minimum: Default: 10. The retries allowed regardless of the
+        number of requests made, so small jobs may still retry fully.
+    """
+
+    def __init__(self, ratio=0.2, minimum=10):
+        self.ratio = ratio
+        self.minimum = minimum
+        #: The number of requests made.
+        self.requests = 0
+        #: The number of retries made.
+        self.retries = 0
+        #: The number of retries refused because the budget was spent.
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """
+        Records that a request has been made, earning a fraction of a
+        retry.
+        """
+        with self._lock:
+            self.requests += 1
+
+    def spend(self):
+        """
+        Returns True and records a retry if the budget allows one;
+        returns False otherwise.
+        """
+        with self._lock:
+            if self.retries >= self.minimum + self.ratio * self.requests:
+                self.refused += 1
+                return False
+            self.retries += 1
+            return True
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a client retries a failed request and how long it
+    waits first.
+
+    Waits use "decorrelated jitter": each is a random time between the
+    backoff and three times the previous wait (or the backoff, for the
+    first retry), up to max_backoff. This grows the waits much like
+    doubling them would, but spreads out the retries of many concurrent
+    requests that failed at the same moment instead of having them all
+    retry at the same instant again.
+
+    If the response includes a Retry-After header, the wait is at
+    least the time it indicates, up to max_backoff.
+
+    A policy may be shared by many clients; all of its state is in its
+    budget.
+
+    :param backoff: Default: 1. The shortest wait in seconds, before
+        the factor for the status is applied.
+    :param max_backoff: Default: 60. The longest wait in seconds.
+    :param rules: Default: :py:data:`DEFAULT_RETRY_RULES`. The statuses
+        to retry and their backoff factors, either a dict as returned
+        by :py:func:`parse_retry_rules` or a string it accepts.
+    :param budget: Default: None. A :py:class:`RetryBudget` limiting
+        the retries made; None means retries are limited only by the
+        attempts a client makes.
+    """
+
+    def __init__(self, backoff=1, max_backoff=60, rules=None, budget=None):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        if rules is None:
+            rules = DEFAULT_RETRY_RULES
+        if isinstance(rules, basestring):
+            rules = parse_retry_rules(rules)
+        self.rules = rules
+        self.budget = budget
+
+    def factor(self, status):
+        """
+        Returns the backoff factor for the status, 0 if requests
+        getting the status should not be retried.
+        """
+        factor = self.rules.get(status)
+        if factor is None and status:
+            factor = self.rules.get('%dxx' % (status // 100))
+        return factor or 0
+
+    def record_request(self):
+        """
+        Records that a request, not counting its retries, has been
+        made.
+        """
+        if self.budget:
+            self.budget.record_request()
+
+    def delay(self, status, previous=0, headers=None):
+        """
+        Returns the seconds to wait before retrying a request that got
+        the status, or None if it should not be retried.
+
+        :param status: The status of the response, 0 if there was none.
+        :param previous: The seconds waited before the previous attempt
+            of the request, 0 if this is its first retry.
+        :param headers: The response headers as a dict with lowercase
+            keys, if any.
+        """
+        factor = self.factor(status)
+        if not factor:
+            return None
+        if self.budget and not self.budget.spend():
+            return None
+        backoff = self.backoff * factor
+        delay = min(
+            self.max_backoff,
+            random.uniform(backoff, max(backoff, previous) * 3))
+        retry_after = parse_retry_after((headers or {}).get('retry-after'))
+        if retry_after is not None:
+            delay = max(delay, min(self.max_backoff, retry_after))
+        return delay
@@ -0,0 +1,74 @@
+"""
+Contains the Spool class that lets request bodies that cannot seek be
+sent again when a request is retried.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import tempfile
+
+
+class Spool(object):
+    """
+    Wraps a request body that cannot seek, such as standard input, a
+    pipe, or an encrypting
+    :py:class:`swiftly.filelikeiter.FileLikeIter`, keeping a copy of
+    everything read from it so that it can be read again from the
+    start if the request must be retried.
+
+    The copy is kept in memory until it grows past memory_size bytes,
+    and in a temporary file after that. The copy is discarded when the
+    Spool is closed or no longer referenced.
+
+    :param contents: The file-like object to read the body from.
+    :param memory_size: Default: 4194304 (4 MiB). The bytes kept in
+        memory before the copy is moved to a temporary file.
+    """
+
+    def __init__(self, contents, memory_size=4 * 1024 * 1024):
+        self.contents = contents
+        self._spool = tempfile.SpooledTemporaryFile(max_size=memory_size)
+        self._replaying = False
+
+    def read(self, size=-1):
+        """
+        Reads at most size bytes, or until EOF if size is negative or
+        omitted; after :py:meth:`reset` the bytes already read are read
+        again before any more are read from the body.
+        """
+        if self._replaying:
+            data = self._spool.read(size)
+            if data:
+                return data
+            self._replaying = False
+        if size < 0:
+            data = self.contents.read()
+        else:
+            data = self.contents.read(size)
+        self._spool.write(data)
+        return data
+
+    def reset(self):
+        """
+        Starts reading the body again from the beginning.
+        """
+        self._spool.seek(0)
+        self._replaying = True
+
+    def close(self):
+        """
+        Discards the copy of the body; the body itself is left open.
+        """
+        self._spool.close()
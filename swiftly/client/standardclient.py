@@ -16,16 +16,58 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import calendar
+import copy
 import errno
+import functools
 import json
 import os
+import select
+import socket
+import stat
 import StringIO
-import tempfile
+import sys
 import urlparse
-from time import time
+from time import strptime, time
 
+try:
+    from sendfile import sendfile
+except ImportError:
+    sendfile = getattr(os, 'sendfile', None)
+
+#: Linux's flag to hold back a partial packet for the data to follow;
+#: Python 2's socket module does not define it. 0 where unsupported.
+MSG_MORE = getattr(
+    socket, 'MSG_MORE', 0x8000 if sys.platform.startswith('linux') else 0)
+
+from swiftly.client.authcache import AuthCache
 from swiftly.client.client import Client
-from swiftly.client.utils import quote, headers_to_dict
+from swiftly.client.retry import RetryPolicy
+from swiftly.client.spool import Spool
+from swiftly.client.timeouts import Timeouts
+from swiftly.client.utils import connection_alive, headers_to_dict, quote, \
+    response_readinto
+from swiftly.concurrency import Concurrency
+
+
+def _parse_expires(value):
+    # Converts an ISO 8601 time, as used by Auth v2 for token expiry, to
+    # seconds since the epoch; returns None if it cannot be parsed.
+    if not value:
+        return None
+    try:
+        offset = 0
+        if value.endswith('Z'):
+            value = value[:-1]
+        elif len(value) > 19 and value[-6] in '+-':
+            offset = int(value[-5:-3]) * 3600 + int(value[-2:]) * 60
+            if value[-6] == '-':
+                offset = -offset
+            value = value[:-6]
+        return calendar.timegm(
+            strptime(value[:19], '%Y-%m-%dT%H:%M:%S')) - offset
+    except ValueError:
+        return None
 
 
 class StandardClient(Client):
@@ -38,16 +80,21 @@ class StandardClient(Client):
         not specified, the best order will try to be determined; but
         if you notice it keeps making useless auth attempts and that
         drives you crazy, you can override that here. All the
-        available auth methods are listed in the example.
+        available auth methods are listed in the example. Without this,
+        the method that last succeeded, as remembered by this client or
+        in the auth cache, is tried first.
     :param auth_url: The URL to the auth system.
     :param auth_tenant: The tenant to authenticate as, if needed.
         Default (if needed): same as auth_user.
     :param auth_user: The user to authenticate as.
     :param auth_key: The key to use when authenticating.
     :param auth_cache_path: Default: None. If set to a path, the
-        storage URL and auth token are cached in the file for reuse.
-        If there are already cached values in the file, they are used
-        without authenticating first.
+        storage URL and auth token are cached in the file for reuse,
+        until the token is due to be refreshed. If there are already
+        cached values in the file, they are used without
+        authenticating first. Processes sharing the file take turns
+        to authenticate and reuse each other's tokens. See
+        :py:class:`swiftly.client.authcache.AuthCache`.
     :param region: The region to access, if supported by auth
         (Example: DFW).
     :param snet: Uses the internalURL if Auth v2 is used or prepends
@@ -56,7 +103,8 @@ class StandardClient(Client):
         Cloud Files and wanting to use Rackspace ServiceNet. Default:
         False.
     :param attempts: The number of times to try requests if a server
-        error occurs (5xx response). Default: 5
+        error occurs (5xx response), or another status the retry_policy
+        retries. Default: 5
     :param eventlet: Default: None. If True, Eventlet will be used if
         installed. If False, Eventlet will not be used even if
         installed. If None, the default, Eventlet will be used if
@@ -71,13 +119,85 @@ class StandardClient(Client):
     :param verbose_id: Set to a string you wish verbose messages to
         be prepended with; can help in identifying output when
         multiple Clients are in use.
+    :param response_callback: Set to a ``func(status, elapsed)`` that
+        will be called after each request attempt with the response
+        status (0 if no response was obtained) and the seconds taken
+        to obtain it. See
+        :py:class:`swiftly.concurrency.AIMDController` for an
+        example use.
+    :param auth_store: Default: None. An
+        :py:class:`swiftly.client.authstore.AuthStore` shared with
+        other clients so that only one of them authenticates at a time
+        and the rest use the token it obtained.
+    :param auth_refresh: Default: 60. The seconds before the auth
+        token is due to expire that it will be refreshed, if the auth
+        system indicates when it expires.
+    :param keepalive_timeout: Default: 30. The seconds a connection
+        may sit idle and still be reused for the next request; 0 opens
+        a new connection for every request. Idle connections are also
+        checked before reuse, and a request that fails because the
+        server had closed a reused connection is retried right away on
+        a new connection without counting against attempts.
+    :param use_sendfile: Default: True. If True, request bodies that
+        are regular files of known length are sent over plain HTTP
+        connections with the sendfile system call, without copying
+        them through Python. On Python 2 this requires the pysendfile
+        package, installed with the ``sendfile`` extra; without it, and
+        for HTTPS, bodies are sent by reading chunk_size at a time.
+    :param retry_policy: Default: None. The
+        :py:class:`swiftly.client.retry.RetryPolicy` deciding which
+        failed requests are retried and how long to wait first. It may
+        be shared with other clients, along with its retry budget. None
+        means a RetryPolicy with its defaults.
+    :param endpoint_pool: Default: None. An
+        :py:class:`swiftly.client.endpoints.EndpointPool` choosing the
+        Swift proxy endpoint each new storage connection goes to,
+        instead of the host in the storage URL. The Host header still
+        names the storage URL's host. It is usually shared with other
+        clients so that all their requests are counted.
+    :param hedge: Default: None. A
+        :py:class:`swiftly.client.hedge.HedgePolicy`; if set, an object
+        GET whose response has not started within the policy's delay is
+        sent again on a new connection, to another endpoint if there is
+        an endpoint_pool, and the first to respond is used while the
+        other is closed.
+    :param expect_continue: Default: None. If set, request bodies
+        read from files that are larger than this many bytes, or of
+        unknown length, are sent with ``Expect: 100-continue``: the
+        headers go first and the body only once the server answers
+        100 Continue. A request that is going to fail, such as with
+        401 Unauthorized or 404 Not Found, then fails without sending
+        the body at all. None never sends the header.
+    :param expect_timeout: Default: 1. The seconds to wait for the
+        server to answer an ``Expect: 100-continue`` request before
+        sending the body anyway, for servers that ignore the header.
+    :param timeouts: Default: None. The
+        :py:class:`swiftly.client.timeouts.Timeouts` limiting how long
+        connecting, each read or write, and each request may take, and
+        the slowest transfer allowed. A request that runs out of time
+        is retried as one that got no response. None means no limits.
+    :param spool_memory: Default: None. If set, request bodies that
+        cannot seek, such as standard input or a pipe, are copied as
+        they are sent so that the request can be retried; up to this
+        many bytes are kept in memory and the rest in a temporary
+        file. See :py:class:`swiftly.client.spool.Spool`. None leaves
+        such requests unable to be retried.
+    :param auth_race: Default: False. If True, all the auth methods
+        that might be tried are tried at once, each with its own
+        connection, and the first to succeed is used. This saves the
+        time spent on methods the auth system rejects, at the cost of
+        the extra auth requests.
     """
 
     def __init__(self, auth_methods=None, auth_url=None, auth_tenant=None,
                  auth_user=None, auth_key=None, auth_cache_path=None,
                  region=None, snet=False, attempts=5, eventlet=None,
                  chunk_size=65536, http_proxy=None, verbose=None,
-                 verbose_id=''):
+                 verbose_id='', response_callback=None, auth_store=None,
+                 auth_refresh=60, keepalive_timeout=30, use_sendfile=True,
+                 retry_policy=None, endpoint_pool=None, hedge=None,
+                 expect_continue=None, expect_timeout=1, timeouts=None,
+                 spool_memory=None, auth_race=False):
         super(StandardClient, self).__init__()
         self.auth_methods = auth_methods
         self.auth_url = auth_url.rstrip('/') if auth_url else None
@@ -99,16 +219,48 @@ class StandardClient(Client):
         self._verbose_id = self.verbose_id
         if self._verbose_id:
             self._verbose_id += ' '
+        self.response_callback = response_callback
+        self.auth_store = auth_store
+        self.auth_refresh = auth_refresh
+        self.keepalive_timeout = keepalive_timeout
+        self.use_sendfile = use_sendfile
+        if use_sendfile and not sendfile:
+            self.verbose(
+                'sendfile is unavailable; install pysendfile to send file '
+                'bodies with it.')
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.endpoint_pool = endpoint_pool
+        self.hedge = hedge
+        self.expect_continue = expect_continue
+        self.expect_timeout = expect_timeout
+        self.timeouts = timeouts or Timeouts()
+        self.spool_memory = spool_memory
+        self.auth_race = auth_race
+        #: Counts of connections ``opened``, ``reused`` for another
+        #: request, found ``stale`` before reuse, and transparently
+        #: ``reconnected`` after failing on reuse; and of GET requests
+        #: ``hedged`` and ``hedge_wins`` where the duplicate responded
+        #: first.
+        self.conn_stats = {
+            'opened': 0, 'reused': 0, 'stale': 0, 'reconnected': 0,
+            'hedged': 0, 'hedge_wins': 0}
         self.auth_token = None
+        self.auth_expires = None
+        self.auth_refresh_at = None
+        #: The name of the auth method that last succeeded, such as
+        #: ``auth2key``.
+        self.auth_method = None
+        self._auth_generation = 0
         self.regions = []
         self.default_region = None
         self.storage_url = None
         self.cdn_url = None
-        self.conn_discard = None
+        self.conn_discard = 0
         self.storage_conn = None
         self.storage_path = None
         self.cdn_conn = None
         self.cdn_path = None
+        self._trampoline = None
         if eventlet is None:
             try:
                 import eventlet
@@ -123,6 +275,9 @@ class StandardClient(Client):
                 self.HTTPConnection = eventlet.green.httplib.HTTPConnection
                 self.HTTPSConnection = eventlet.green.httplib.HTTPSConnection
                 self.HTTPException = eventlet.green.httplib.HTTPException
+                self.BadStatusLine = eventlet.green.httplib.BadStatusLine
+                import eventlet.hubs
+                self._trampoline = eventlet.hubs.trampoline
                 try:
                     import swift.common.bufferedhttp
                     self.HTTPConnection = \
@@ -134,6 +289,7 @@ class StandardClient(Client):
                 self.HTTPConnection = httplib.HTTPConnection
                 self.HTTPSConnection = httplib.HTTPSConnection
                 self.HTTPException = httplib.HTTPException
+                self.BadStatusLine = httplib.BadStatusLine
             try:
                 import eventlet
                 self.sleep = eventlet.sleep
@@ -145,99 +301,202 @@ class StandardClient(Client):
             self.HTTPConnection = httplib.HTTPConnection
             self.HTTPSConnection = httplib.HTTPSConnection
             self.HTTPException = httplib.HTTPException
+            self.BadStatusLine = httplib.BadStatusLine
             from time import sleep
             self.sleep = sleep
+        self.auth_cache = None
+        if self.auth_cache_path:
+            self.auth_cache = AuthCache(
+                self.auth_cache_path, sleep=self.sleep, verbose=self.verbose,
+                lock_timeout=self.timeouts.total or 60)
         self._auth_load_cache()
+        if self.auth_store:
+            if self.auth_store.values:
+                self._auth_sync()
+            elif self.auth_token:
+                self.auth_store.store(self._auth_values())
+                self._auth_generation = self.auth_store.generation
+
+    def _auth_identity(self):
+        return {
+            'auth_url': self.auth_url, 'auth_user': self.auth_user,
+            'auth_tenant': self.auth_tenant, 'region': self.region or '',
+            'snet': self.snet}
 
     def _auth_save_cache(self):
-        if self.auth_cache_path:
+        if self.auth_cache:
             self.verbose(
                 'Saving auth response values to cache %r.',
                 self.auth_cache_path)
-            data = '\n'.join([
-                self.auth_url, self.auth_user, self.auth_key,
-                self.auth_tenant or '', self.region or '', self.storage_url,
-                self.cdn_url or '', self.auth_token, str(self.snet)])
-            fp, path = tempfile.mkstemp()
-            os.write(fp, data.encode('base64'))
-            os.close(fp)
-            os.rename(path, self.auth_cache_path)
-
-    def _auth_load_cache(self):
-        if self.auth_cache_path:
             try:
-                data = open(self.auth_cache_path, 'r').read().decode('base64')
-                data = data.split('\n')
-                if len(data) == 9:
-                    (auth_url, auth_user, auth_key, auth_tenant, region,
-                     self.storage_url, self.cdn_url, self.auth_token,
-                     snet) = data
-                    snet = snet == 'True'
-                    if auth_url != self.auth_url or \
-                            auth_user != self.auth_user or \
-                            auth_key != self.auth_key or \
-                            auth_tenant != self.auth_tenant or \
-                            (self.region and region != self.region) or \
-                            snet != self.snet:
-                        self.storage_url = None
-                        self.cdn_url = None
-                        self.auth_token = None
-                        self.verbose(
-                            'Cache %s did not match new settings; discarding.',
-                            self.auth_cache_path)
-                    else:
-                        self.verbose(
-                            'Read auth response values from cache %r.',
-                            self.auth_cache_path)
-                else:
-                    self.verbose(
-                        'Cache %r was unrecognized format; discarding.',
-                        self.auth_cache_path)
-            except IOError as err:
-                if err.errno == errno.ENOENT:
-                    self.verbose(
-                        'No cached values in %r.', self.auth_cache_path)
-                else:
-                    raise
-            except Exception as err:
+                self.auth_cache.save(
+                    self._auth_identity(), self.auth_key,
+                    self._auth_values())
+            except (IOError, OSError) as err:
                 self.verbose(
-                    'Exception attempting to read auth response values from '
-                    'cache %r: %r', self.auth_cache_path, err)
+                    'Could not save auth response values to cache %r: %s',
+                    self.auth_cache_path, err)
+
+    def _auth_load_cache(self, rejected=None):
+        # Returns True if usable values were read from the cache; a
+        # token that was rejected, or is due to be refreshed, is not.
+        if not self.auth_cache:
+            return False
+        entry = self.auth_cache.load(self._auth_identity(), self.auth_key)
+        if not entry or not entry.get('auth_token') or \
+                not entry.get('storage_url'):
+            self.verbose('No cached values in %r.', self.auth_cache_path)
+            return False
+        if entry['auth_token'] == rejected or (
+                entry.get('auth_refresh_at') and
+                time() >= entry['auth_refresh_at']):
+            return False
+        for name in self._auth_values():
+            setattr(self, name, entry.get(name))
+        self.regions = self.regions or []
+        self.verbose(
+            'Read auth response values from cache %r.', self.auth_cache_path)
+        return True
+
+    def _auth_values(self):
+        return {
+            'storage_url': self.storage_url, 'cdn_url': self.cdn_url,
+            'auth_token': self.auth_token, 'auth_expires': self.auth_expires,
+            'auth_refresh_at': self.auth_refresh_at, 'regions': self.regions,
+            'default_region': self.default_region,
+            'auth_method': self.auth_method}
+
+    def _auth_sync(self):
+        # Picks up any newer values another client put in the auth store.
+        if self.auth_store.generation == self._auth_generation:
+            return
+        values = self.auth_store.values
+        if values['storage_url'] != self.storage_url or \
+                values['cdn_url'] != self.cdn_url:
+            self.reset()
+        for name, value in values.iteritems():
+            setattr(self, name, value)
+        self._auth_generation = self.auth_store.generation
 
     def auth(self):
         """
         See :py:func:`swiftly.client.client.Client.auth`
         """
+        if not self.auth_store:
+            self._auth()
+            return
+
+        def auth_func():
+            self._auth()
+            return self._auth_values()
+
+        if self.auth_store.refresh(
+                self._auth_generation, auth_func, self.sleep):
+            self._auth_generation = self.auth_store.generation
+        else:
+            self.verbose('Using auth values from another client.')
+            self._auth_sync()
+
+    def _auth(self):
         self.reset()
         if not self.auth_url:
             raise ValueError('No Auth URL has been provided.')
-        funcs = []
+        if not self.auth_cache:
+            self._auth_request()
+            return
+        rejected = self.auth_token
+        with self.auth_cache.lock() as locked:
+            if not locked:
+                self._auth_request()
+                return
+            # Another process may have authenticated while this one
+            # waited for the lock.
+            if self._auth_load_cache(rejected):
+                return
+            self._auth_request()
+            self._auth_save_cache()
+
+    def _auth_request(self):
+        methods = []
         if self.auth_methods:
-            for method in self.auth_methods.split(','):
-                funcs.append(getattr(self, '_' + method))
-        if not funcs:
+            methods = self.auth_methods.split(',')
+        if not methods:
             if '1.0' in self.auth_url:
-                funcs = [self._auth1, self._auth2key, self._auth2password]
+                methods = ['auth1', 'auth2key', 'auth2password']
                 if not self.auth_tenant:
-                    funcs.append(self._auth2password_force_tenant)
+                    methods.append('auth2password_force_tenant')
             else:
-                funcs = [self._auth2key, self._auth2password]
+                methods = ['auth2key', 'auth2password']
                 if not self.auth_tenant:
-                    funcs.append(self._auth2password_force_tenant)
-                funcs.append(self._auth1)
-        info = []
-        for func in funcs:
-            status, reason = func()
-            info.append('%s %s' % (status, reason))
-            if status // 100 == 2:
-                break
+                    methods.append('auth2password_force_tenant')
+                methods.append('auth1')
+            remembered = self.auth_method
+            if not remembered and self.auth_cache:
+                entry = self.auth_cache.load(
+                    self._auth_identity(), self.auth_key, expired=True)
+                remembered = entry and entry.get('auth_method')
+            if remembered in methods:
+                methods.remove(remembered)
+                methods.insert(0, remembered)
+        if self.auth_race and len(methods) > 1:
+            method, info = self._auth_race(methods)
         else:
+            method = None
+            info = []
+            for name in methods:
+                status, reason = getattr(self, '_' + name)()
+                info.append('%s %s' % (status, reason))
+                if status // 100 == 2:
+                    method = name
+                    break
+        if not method:
             raise self.HTTPException('Auth failure %r.' % info)
+        self.auth_method = method
+        self.auth_refresh_at = None
+        if self.auth_expires:
+            # Refreshing early, but not so early that a short lived token
+            # would be refreshed before every request.
+            self.auth_refresh_at = self.auth_expires - min(
+                self.auth_refresh, (self.auth_expires - time()) / 2)
+
+    def _auth_race(self, methods):
+        # Tries the auth methods at once, each on a copy of this client so
+        # they do not overwrite each other's values, and keeps the values
+        # of the first to succeed. Returns the name of that method, or
+        # None, and the list of results.
+        conc = Concurrency(
+            len(methods),
+            backend='eventlet' if self._trampoline else 'threads')
+        racers = {}
+        for name in methods:
+            racers[name] = copy.copy(self)
+            conc.spawn(name, getattr(racers[name], '_' + name))
+        info = []
+        try:
+            for name, (exc_type, exc_value, exc_tb, result) in \
+                    conc.as_completed():
+                if exc_value:
+                    info.append('%s 0 %s' % (name, exc_value))
+                    continue
+                status, reason = result
+                info.append('%s %s %s' % (name, status, reason))
+                if status // 100 == 2:
+                    self.verbose('Auth method %s answered first.', name)
+                    for value_name in self._auth_values():
+                        setattr(self, value_name,
+                                getattr(racers[name], value_name))
+                    return name, info
+        finally:
+            # The slower methods are abandoned; with threads they run to
+            # completion on their copies, which are then discarded.
+            conc.cancel()
+        return None, info
 
     def _auth1(self):
         status = 0
         reason = 'Unknown'
         attempt = 0
+        delay = 0
         while attempt < self.attempts:
             attempt += 1
             self.verbose('Attempting auth v1 with %s', self.auth_url)
@@ -249,6 +508,7 @@ class StandardClient(Client):
                  'X-Auth-User': quote(self.auth_user),
                  'X-Auth-Key': quote(self.auth_key)})
             try:
+                self.timeouts.start().arm(conn.sock)
                 resp = conn.getresponse()
                 status = resp.status
                 reason = resp.reason
@@ -276,6 +536,13 @@ class StandardClient(Client):
                     parsed[1] = 'snet-' + parsed[1]
                     self.storage_url = urlparse.urlunparse(parsed)
                 self.cdn_url = hdrs.get('x-cdn-management-url')
+                self.auth_expires = None
+                if hdrs.get('x-auth-token-expires'):
+                    try:
+                        self.auth_expires = \
+                            time() + int(hdrs['x-auth-token-expires'])
+                    except ValueError:
+                        pass
                 self.auth_token = hdrs.get('x-auth-token')
                 if not self.auth_token:
                     self.auth_token = hdrs.get('x-storage-token')
@@ -285,11 +552,11 @@ class StandardClient(Client):
                             'No x-auth-token or x-storage-token header in '
                             'response')
                         break
-                self._auth_save_cache()
                 break
-            elif status // 100 != 5:
+            delay = self._retry_delay(status, attempt, delay, hdrs)
+            if delay is None:
                 break
-            self.client.sleep(2 ** attempt)
+            self.sleep(delay)
         return status, reason
 
     def _auth2key(self):
@@ -305,6 +572,7 @@ class StandardClient(Client):
         status = 0
         reason = 'Unknown'
         attempt = 0
+        delay = 0
         while attempt < self.attempts:
             attempt += 1
             self.verbose(
@@ -325,16 +593,19 @@ class StandardClient(Client):
                 {'Content-Type': 'application/json',
                  'User-Agent': self.user_agent})
             try:
+                self.timeouts.start().arm(conn.sock)
                 resp = conn.getresponse()
                 status = resp.status
                 reason = resp.reason
                 self.verbose('< %s %s', status, reason)
+                hdrs = headers_to_dict(resp.getheaders())
                 body = resp.read()
                 resp.close()
                 conn.close()
             except Exception as err:
                 status = 0
                 reason = str(err)
+                hdrs = {}
             if status == 401:
                 break
             if status // 100 == 2:
@@ -391,6 +662,8 @@ class StandardClient(Client):
                     or storage_match4
                 self.cdn_url = cdn_match1 or cdn_match2 or cdn_match3
                 self.auth_token = body['access']['token']['id']
+                self.auth_expires = _parse_expires(
+                    body['access']['token'].get('expires'))
                 if not self.storage_url:
                     status = 500
                     reason = (
@@ -399,14 +672,31 @@ class StandardClient(Client):
                         (region, 'internalURL' if self.snet else 'publicURL',
                          ' '.join(self.regions)))
                     break
-                self._auth_save_cache()
                 break
-            elif status // 100 != 5:
+            delay = self._retry_delay(status, attempt, delay, hdrs)
+            if delay is None:
                 break
-            self.sleep(2 ** attempt)
+            self.sleep(delay)
         return status, reason
 
+    def _retry_delay(self, status, attempt, previous, headers):
+        """
+        Returns the seconds to wait before the next attempt of a request
+        that got the status, or None if the retry_policy says not to
+        retry it or no attempts remain.
+        """
+        if attempt >= self.attempts:
+            return None
+        delay = self.retry_policy.delay(status, previous, headers)
+        if delay is None:
+            if self.retry_policy.factor(status):
+                self.verbose('Retry budget spent; not retrying.')
+            return None
+        self.verbose('Retrying in %.2fs', delay)
+        return delay
+
     def _connect(self, url=None, cdn=False):
+        endpoint = None
         if not url:
             if cdn:
                 if not self.cdn_url:
@@ -416,28 +706,201 @@ class StandardClient(Client):
                 if not self.storage_url:
                     self.auth()
                 url = self.storage_url
+                if url and self.endpoint_pool:
+                    endpoint = self.endpoint_pool.choose(url)
         parsed = urlparse.urlparse(url) if url else None
         http_proxy_parsed = \
             urlparse.urlparse(self.http_proxy) if self.http_proxy else None
         if not parsed and not http_proxy_parsed:
             return None, None
-        netloc = (http_proxy_parsed if self.http_proxy else parsed).netloc
+        target = parsed
+        if endpoint:
+            target = urlparse.urlparse('//' + endpoint.netloc)
+        netloc = (http_proxy_parsed if self.http_proxy else target).netloc
+        kwargs = {}
+        if self.timeouts.connect is not None:
+            kwargs['timeout'] = self.timeouts.connect
         if parsed.scheme == 'http':
             self.verbose('Establishing HTTP connection to %s', netloc)
-            conn = self.HTTPConnection(netloc)
+            conn = self.HTTPConnection(netloc, **kwargs)
         elif parsed.scheme == 'https':
             self.verbose('Establishing HTTPS connection to %s', netloc)
-            conn = self.HTTPSConnection(netloc)
+            conn = self.HTTPSConnection(netloc, **kwargs)
         else:
             raise self.HTTPException(
                 'Cannot handle protocol scheme %s for url %s' %
                 (parsed.scheme, repr(url)))
         if self.http_proxy:
             self.verbose(
-                'Setting tunnelling to %s:%s', parsed.hostname, parsed.port)
-            conn._set_tunnel(parsed.hostname, parsed.port)
+                'Setting tunnelling to %s:%s', target.hostname, target.port)
+            conn._set_tunnel(target.hostname, target.port)
+        conn.endpoint = endpoint
         return parsed, conn
 
+    def _send_chunked(self, conn, contents, deadline):
+        # Over plain sockets, each chunk's framing and payload are sent
+        # separately with MSG_MORE so the kernel gathers them into full
+        # packets and the payload never has to be copied into a new framed
+        # string. Otherwise, each chunk is framed into one string as
+        # usual.
+        if not MSG_MORE or isinstance(conn, self.HTTPSConnection):
+            self._send_framed(conn, contents, deadline)
+            return
+        sock = conn.sock
+        chunk = contents.read(self.chunk_size)
+        head = '%x\r\n'
+        while chunk:
+            # Each chunk's trailing CRLF goes out with the next one's size.
+            sock.sendall(head % len(chunk), MSG_MORE)
+            sock.sendall(chunk, MSG_MORE)
+            deadline.progress(len(chunk))
+            head = '\r\n%x\r\n'
+            chunk = contents.read(self.chunk_size)
+        if head == '%x\r\n':
+            sock.sendall('0\r\n\r\n')
+        else:
+            sock.sendall('\r\n0\r\n\r\n')
+
+    def _send_framed(self, conn, contents, deadline):
+        # Sends the contents with chunked transfer encoding, each chunk
+        # framed into one string.
+        chunk = contents.read(self.chunk_size)
+        while chunk:
+            conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
+            deadline.progress(len(chunk))
+            chunk = contents.read(self.chunk_size)
+        conn.send('0\r\n\r\n')
+
+    def _wait_readable(self, socks, timeout):
+        if self._trampoline:
+            from eventlet.green import select as green_select
+            return green_select.select(socks, [], [], timeout)[0]
+        return select.select(socks, [], [], timeout)[0]
+
+    def _expect_continue(self, conn, method):
+        # Waits for the server to answer a request sent with "Expect:
+        # 100-continue". Returns None if the body should be sent, or the
+        # server's final response if it answered without wanting the body.
+        if not self._wait_readable([conn.sock], self.expect_timeout):
+            # Servers that ignore the header never answer it, so the body
+            # is sent anyway.
+            return None
+        resp = conn.response_class(conn.sock, method=method)
+        version, status, reason = resp._read_status()
+        if status != 100:
+            # The status line has been read, so it is handed back to
+            # begin to parse the rest of the response.
+            resp._read_status = lambda: (version, status, reason)
+            resp.begin()
+            return resp
+        line = resp.fp.readline(65537)
+        while line not in ('\r\n', '\n', ''):
+            line = resp.fp.readline(65537)
+        self.verbose('< 100 Continue')
+        return None
+
+    def _hedge(self, conn, path, headers, deadline):
+        # Waits for the first byte of the response to the GET just sent on
+        # conn; if it is slow to arrive the GET is sent again on a new
+        # connection. Returns whichever connection responds first, having
+        # closed the other. If neither responds within the deadline's
+        # timeout, both are failed and socket.timeout is raised.
+        delay = self.hedge.delay()
+        if delay is None or not conn.sock or \
+                self._wait_readable([conn.sock], delay):
+            return conn
+        begin = time()
+        hedge_conn = hedge_endpoint = None
+        try:
+            parsed, hedge_conn = self._connect()
+            if not hedge_conn:
+                return conn
+            hedge_endpoint = getattr(hedge_conn, 'endpoint', None)
+            if hedge_endpoint:
+                self.endpoint_pool.start(hedge_endpoint)
+            self.verbose('> Hedging GET %s after %.03fs', path, delay)
+            hedge_conn.request('GET', path, '', headers)
+        except (socket.error, self.HTTPException) as err:
+            self.verbose('Could not hedge GET %s: %s', path, err)
+            if hedge_conn:
+                if hedge_endpoint:
+                    self.endpoint_pool.finish(
+                        hedge_endpoint, time() - begin, False)
+                hedge_conn.close()
+            return conn
+        self.conn_stats['hedged'] += 1
+        self.conn_stats['opened'] += 1
+        try:
+            readable = self._wait_readable(
+                [conn.sock, hedge_conn.sock], deadline.timeout())
+        except socket.timeout:
+            readable = []
+        if not readable:
+            if hedge_endpoint:
+                self.endpoint_pool.finish(
+                    hedge_endpoint, time() - begin, False)
+            hedge_conn.close()
+            raise socket.timeout('timed out')
+        if conn.sock in readable:
+            winner, loser = conn, hedge_conn
+        else:
+            winner, loser = hedge_conn, conn
+            self.conn_stats['hedge_wins'] += 1
+            self.verbose('< Hedged GET %s answered first', path)
+            self.storage_conn = hedge_conn
+            self.storage_path = parsed.path
+        loser_endpoint = getattr(loser, 'endpoint', None)
+        if loser_endpoint:
+            # The loser never answered, so there is no latency to record.
+            self.endpoint_pool.release(loser_endpoint)
+        loser.close()
+        return winner
+
+    def _sendfile_fileno(self, conn, contents):
+        # Returns the file descriptor to give sendfile if the contents can
+        # be sent that way, None otherwise.
+        if not sendfile or not self.use_sendfile or not conn.sock or \
+                isinstance(conn, self.HTTPSConnection):
+            return None
+        try:
+            fileno = contents.fileno()
+            if not stat.S_ISREG(os.fstat(fileno).st_mode):
+                return None
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+        return fileno
+
+    def _sendfile(self, conn, contents, fileno, size, deadline):
+        sock = conn.sock
+        offset = contents.tell()
+        end = offset + size
+        while offset < end:
+            try:
+                sent = sendfile(sock.fileno(), fileno, offset, end - offset)
+            except (IOError, OSError) as err:
+                if err.errno != errno.EAGAIN:
+                    raise
+                # The socket is non-blocking, as with Eventlet or a
+                # timeout, so wait for it to drain.
+                if self._trampoline:
+                    self._trampoline(
+                        sock, write=True, timeout=sock.gettimeout())
+                elif not select.select(
+                        [], [sock], [], sock.gettimeout())[1]:
+                    raise socket.timeout('timed out')
+                continue
+            if not sent:
+                raise IOError('Early EOF from input')
+            deadline.progress(sent)
+            offset += sent
+        contents.seek(end)
+
+    def _stale_connection_error(self, err):
+        if isinstance(err, self.BadStatusLine):
+            return True
+        return isinstance(err, socket.error) and err.errno in (
+            errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED)
+
     def _default_reset_func(self):
         raise self.HTTPException(
             'Failure and no ability to reset contents for reupload.')
@@ -447,6 +910,9 @@ class StandardClient(Client):
         """
         See :py:func:`swiftly.client.client.Client.request`
         """
+        # Only object GETs are hedged; listings are left alone.
+        hedge = self.hedge and method == 'GET' and not cdn and \
+            '/' in path.lstrip('/')
         if query:
             path += '?' + '&'.join(
                 ('%s=%s' % (quote(k), quote(v)) if v else quote(k))
@@ -464,20 +930,56 @@ class StandardClient(Client):
                 tell = seek = None
         elif not contents:
             reset_func = lambda: None
+        if not tell and contents and self.spool_memory is not None:
+            # A copy is kept as the body is sent so it can be sent again,
+            # and discarded once the request is done.
+            spool = Spool(contents, self.spool_memory)
+            try:
+                return self._request(
+                    method, path, spool, headers, decode_json, stream, cdn,
+                    hedge, spool.reset)
+            finally:
+                spool.close()
+        return self._request(
+            method, path, contents, headers, decode_json, stream, cdn, hedge,
+            reset_func)
+
+    def _request(self, method, path, contents, headers, decode_json, stream,
+                 cdn, hedge, reset_func):
+        # Sends the request, retrying as the retry_policy allows; path
+        # already has any query string on it.
         status = 0
         reason = 'Unknown'
         attempt = 0
+        delay = 0
+        reconnected = False
+        self.retry_policy.record_request()
         while attempt < self.attempts:
             attempt += 1
+            if self.auth_store:
+                self._auth_sync()
+            if self.auth_refresh_at and time() >= self.auth_refresh_at:
+                self.verbose('Refreshing auth token before it expires.')
+                self.auth()
             if time() >= self.conn_discard:
-                self.storage_conn = None
-                self.cdn_conn = None
+                # Idle past the keep-alive timeout, so a new connection is
+                # used rather than risk the server having closed this one.
+                self.reset()
+            else:
+                self.probe()
             if cdn:
                 conn = self.cdn_conn
                 conn_path = self.cdn_path
             else:
                 conn = self.storage_conn
                 conn_path = self.storage_path
+                endpoint = getattr(conn, 'endpoint', None)
+                if endpoint and not self.endpoint_pool.usable(endpoint):
+                    self.verbose(
+                        'Dropping connection to ejected endpoint %s',
+                        endpoint.netloc)
+                    self.reset()
+                    conn = None
             if not conn:
                 parsed, conn = self._connect(cdn=cdn)
                 if conn:
@@ -490,14 +992,28 @@ class StandardClient(Client):
                 else:
                     raise self.HTTPException(
                         '%s %s failed: No connection' % (method, path))
-            self.conn_discard = time() + 4
+            self.conn_discard = time() + self.keepalive_timeout
+            reused = conn.sock is not None
+            self.conn_stats['reused' if reused else 'opened'] += 1
+            endpoint = getattr(conn, 'endpoint', None)
+            if endpoint:
+                self.endpoint_pool.start(endpoint)
+            begin = time()
+            final_resp = None
             titled_headers = dict((k.title(), v) for k, v in {
                 'User-Agent': self.user_agent,
                 'X-Auth-Token': self.auth_token}.iteritems())
+            if endpoint:
+                titled_headers['Host'] = \
+                    urlparse.urlparse(self.storage_url).netloc
             if headers:
                 titled_headers.update(
                     (k.title(), v) for k, v in headers.iteritems())
+            deadline = self.timeouts.start()
             try:
+                if not conn.sock:
+                    conn.connect()
+                deadline.arm(conn.sock)
                 if not hasattr(contents, 'read'):
                     if method not in self.no_content_methods and contents and \
                             'Content-Length' not in titled_headers and \
@@ -513,16 +1029,24 @@ class StandardClient(Client):
                     conn.request(
                         method, conn_path + path, contents, titled_headers)
                 else:
+                    content_length = titled_headers.get('Content-Length')
+                    if content_length is not None:
+                        content_length = int(content_length)
+                    elif method not in self.no_content_methods:
+                        titled_headers['Transfer-Encoding'] = 'chunked'
+                    # Waiting on the interim response needs httplib's
+                    # private _read_status; without it the body is just
+                    # sent.
+                    expect = self.expect_continue is not None and \
+                        method not in self.no_content_methods and (
+                            content_length is None or
+                            content_length > self.expect_continue) and \
+                        hasattr(conn.response_class, '_read_status')
+                    if expect:
+                        titled_headers['Expect'] = '100-continue'
                     conn.putrequest(method, conn_path + path)
-                    content_length = None
                     for h, v in sorted(titled_headers.iteritems()):
-                        if h == 'Content-Length':
-                            content_length = int(v)
                         conn.putheader(h, v)
-                    if method not in self.no_content_methods and \
-                            content_length is None:
-                        titled_headers['Transfer-Encoding'] = 'chunked'
-                        conn.putheader('Transfer-Encoding', 'chunked')
                     conn.endheaders()
                     verbose_headers = '  '.join(
                         '%s: %s' % (k, v)
@@ -530,15 +1054,26 @@ class StandardClient(Client):
                     self.verbose(
                         '> %s %s %s', method, conn_path + path,
                         verbose_headers)
-                    if method not in self.no_content_methods and \
+                    if expect:
+                        final_resp = self._expect_continue(conn, method)
+                    if final_resp:
+                        # The body was never sent, so the connection
+                        # cannot be reused; the response keeps its own
+                        # reference to the socket.
+                        self.verbose('< Answered before the body was sent')
+                        conn.close()
+                    elif method not in self.no_content_methods and \
                             content_length is None:
-                        chunk = contents.read(self.chunk_size)
-                        while chunk:
-                            conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
-                            chunk = contents.read(self.chunk_size)
-                        conn.send('0\r\n\r\n')
+                        self._send_chunked(conn, contents, deadline)
                     else:
                         left = content_length
+                        fileno = None
+                        if left > 0:
+                            fileno = self._sendfile_fileno(conn, contents)
+                        if fileno is not None:
+                            self._sendfile(
+                                conn, contents, fileno, left, deadline)
+                            left = 0
                         while left > 0:
                             size = self.chunk_size
                             if size > left:
@@ -547,46 +1082,120 @@ class StandardClient(Client):
                             if not chunk:
                                 raise IOError('Early EOF from input')
                             conn.send(chunk)
+                            deadline.progress(len(chunk))
                             left -= len(chunk)
-                resp = conn.getresponse()
+                if hedge:
+                    conn = self._hedge(
+                        conn, conn_path + path, titled_headers, deadline)
+                    endpoint = getattr(conn, 'endpoint', None)
+                    deadline.arm(conn.sock)
+                resp = final_resp or conn.getresponse()
                 status = resp.status
                 reason = resp.reason
                 hdrs = headers_to_dict(resp.getheaders())
+                if hedge and status // 100 == 2:
+                    self.hedge.record(time() - begin)
                 if stream:
                     value = resp
+                    value.readinto = functools.partial(
+                        response_readinto, resp)
+                    if self.timeouts.watches_progress():
+                        value.read = deadline.watch(value.read)
+                        value.readinto = deadline.watch(value.readinto)
                 else:
                     value = resp.read()
+                    deadline.progress(len(value))
                     resp.close()
             except Exception as err:
                 status = 0
                 reason = '%s %s' % (type(err), str(err))
                 hdrs = {}
                 value = None
+                stale = reused and not reconnected and \
+                    self._stale_connection_error(err)
+                if endpoint:
+                    # A reused connection the server had closed says
+                    # nothing about the endpoint's health.
+                    if stale:
+                        self.endpoint_pool.release(endpoint)
+                    else:
+                        self.endpoint_pool.finish(
+                            endpoint, time() - begin, False)
+                    endpoint = None
+                if stale:
+                    # The server closed the idle connection just as it was
+                    # reused; that says nothing about the request itself.
+                    self.verbose('< Reconnecting; %s', reason)
+                    self.conn_stats['reconnected'] += 1
+                    reconnected = True
+                    conn.close()
+                    reset_func()
+                    attempt -= 1
+                    continue
             self.verbose('< %s %s', status or '-', reason)
+            if endpoint:
+                self.endpoint_pool.finish(
+                    endpoint, time() - begin, status // 100 != 5)
+            if self.response_callback:
+                self.response_callback(status, time() - begin)
             if status == 401:
                 if stream:
                     value.close()
                 conn.close()
                 self.auth()
                 attempt -= 1
-            elif status and status // 100 != 5:
+                reset_func()
+                continue
+            delay = self._retry_delay(status, attempt, delay, hdrs)
+            if delay is None and status and status // 100 != 5:
                 if not stream and decode_json and status // 100 == 2:
                     if value:
                         value = json.loads(value)
                     else:
                         value = None
-                self.conn_discard = time() + 4
+                self.conn_discard = time() + self.keepalive_timeout
                 return (status, reason, hdrs, value)
-            else:
-                if stream and value:
-                    value.close()
-                conn.close()
-            if reset_func:
-                reset_func()
-            self.sleep(2 ** attempt)
+            if stream and value:
+                value.close()
+            conn.close()
+            if delay is None:
+                break
+            reset_func()
+            self.sleep(delay)
         raise self.HTTPException(
             '%s %s failed: %s %s' % (method, path, status, reason))
 
+    def connect(self):
+        """
+        See :py:func:`swiftly.client.client.Client.connect`
+        """
+        if not self.storage_conn:
+            parsed, conn = self._connect()
+            if conn:
+                conn.connect()
+                self.conn_stats['opened'] += 1
+                self.storage_conn = conn
+                self.storage_path = parsed.path
+                self.conn_discard = time() + self.keepalive_timeout
+
+    def probe(self):
+        """
+        See :py:func:`swiftly.client.client.Client.probe`
+        """
+        closed = 0
+        for name in ('storage_conn', 'cdn_conn'):
+            conn = getattr(self, name)
+            if conn and not connection_alive(conn):
+                self.verbose('Discarding stale connection %s', name)
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                setattr(self, name, None)
+                closed += 1
+        self.conn_stats['stale'] += closed
+        return closed
+
     def reset(self):
         """
         See :py:func:`swiftly.client.client.Client.reset`
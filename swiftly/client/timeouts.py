@@ -0,0 +1,157 @@
+"""
+Contains the Timeouts class that limits how long clients wait on
+connections and requests.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import socket
+import time
+
+
+class Timeouts(object):
+    """
+    Limits how long clients wait to connect, on each read or write, and
+    for whole requests, and aborts transfers that have slowed to a
+    crawl.
+
+    Without limits, a half-dead server can leave a request waiting
+    forever, quietly taking a slot from a concurrent job. A request
+    that runs out of time raises socket.timeout, which clients treat
+    like any other request that got no response, retrying it if their
+    retry policy allows.
+
+    The speed limit is checked as data arrives or is sent: if fewer
+    than speed_limit bytes per second moved over the last speed_time
+    seconds, the transfer is aborted. A transfer that stalls entirely
+    is caught by the read timeout instead.
+
+    A Timeouts may be shared by many clients; the state of each request
+    is kept in the :py:class:`Deadline` it starts.
+
+    :param connect: Default: None. The seconds to wait for a connection
+        to be established; None leaves it to the operating system.
+    :param read: Default: None. The seconds any one read or write on a
+        connection may wait; None waits forever.
+    :param total: Default: None. The seconds a request may take, from
+        sending it to reading the last of the response; None has no
+        limit.
+    :param speed_limit: Default: None. The bytes per second below which
+        a transfer is aborted; None has no limit.
+    :param speed_time: Default: 30. The seconds over which the speed
+        limit is measured.
+    """
+
+    def __init__(self, connect=None, read=None, total=None,
+                 speed_limit=None, speed_time=30):
+        self.connect = connect
+        self.read = read
+        self.total = total
+        self.speed_limit = speed_limit
+        self.speed_time = speed_time
+
+    def start(self):
+        """
+        Returns a new :py:class:`Deadline` for a request starting now.
+        """
+        return Deadline(self)
+
+    def watches_progress(self):
+        """
+        Returns True if requests must report their progress, because
+        there is a total or speed limit.
+        """
+        return bool(self.total or self.speed_limit)
+
+
+class Deadline(object):
+    """
+    Tracks the time and progress of one request against its
+    :py:class:`Timeouts`.
+    """
+
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+        now = time.time()
+        self.expires = None
+        if timeouts.total:
+            self.expires = now + timeouts.total
+        self.sock = None
+        self._window_start = now
+        self._window_bytes = 0
+
+    def timeout(self):
+        """
+        Returns the seconds the next read or write may wait, None for no
+        limit.
+
+        :raises socket.timeout: If the request has run out of time.
+        """
+        timeout = self.timeouts.read
+        if self.expires is not None:
+            remaining = self.expires - time.time()
+            if remaining <= 0:
+                raise socket.timeout(
+                    'Request took longer than %ss' % self.timeouts.total)
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+        return timeout
+
+    def arm(self, sock):
+        """
+        Sets the socket's timeout for the request and remembers the
+        socket so the timeout can be shortened as the request nears its
+        total limit.
+        """
+        self.sock = sock
+        sock.settimeout(self.timeout())
+
+    def progress(self, size):
+        """
+        Records that size bytes were sent or received.
+
+        :raises socket.timeout: If the transfer is below the speed limit
+            or the request has run out of time.
+        """
+        limit = self.timeouts.speed_limit
+        if limit:
+            self._window_bytes += size
+            now = time.time()
+            elapsed = now - self._window_start
+            if elapsed >= self.timeouts.speed_time:
+                if self._window_bytes < limit * elapsed:
+                    raise socket.timeout(
+                        'Transfer slower than %s bytes/s for %ss' %
+                        (limit, self.timeouts.speed_time))
+                self._window_start = now
+                self._window_bytes = 0
+        if self.expires is not None and self.sock:
+            self.sock.settimeout(self.timeout())
+
+    def watch(self, func):
+        """
+        Returns the read or readinto function given, wrapped so that
+        what it reads counts as progress.
+        """
+
+        def watched(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if isinstance(result, (int, long)):
+                self.progress(result)
+            else:
+                self.progress(len(result))
+            return result
+
+        return watched
@@ -18,8 +18,14 @@ limitations under the License.
 """
 import hashlib
 import hmac
+import httplib
+import io
+import json
+import select
+import socket
 import time
 import urllib
+import zlib
 
 
 def generate_temp_url(method, url, seconds, key):
@@ -83,3 +89,202 @@ def headers_to_dict(headers):
         else:
             hdrs[h] = v
     return hdrs
+
+
+def connection_alive(conn):
+    """
+    Returns True if the idle httplib connection looks usable for
+    another request. A connection whose socket is readable while no
+    request is outstanding has either been closed by the server or has
+    unexpected data waiting, and either way should not be reused. A
+    connection not yet opened is considered alive.
+    """
+    sock = getattr(conn, 'sock', None)
+    if not sock:
+        return True
+    try:
+        readable = select.select([sock], [], [], 0)[0]
+    except (select.error, socket.error, ValueError):
+        return False
+    return not readable
+
+
+#: The file object class of Python 2's sockets, whose internals
+#: response_readinto relies on; None if there is no such class.
+_fileobject = getattr(socket, '_fileobject', None)
+
+
+def _direct_sock(resp):
+    # Returns the socket resp's body can be received from directly, or
+    # None if it cannot, such as when the body is chunked, something is
+    # already buffered, or resp's file object is not the one whose
+    # internals this relies on.
+    fp = resp.fp
+    if not _fileobject or not isinstance(fp, _fileobject) or \
+            getattr(resp, 'chunked', True) or \
+            getattr(resp, 'length', None) is None:
+        return None
+    sock = getattr(fp, '_sock', None)
+    rbuf = getattr(fp, '_rbuf', None)
+    if not hasattr(sock, 'recv_into') or not hasattr(rbuf, 'tell') or \
+            rbuf.tell():
+        return None
+    return sock
+
+
+def response_readinto(resp, b):
+    """
+    Reads up to len(b) bytes of an httplib response's body into the
+    writable buffer b, returning the number of bytes read or 0 once
+    the body has been read.
+
+    If the body is of known length and the response has nothing
+    buffered, the bytes are received straight into b with recv_into,
+    so no strings are made; otherwise, or with an httplib whose
+    internals are not as expected, resp.read is used and its result
+    copied into b.
+    """
+    view = memoryview(b)
+    if not resp.fp:
+        return 0
+    sock = _direct_sock(resp)
+    if not sock:
+        # The class's read, as the instance's may be wrapped to watch the
+        # bytes read, which would then be counted twice.
+        data = resp.__class__.read(resp, len(view))
+        view[:len(data)] = data
+        return len(data)
+    amount = min(len(view), resp.length)
+    size = 0
+    if amount:
+        size = sock.recv_into(view[:amount])
+        if not size:
+            resp.close()
+            raise httplib.IncompleteRead('', resp.length)
+        resp.length -= size
+    if not resp.length:
+        resp.close()
+    return size
+
+
+class _IterRawIO(io.RawIOBase):
+    # Reads the chunks of an iterable, such as a WSGI app_iter, as a raw
+    # stream; each readinto copies from the current chunk without
+    # slicing it into new strings.
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._close = getattr(iterable, 'close', None)
+        self._chunk = ''
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._offset >= len(self._chunk):
+            try:
+                self._chunk = self._iterator.next()
+            except StopIteration:
+                self._chunk = ''
+                self._offset = 0
+                return 0
+            self._offset = 0
+        size = min(len(b), len(self._chunk) - self._offset)
+        memoryview(b)[:size] = \
+            memoryview(self._chunk)[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._iterator = iter(())
+            self._chunk = ''
+            if self._close:
+                self._close()
+        super(_IterRawIO, self).close()
+
+
+def iter_reader(iterable, buffer_size=65536):
+    """
+    Returns a buffered file-like object reading the data chunks of the
+    iterable given, such as a WSGI app_iter, whatever their sizes.
+
+    The object's read(size) returns size bytes unless the end has been
+    reached, readinto fills the buffer given, and close closes the
+    iterable if it has a close method, as WSGI requires.
+
+    :param iterable: The iterable of str data chunks.
+    :param buffer_size: Default: 65536. The bytes buffered from the
+        chunks at one time.
+    """
+    return io.BufferedReader(_IterRawIO(iterable), buffer_size)
+
+
+def iter_gunzip(chunks):
+    """
+    Yields the decompressed data for the iterable of gzipped data
+    chunks given, as they arrive.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_json_list(chunks):
+    """
+    Yields each item of the JSON list read from the iterable of data
+    chunks given, decoding each item as soon as all of it has arrived
+    rather than waiting for the whole list.
+
+    An empty body yields nothing, as for a 204 No Content listing.
+
+    :raises ValueError: If the data is not a JSON list.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # Skips the whitespace and commas between items.
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('Expected a JSON list')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # An item not yet followed by a separator might go on, as
+                # a number might, so it waits for more data.
+                if eof or (end < len(buf) and buf[end] in ' \t\r\n,]'):
+                    pos = end
+                    yield item
+                    continue
+        elif eof:
+            if started:
+                raise ValueError('Unterminated JSON list')
+            return
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            eof = True
+            continue
+        buf = buf[pos:] + chunk
+        pos = 0
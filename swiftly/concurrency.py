@@ -16,44 +16,417 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-__all__ = ['Concurrency']
+__all__ = [
+    'AIMDController', 'BACKENDS', 'Cancelled', 'Concurrency',
+    'ConcurrencyBudget', 'Spread', 'SpreadScheduler', 'default_backend']
 
 import sys
+import threading
+import time
+import weakref
 import Queue
 
 try:
-    from eventlet import GreenPool, sleep, Timeout
+    from eventlet import GreenPool, kill, sleep, Timeout
+    from eventlet.corolocal import local as GreenLocal
+    from eventlet.queue import LightQueue
+    from eventlet.semaphore import Semaphore as GreenSemaphore
+    from greenlet import GreenletExit, getcurrent
 except ImportError:
     GreenPool = None
+    kill = None
     sleep = None
     Timeout = None
+    GreenLocal = None
+    LightQueue = None
+    GreenSemaphore = None
+    GreenletExit = None
+    getcurrent = None
+
+
+#: Exceptions that end a green thread that has been killed.
+_KILLED = (GreenletExit,) if GreenletExit else ()
+
+#: Tracks the Concurrency whose func is running in the current thread
+#: or green thread, so new instances can be tied to their parent.
+_local = GreenLocal() if GreenLocal else threading.local()
+
+#: The names of the available Concurrency backends.
+BACKENDS = ['eventlet', 'threads', 'serial']
+
+
+class Cancelled(Exception):
+    """
+    Raised by a :py:class:`Concurrency` once it has been cancelled, and
+    given as the result of any func that was cancelled before it could
+    finish.
+    """
+    pass
+
+
+def default_backend(eventlet=None):
+    """
+    Returns the name of the backend to use by default.
+
+    :param eventlet: If True or None, the eventlet backend is chosen
+        if Eventlet is installed. If False, or if Eventlet is not
+        installed, the threads backend is chosen.
+    """
+    if eventlet is not False and GreenPool:
+        return 'eventlet'
+    return 'threads'
+
+
+class _ThreadPool(object):
+    """
+    Runs functions in OS threads, offering the subset of the
+    eventlet.GreenPool interface that Concurrency uses.
+
+    :param size: The maximum number of threads to run at once;
+        spawn_n will block until a thread is available.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._semaphore = threading.Semaphore(size)
+        self._condition = threading.Condition()
+        self._running = 0
+
+    def _run(self, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+            self._semaphore.release()
+
+    def spawn_n(self, func, *args, **kwargs):
+        self._semaphore.acquire()
+        with self._condition:
+            self._running += 1
+        thread = threading.Thread(target=self._run, args=(func, args, kwargs))
+        thread.daemon = True
+        thread.start()
+
+    def waitall(self):
+        with self._condition:
+            while self._running:
+                self._condition.wait()
+
+
+class ConcurrencyBudget(object):
+    """
+    A limit on the total number of funcs running at once across all
+    the Concurrency instances sharing the budget, including instances
+    created by funcs that are themselves running under the budget.
+
+    A spawn from outside any budgeted func waits for a free slot. A
+    spawn from within a budgeted func takes a free slot if there is
+    one; otherwise the func is run right away in the spawning func's
+    own slot. This way nesting never exceeds the limit, and nested
+    spawns can never deadlock waiting on slots held by their
+    parents.
+
+    :param limit: The total number of funcs allowed to run at once.
+    :param backend: Default: None. The name of the backend used by
+        the Concurrency instances sharing the budget. If None,
+        :py:func:`default_backend` is used.
+    """
+
+    def __init__(self, limit, backend=None):
+        self.limit = limit
+        self.backend = backend or default_backend()
+        if self.backend == 'eventlet':
+            self._semaphore = GreenSemaphore(limit)
+            self._local = GreenLocal()
+        else:
+            self._semaphore = threading.Semaphore(limit)
+            self._local = threading.local()
+        self._debt = 0
+        self._resize_lock = threading.Lock()
+
+    def resize(self, limit):
+        """
+        Changes the limit on the number of funcs running at once.
+        Raising the limit frees up slots right away; lowering it takes
+        effect as running funcs finish.
+        """
+        with self._resize_lock:
+            change = limit - self.limit
+            self.limit = limit
+            if change < 0:
+                for _ in xrange(-change):
+                    # Retire free slots now and the rest as they are
+                    # released.
+                    if not self._semaphore.acquire(False):
+                        self._debt += 1
+                return
+            paid = min(change, self._debt)
+            self._debt -= paid
+            for _ in xrange(change - paid):
+                self._semaphore.release()
+
+    def holding(self):
+        """
+        Returns True if the caller is running within a budgeted func.
+        """
+        return getattr(self._local, 'holding', False)
+
+    def acquire(self, blocking=True):
+        """
+        Obtains a slot from the budget, returning True if one was
+        obtained. If blocking is True, waits for a slot to be free.
+        """
+        return self._semaphore.acquire(blocking)
+
+    def release(self):
+        """
+        Returns a slot obtained with acquire back to the budget.
+        """
+        with self._resize_lock:
+            if self._debt:
+                # The slot is retired to honor a lowered limit.
+                self._debt -= 1
+                return
+        self._semaphore.release()
+
+    def run(self, func, *args, **kwargs):
+        """
+        Runs the func within a slot already obtained with acquire,
+        releasing the slot once the func returns.
+        """
+        self._local.holding = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.holding = False
+            self.release()
+
+
+class AIMDController(object):
+    """
+    Adjusts the limit of a :py:class:`ConcurrencyBudget` while a job
+    runs, using additive increase and multiplicative decrease (AIMD)
+    driven by the outcome of each request.
+
+    Request outcomes are given to :py:func:`observe`, usually as the
+    ``response_callback`` of the clients in use. Once a window of
+    successful responses, as many as the current limit, has been
+    observed, the limit is raised by one if the window's throughput
+    did not drop and its mean latency stayed within
+    latency_tolerance of the best seen. Any backoff status or
+    connection failure cuts the limit by the decrease factor right
+    away; responses to requests begun before the last cut are
+    ignored so one burst of errors is only acted on once.
+
+    :param budget: The :py:class:`ConcurrencyBudget` to adjust.
+    :param minimum: Default: 1. The lowest limit allowed.
+    :param maximum: Default: None. The highest limit allowed; None
+        means no maximum.
+    :param decrease: Default: 0.5. The factor the limit is multiplied
+        by on a backoff status or connection failure.
+    :param latency_tolerance: Default: 1.5. How much the mean latency
+        of a window may exceed the best window's mean latency while
+        still raising the limit.
+    :param backoff_statuses: Default: (429, 498, 503). The response
+        statuses that indicate the cluster is overloaded.
+    :param verbose: Set to a ``func(msg, *args)`` that will be called
+        with debug messages whenever the limit changes.
+    """
+
+    def __init__(self, budget, minimum=1, maximum=None, decrease=0.5,
+                 latency_tolerance=1.5, backoff_statuses=(429, 498, 503),
+                 verbose=None):
+        self.budget = budget
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.backoff_statuses = backoff_statuses
+        self.verbose = verbose or (lambda *a, **k: None)
+        self._lock = threading.Lock()
+        self._best_latency = None
+        self._last_throughput = 0
+        self._last_decrease = 0
+        self._reset_window(time.time())
+
+    def _reset_window(self, now):
+        self._window_begin = now
+        self._window_count = 0
+        self._window_latency = 0.0
+
+    def _resize(self, limit, reason):
+        self.verbose(
+            'Adaptive concurrency %s -> %s (%s)', self.budget.limit, limit,
+            reason)
+        self.budget.resize(limit)
+
+    def observe(self, status, elapsed):
+        """
+        Records the outcome of one request.
+
+        :param status: The response status, or 0 if the request timed
+            out or could not connect.
+        :param elapsed: The seconds the request took to get a
+            response.
+        """
+        now = time.time()
+        with self._lock:
+            if not status or status in self.backoff_statuses:
+                if now - elapsed < self._last_decrease:
+                    return
+                limit = max(
+                    self.minimum, int(self.budget.limit * self.decrease))
+                if limit != self.budget.limit:
+                    self._resize(limit, 'status %s' % (status or 'failed'))
+                self._last_decrease = now
+                self._reset_window(now)
+                return
+            if status // 100 == 5:
+                return
+            self._window_count += 1
+            self._window_latency += elapsed
+            if self._window_count < self.budget.limit:
+                return
+            latency = self._window_latency / self._window_count
+            throughput = self._window_count / max(
+                now - self._window_begin, 0.001)
+            if self._best_latency is None or latency < self._best_latency:
+                self._best_latency = latency
+            if latency <= self._best_latency * self.latency_tolerance and \
+                    throughput >= self._last_throughput and \
+                    (self.maximum is None or
+                     self.budget.limit < self.maximum):
+                self._resize(
+                    self.budget.limit + 1,
+                    '%.01f/s at %.03fs' % (throughput, latency))
+            self._last_throughput = throughput
+            self._reset_window(now)
 
 
 class Concurrency(object):
     """
-    Convenience class to support concurrency, if Eventlet is
-    available; otherwise it just performs at single concurrency.
+    Convenience class to support concurrency with green threads if
+    Eventlet is available or OS threads otherwise; the serial backend
+    just performs at single concurrency.
+
+    Results can be retrieved all at once with get_results, which keeps
+    every result until the Concurrency instance is discarded, or
+    streamed with as_completed, check, and finish, which hand each
+    result off once and then drop it. For large jobs, the streaming
+    methods keep memory use constant::
+
+        conc = Concurrency(10)
+        for item in items:
+            conc.check()
+            conc.spawn(item, func, item)
+        conc.finish()
+
+    By default the first error handed off by check or finish cancels
+    all remaining work and is then raised. With fail_fast False, errors
+    are only given to the callback and all work is carried out; if
+    there is no callback, the first error is raised by finish instead
+    so it is not lost.
+
+    Cancelling, with :py:func:`cancel`, stops any further funcs from
+    starting and cancels any Concurrency instances created by the
+    funcs already running. With the eventlet backend, running funcs
+    are also interrupted; with the other backends, running funcs are
+    left to finish the request they are making, and any spawn or check
+    they then make raises :py:class:`Cancelled`.
 
     :param concurrency: The level of concurrency desired. Default: 10
+    :param callback: Default: None. If set, ``callback(ident,
+        exc_type, exc_value, exc_tb, result)`` will be called for each
+        finished func as its result is handed off by as_completed,
+        check, or finish.
+    :param backend: Default: None. The name of the backend to run
+        funcs with, one of :py:data:`BACKENDS`. ``eventlet`` uses
+        green threads, ``threads`` uses OS threads, and ``serial``
+        just runs each func as it is spawned. If None, the budget's
+        backend or :py:func:`default_backend` is used.
+    :param budget: Default: None. A :py:class:`ConcurrencyBudget`
+        shared with other Concurrency instances, limiting the total
+        number of funcs running at once across all of them.
+    :param fail_fast: Default: True. If True, the first error handed
+        off by check or finish cancels the remaining work and is
+        raised. If False, errors are only given to the callback, or
+        without one the first is raised once finish is done.
     """
 
-    def __init__(self, concurrency=10):
+    def __init__(self, concurrency=10, callback=None, backend=None,
+                 budget=None, fail_fast=True):
         self.concurrency = concurrency
-        if self.concurrency and GreenPool:
-            self._pool = GreenPool(self.concurrency)
-        else:
-            self._pool = None
+        self.callback = callback
+        self.budget = budget
+        self.fail_fast = fail_fast
+        self.backend = backend or (budget and budget.backend) or \
+            default_backend()
+        if self.backend not in BACKENDS:
+            raise ValueError(
+                'Unknown concurrency backend %r; should be one of %s' %
+                (self.backend, ', '.join(BACKENDS)))
+        if self.backend == 'eventlet' and not GreenPool:
+            raise ValueError(
+                'The eventlet concurrency backend requires Eventlet.')
+        self._pool = None
         self._queue = Queue.Queue()
+        if self.concurrency and self.backend == 'eventlet':
+            self._pool = GreenPool(self.concurrency)
+            self._queue = LightQueue()
+        elif self.concurrency > 1 and self.backend == 'threads':
+            self._pool = _ThreadPool(self.concurrency)
         self._results = {}
+        self._pending = 0
+        self._children = weakref.WeakSet()
+        self._greenlets = set()
+        self._error = None
+        self.cancelled = False
+        parent = getattr(_local, 'current', None)
+        if parent:
+            parent._children.add(self)
+            self.cancelled = parent.cancelled
 
     def _spawner(self, ident, func, *args, **kwargs):
         exc_type = exc_value = exc_tb = result = None
+        if self.cancelled:
+            if isinstance(func, _SpreadFunc):
+                # Skipped, so it will not release its resources itself.
+                func.release()
+            exc_value = Cancelled()
+            exc_type = type(exc_value)
+            self._queue.put((ident, (exc_type, exc_value, exc_tb, result)))
+            return
+        parent = getattr(_local, 'current', None)
+        _local.current = self
         try:
             result = func(*args, **kwargs)
         except (Exception, Timeout):
             exc_type, exc_value, exc_tb = sys.exc_info()
+        except _KILLED:
+            exc_value = Cancelled()
+            self._queue.put(
+                (ident, (type(exc_value), exc_value, None, None)))
+            raise
+        finally:
+            _local.current = parent
         self._queue.put((ident, (exc_type, exc_value, exc_tb, result)))
 
+    def _green_spawner(self, ident, func, *args, **kwargs):
+        # Remembers the green thread so cancel can kill it; the pool may
+        # run the func in the spawning green thread when it is full,
+        # which may already be remembered.
+        greenlet = getcurrent()
+        owner = greenlet not in self._greenlets
+        if owner:
+            self._greenlets.add(greenlet)
+        try:
+            self._spawner(ident, func, *args, **kwargs)
+        finally:
+            if owner:
+                self._greenlets.discard(greenlet)
+
     def spawn(self, ident, func, *args, **kwargs):
         """
         Returns immediately to the caller and begins executing the
@@ -69,13 +442,46 @@ class Concurrency(object):
         :param args: The args to give the func.
         :param kwargs: The keyword args to the give the func.
         :returns: None
+        :raises Cancelled: If the Concurrency has been cancelled.
         """
-        if self._pool:
-            self._pool.spawn_n(self._spawner, ident, func, *args, **kwargs)
-            sleep()
+        if self.cancelled:
+            raise Cancelled()
+        self._pending += 1
+        spawner = self._spawner
+        if self.backend == 'eventlet':
+            spawner = self._green_spawner
+        if self._pool and self.budget:
+            if not self.budget.acquire(blocking=not self.budget.holding()):
+                self._spawner(ident, func, *args, **kwargs)
+                return
+            self._pool.spawn_n(
+                self.budget.run, spawner, ident, func, *args, **kwargs)
+            if self.backend == 'eventlet':
+                sleep()
+        elif self._pool:
+            self._pool.spawn_n(spawner, ident, func, *args, **kwargs)
+            if self.backend == 'eventlet':
+                sleep()
         else:
             self._spawner(ident, func, *args, **kwargs)
 
+    def cancel(self):
+        """
+        Cancels all pending funcs and any Concurrency instances created
+        by them. Funcs not yet started will not be run and their
+        results will be :py:class:`Cancelled` exceptions. With the
+        eventlet backend, running funcs are killed as well; otherwise
+        they finish the request they are making. Does not wait for
+        running funcs; use join for that.
+        """
+        self.cancelled = True
+        for child in list(self._children):
+            child.cancel()
+        current = getcurrent() if getcurrent else None
+        for greenlet in list(self._greenlets):
+            if greenlet is not current:
+                kill(greenlet)
+
     def get_results(self):
         """
         Returns a dict of the results currently available. The keys
@@ -94,14 +500,240 @@ class Concurrency(object):
         try:
             while True:
                 ident, value = self._queue.get(block=False)
+                self._pending -= 1
                 self._results[ident] = value
         except Queue.Empty:
             pass
         return self._results
 
+    def as_completed(self, block=True):
+        """
+        Yields (ident, (exc_type, exc_value, exc_tb, result)) tuples
+        for spawned funcs as they finish, in the order they finish.
+        See get_results for a description of the values.
+
+        Unlike get_results, each result is handed off just once and
+        then dropped, so memory use does not grow with the number of
+        funcs spawned.
+
+        :param block: If True, the default, this will keep yielding
+            until all pending funcs have finished. If False, only
+            those funcs that have already finished will be yielded.
+        """
+        while self._pending:
+            try:
+                ident, value = self._queue.get(block=block)
+            except Queue.Empty:
+                break
+            self._pending -= 1
+            if self.callback:
+                self.callback(ident, *value)
+            yield ident, value
+
+    def _hand_off(self, block):
+        for ident, (exc_type, exc_value, exc_tb, result) in \
+                self.as_completed(block=block):
+            if not exc_value or isinstance(exc_value, Cancelled):
+                continue
+            if self.fail_fast:
+                self.cancel()
+                self.join()
+                raise exc_type, exc_value, exc_tb
+            if not self.callback and not self._error:
+                self._error = (exc_type, exc_value, exc_tb)
+        if self.cancelled:
+            self.join()
+            raise Cancelled()
+
+    def check(self):
+        """
+        Hands off the results of any funcs that have already finished,
+        as with as_completed(block=False). If fail_fast is set and any
+        of those funcs raised an exception, cancels the remaining
+        funcs, waits for any still running, and then raises the first
+        such exception.
+
+        This is usually called just before each spawn so errors are
+        noticed right away rather than after all work is queued.
+
+        :raises Cancelled: If the Concurrency has been cancelled.
+        """
+        self._hand_off(False)
+
+    def finish(self):
+        """
+        Blocks until all pending funcs have finished, handing off
+        their results as with as_completed. If fail_fast is set, the
+        first exception encountered cancels the remaining funcs and is
+        raised once those still running have finished. If not, and
+        there is no callback, the first exception is raised once all
+        funcs have finished.
+
+        :raises Cancelled: If the Concurrency has been cancelled.
+        """
+        self._hand_off(True)
+        if self._error:
+            exc_type, exc_value, exc_tb = self._error
+            self._error = None
+            raise exc_type, exc_value, exc_tb
+
     def join(self):
         """
         Blocks until all currently pending functions have finished.
         """
         if self._pool:
             self._pool.waitall()
+
+
+class Spread(object):
+    """
+    Spreads the funcs run by Concurrency instances across shared
+    resources, such as the disks of a Swift cluster, by limiting how
+    many funcs using any one resource may run at once.
+
+    Each func is spawned through a :py:class:`SpreadScheduler` made by
+    :py:meth:`scheduler`. A func whose resources are all below the
+    limit is spawned right away; otherwise it is held back, and funcs
+    queued after it that use other resources go first. The limits are
+    shared by all the schedulers of a Spread, so funcs spawned by
+    different Concurrency instances are counted together.
+
+    :param keys_func: The ``func(ident)`` returning the list of keys of
+        the resources used by the func spawned with that ident. Funcs
+        with no keys are never held back.
+    :param limit: Default: 1. The most funcs using a resource that may
+        run at once.
+    :param backlog: Default: 1000. The most funcs a scheduler holds
+        back; once reached, spawn waits for funcs to finish.
+    """
+
+    def __init__(self, keys_func, limit=1, backlog=1000):
+        self.keys_func = keys_func
+        self.limit = limit
+        self.backlog = backlog
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def scheduler(self, conc):
+        """
+        Returns a :py:class:`SpreadScheduler` spawning funcs with the
+        Concurrency given.
+        """
+        return SpreadScheduler(self, conc)
+
+    def _acquire(self, keys):
+        with self._lock:
+            for key in keys:
+                if self._running.get(key, 0) >= self.limit:
+                    return False
+            for key in keys:
+                self._running[key] = self._running.get(key, 0) + 1
+            return True
+
+    def _release(self, keys):
+        with self._lock:
+            for key in keys:
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+
+
+class _SpreadFunc(object):
+    # Runs a func spawned through a Spread, releasing its resources once
+    # it has run or been skipped by a cancelled Concurrency.
+
+    def __init__(self, spread, keys, func):
+        self.spread = spread
+        self.keys = keys
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.release()
+
+    def release(self):
+        with self.spread._lock:
+            keys, self.keys = self.keys, None
+        if keys is not None:
+            self.spread._release(keys)
+
+
+class SpreadScheduler(object):
+    """
+    Spawns funcs with a Concurrency as the :py:class:`Spread` it was
+    made by allows, offering the check, spawn, and finish methods of
+    :py:class:`Concurrency` so it can be used in its place::
+
+        conc = spread.scheduler(Concurrency(10))
+        for item in items:
+            conc.check()
+            conc.spawn(item, func, item)
+        conc.finish()
+
+    :param spread: The :py:class:`Spread` limiting the funcs.
+    :param conc: The :py:class:`Concurrency` to spawn the funcs with.
+    """
+
+    def __init__(self, spread, conc):
+        self.spread = spread
+        self.conc = conc
+        self._held = []
+        if conc.backend == 'eventlet':
+            self._sleep = sleep
+        else:
+            self._sleep = time.sleep
+
+    def _dispatch(self):
+        # Spawns the held funcs whose resources are now free, keeping
+        # the rest in order.
+        held = []
+        for item in self._held:
+            keys, ident, func, args, kwargs = item
+            if self.spread._acquire(keys):
+                spread_func = _SpreadFunc(self.spread, keys, func)
+                try:
+                    self.conc.spawn(ident, spread_func, *args, **kwargs)
+                except BaseException:
+                    # Such as Cancelled; the func will never run to
+                    # release its resources for other schedulers.
+                    spread_func.release()
+                    raise
+            else:
+                held.append(item)
+        self._held = held
+
+    def check(self):
+        """
+        Spawns any held funcs that may now run and then calls the
+        Concurrency's check.
+        """
+        self._dispatch()
+        self.conc.check()
+
+    def spawn(self, ident, func, *args, **kwargs):
+        """
+        Spawns the func once its resources, given by the Spread's
+        keys_func for the ident, are below the limit. See
+        :py:meth:`Concurrency.spawn`.
+        """
+        self._held.append(
+            (self.spread.keys_func(ident), ident, func, args, kwargs))
+        self._dispatch()
+        while len(self._held) > self.spread.backlog:
+            self.conc.check()
+            self._sleep(0.01)
+            self._dispatch()
+
+    def finish(self):
+        """
+        Spawns all the held funcs as their resources free up and then
+        calls the Concurrency's finish.
+        """
+        while self._held:
+            self.conc.check()
+            self._dispatch()
+            if self._held:
+                self._sleep(0.01)
+        self.conc.finish()
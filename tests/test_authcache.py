@@ -0,0 +1,140 @@
+"""
+Tests for swiftly.client.authcache.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from swiftly.client import authcache
+from swiftly.client.authcache import AuthCache
+
+
+IDENTITY = {
+    'auth_url': 'http://127.0.0.1:8080/auth/v1.0', 'auth_user': 'test:tester',
+    'auth_tenant': None, 'region': None, 'snet': False}
+
+
+class TestAuthCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'auth.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_load(self):
+        cache = AuthCache(self.path)
+        self.assertIsNone(cache.load(IDENTITY, 'testing'))
+        cache.save(IDENTITY, 'testing', {
+            'storage_url': 'http://127.0.0.1:8080/v1/AUTH_test',
+            'auth_token': 'token', 'auth_expires': time.time() + 60})
+        entry = AuthCache(self.path).load(IDENTITY, 'testing')
+        self.assertEqual(entry['auth_token'], 'token')
+        self.assertEqual(entry['auth_user'], 'test:tester')
+        with open(self.path) as fp:
+            self.assertNotIn('testing', fp.read())
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_other_key_or_identity(self):
+        cache = AuthCache(self.path)
+        cache.save(IDENTITY, 'testing', {'auth_token': 'token'})
+        self.assertIsNone(cache.load(IDENTITY, 'other'))
+        identity = dict(IDENTITY, region='other')
+        self.assertIsNone(cache.load(identity, 'testing'))
+        cache.save(identity, 'testing', {'auth_token': 'other'})
+        self.assertEqual(
+            cache.load(IDENTITY, 'testing')['auth_token'], 'token')
+        self.assertEqual(
+            cache.load(identity, 'testing')['auth_token'], 'other')
+        cache.save(IDENTITY, 'testing', {'auth_token': 'new'})
+        with open(self.path) as fp:
+            self.assertEqual(len(json.load(fp)), 2)
+        self.assertEqual(
+            cache.load(IDENTITY, 'testing')['auth_token'], 'new')
+
+    def test_expired(self):
+        cache = AuthCache(self.path)
+        cache.save(IDENTITY, 'testing', {
+            'auth_token': 'token', 'auth_method': 'auth1',
+            'auth_expires': time.time() - 1})
+        self.assertIsNone(cache.load(IDENTITY, 'testing'))
+        self.assertEqual(
+            cache.load(IDENTITY, 'testing', expired=True)['auth_method'],
+            'auth1')
+        # Expired entries for other settings are dropped on save.
+        cache.save(dict(IDENTITY, region='other'), 'testing', {})
+        with open(self.path) as fp:
+            self.assertEqual(len(json.load(fp)), 1)
+
+    def test_unrecognized_file(self):
+        messages = []
+        with open(self.path, 'w') as fp:
+            fp.write('{"not": "a list"}')
+        cache = AuthCache(
+            self.path, verbose=lambda msg, *args: messages.append(msg))
+        self.assertIsNone(cache.load(IDENTITY, 'testing'))
+        self.assertEqual(len(messages), 1)
+        cache.save(IDENTITY, 'testing', {'auth_token': 'token'})
+        self.assertEqual(
+            cache.load(IDENTITY, 'testing')['auth_token'], 'token')
+
+    @unittest.skipUnless(authcache.fcntl, 'needs fcntl')
+    def test_lock_waits(self):
+        holder = AuthCache(self.path)
+        waiter = AuthCache(self.path, lock_timeout=5)
+        held = threading.Event()
+        order = []
+
+        def hold():
+            with holder.lock() as locked:
+                order.append(('holder', locked))
+                held.set()
+                time.sleep(0.2)
+                holder.save(IDENTITY, 'testing', {'auth_token': 'token'})
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(5)
+        with waiter.lock() as locked:
+            order.append(('waiter', locked))
+            entry = waiter.load(IDENTITY, 'testing')
+        thread.join()
+        self.assertEqual(order, [('holder', True), ('waiter', True)])
+        self.assertEqual(entry['auth_token'], 'token')
+
+    @unittest.skipUnless(authcache.fcntl, 'needs fcntl')
+    def test_lock_timeout(self):
+        holder = AuthCache(self.path)
+        waiter = AuthCache(self.path, lock_timeout=0.2)
+        with holder.lock() as locked:
+            self.assertTrue(locked)
+            start = time.time()
+            with waiter.lock() as locked:
+                self.assertFalse(locked)
+            self.assertTrue(time.time() - start >= 0.2)
+        with waiter.lock() as locked:
+            self.assertTrue(locked)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,302 @@
+"""
+Tests for swiftly.concurrency.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+import time
+import unittest
+
+from swiftly.concurrency import AIMDController, Cancelled, Concurrency, \
+    ConcurrencyBudget, Spread, _SpreadFunc
+
+
+class _Gauge(object):
+    # Counts the funcs running at once, remembering the most seen.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+        self.done = 0
+
+    def run(self, seconds=0.01):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(seconds)
+        with self.lock:
+            self.running -= 1
+            self.done += 1
+
+
+class TestConcurrencyBudget(unittest.TestCase):
+
+    def test_nesting_stays_within_limit(self):
+        budget = ConcurrencyBudget(3, backend='threads')
+        gauge = _Gauge()
+
+        def outer():
+            conc = Concurrency(4, budget=budget)
+            for i in xrange(4):
+                conc.spawn(i, gauge.run)
+            conc.finish()
+
+        conc = Concurrency(4, budget=budget)
+        for i in xrange(4):
+            conc.spawn(i, outer)
+        conc.finish()
+        self.assertEqual(gauge.done, 16)
+        # Each outer func holds a slot while its inner funcs run, so
+        # at most the limit of funcs of either kind run at once.
+        self.assertTrue(1 <= gauge.most <= 3)
+
+    def test_nested_spawn_runs_inline_when_full(self):
+        budget = ConcurrencyBudget(1, backend='threads')
+        threads = []
+
+        def inner():
+            threads.append(threading.current_thread())
+
+        def outer():
+            threads.append(threading.current_thread())
+            conc = Concurrency(2, budget=budget)
+            conc.spawn('inner', inner)
+            conc.finish()
+
+        conc = Concurrency(2, budget=budget)
+        conc.spawn('outer', outer)
+        conc.finish()
+        self.assertEqual(len(threads), 2)
+        self.assertIs(threads[0], threads[1])
+
+    def test_resize(self):
+        budget = ConcurrencyBudget(2, backend='threads')
+        self.assertTrue(budget.acquire(False))
+        self.assertTrue(budget.acquire(False))
+        self.assertFalse(budget.acquire(False))
+        budget.resize(1)
+        # Both slots are in use, so the lowered limit is honored as
+        # they are released.
+        budget.release()
+        self.assertFalse(budget.acquire(False))
+        budget.release()
+        self.assertTrue(budget.acquire(False))
+        self.assertFalse(budget.acquire(False))
+        budget.resize(3)
+        self.assertTrue(budget.acquire(False))
+        self.assertTrue(budget.acquire(False))
+        self.assertFalse(budget.acquire(False))
+
+    def test_resize_pays_debt_first(self):
+        budget = ConcurrencyBudget(2, backend='threads')
+        budget.acquire()
+        budget.acquire()
+        budget.resize(0)
+        budget.resize(1)
+        budget.release()
+        budget.release()
+        self.assertTrue(budget.acquire(False))
+        self.assertFalse(budget.acquire(False))
+
+
+class TestAIMDController(unittest.TestCase):
+
+    def test_backoff_halves_once_per_burst(self):
+        budget = ConcurrencyBudget(8, backend='threads')
+        aimd = AIMDController(budget, minimum=2)
+        aimd.observe(503, 0)
+        self.assertEqual(budget.limit, 4)
+        # Begun before the cut, so not acted on again.
+        aimd.observe(503, 1)
+        self.assertEqual(budget.limit, 4)
+        aimd.observe(0, 0)
+        self.assertEqual(budget.limit, 2)
+        aimd.observe(429, 0)
+        self.assertEqual(budget.limit, 2)
+
+    def test_increase_after_window(self):
+        budget = ConcurrencyBudget(2, backend='threads')
+        aimd = AIMDController(budget, maximum=3)
+        aimd.observe(200, 0.01)
+        self.assertEqual(budget.limit, 2)
+        aimd.observe(200, 0.01)
+        self.assertEqual(budget.limit, 3)
+        for _ in xrange(6):
+            aimd.observe(200, 0.01)
+        self.assertEqual(budget.limit, 3)
+
+    def test_other_5xx_ignored(self):
+        budget = ConcurrencyBudget(1, backend='threads')
+        aimd = AIMDController(budget)
+        aimd.observe(500, 0.01)
+        self.assertEqual(budget.limit, 1)
+        aimd.observe(200, 0.01)
+        self.assertEqual(budget.limit, 2)
+
+
+class TestConcurrency(unittest.TestCase):
+
+    def test_results(self):
+        for backend in ('threads', 'serial'):
+            conc = Concurrency(3, backend=backend)
+            for i in xrange(5):
+                conc.spawn(i, lambda x: x * 2, i)
+            conc.join()
+            results = conc.get_results()
+            self.assertEqual(
+                dict((k, v[3]) for k, v in results.iteritems()),
+                dict((i, i * 2) for i in xrange(5)))
+
+    def test_fail_fast_cancels(self):
+        ran = []
+
+        def fail():
+            raise ValueError('boom')
+
+        conc = Concurrency(1, backend='serial')
+        conc.spawn('fail', fail)
+        self.assertRaises(ValueError, conc.check)
+        self.assertTrue(conc.cancelled)
+        self.assertRaises(Cancelled, conc.spawn, 'late', ran.append, 1)
+        self.assertEqual(ran, [])
+
+    def test_error_raised_by_finish_without_callback(self):
+        ran = []
+
+        def fail():
+            raise ValueError('boom')
+
+        conc = Concurrency(2, backend='threads', fail_fast=False)
+        conc.spawn('fail', fail)
+        conc.spawn('ok', ran.append, 1)
+        self.assertRaises(ValueError, conc.finish)
+        self.assertEqual(ran, [1])
+
+    def test_error_given_to_callback(self):
+        errors = []
+
+        def callback(ident, exc_type, exc_value, exc_tb, result):
+            if exc_value:
+                errors.append(ident)
+
+        def fail():
+            raise ValueError('boom')
+
+        conc = Concurrency(
+            2, callback=callback, backend='threads', fail_fast=False)
+        conc.spawn('fail', fail)
+        conc.finish()
+        self.assertEqual(errors, ['fail'])
+
+    def test_cancel_reaches_children(self):
+        started = threading.Event()
+        proceed = threading.Event()
+        ran = []
+        children = []
+
+        def parent():
+            child = Concurrency(1, backend='serial')
+            children.append(child)
+            started.set()
+            proceed.wait(5)
+            child.spawn('child', ran.append, 1)
+
+        conc = Concurrency(2, backend='threads')
+        conc.spawn('parent', parent)
+        started.wait(5)
+        conc.cancel()
+        proceed.set()
+        conc.join()
+        self.assertTrue(children[0].cancelled)
+        self.assertEqual(ran, [])
+        results = conc.get_results()
+        self.assertIs(results['parent'][0], Cancelled)
+
+    def test_finish_after_cancel_raises(self):
+        proceed = threading.Event()
+        conc = Concurrency(2, backend='threads')
+        conc.spawn('block', proceed.wait, 5)
+        conc.cancel()
+        proceed.set()
+        self.assertRaises(Cancelled, conc.finish)
+        self.assertRaises(Cancelled, conc.spawn, 'late', lambda: None)
+
+
+class TestSpread(unittest.TestCase):
+
+    def test_limit_per_key(self):
+        gauges = {'a': _Gauge(), 'b': _Gauge()}
+        spread = Spread(lambda ident: [ident[0]], limit=1)
+        conc = spread.scheduler(Concurrency(4, backend='threads'))
+        for i in xrange(4):
+            for key in ('a', 'b'):
+                conc.check()
+                conc.spawn((key, i), gauges[key].run)
+        conc.finish()
+        for gauge in gauges.itervalues():
+            self.assertEqual(gauge.done, 4)
+            self.assertEqual(gauge.most, 1)
+        self.assertEqual(spread._running, {})
+
+    def test_shared_between_schedulers(self):
+        gauge = _Gauge()
+        spread = Spread(lambda ident: ['disk'], limit=2)
+        schedulers = [
+            spread.scheduler(Concurrency(3, backend='threads'))
+            for _ in xrange(2)]
+        for i in xrange(3):
+            for conc in schedulers:
+                conc.spawn(i, gauge.run)
+        for conc in schedulers:
+            conc.finish()
+        self.assertEqual(gauge.done, 6)
+        self.assertTrue(gauge.most <= 2)
+
+    def test_keys_released_when_spawn_cancelled(self):
+        spread = Spread(lambda ident: [ident], limit=1)
+        inner = Concurrency(2, backend='threads')
+        conc = spread.scheduler(inner)
+        inner.cancel()
+        self.assertRaises(Cancelled, conc.spawn, 'a', lambda: None)
+        self.assertEqual(spread._running, {})
+
+    def test_keys_released_when_skipped(self):
+        spread = Spread(lambda ident: [ident], limit=1)
+        self.assertTrue(spread._acquire(['a']))
+        func = _SpreadFunc(spread, ['a'], lambda: None)
+        inner = Concurrency(2, backend='threads')
+        inner.cancel()
+        # As a pool thread does for a func it starts after the cancel.
+        inner._spawner('a', func)
+        self.assertEqual(spread._running, {})
+        self.assertIs(inner.get_results()['a'][0], Cancelled)
+        # Releasing again, as the func itself would, changes nothing.
+        func.release()
+        self.assertEqual(spread._running, {})
+
+    def test_no_keys_never_held(self):
+        spread = Spread(lambda ident: [], limit=1)
+        conc = spread.scheduler(Concurrency(1, backend='serial'))
+        ran = []
+        for i in xrange(3):
+            conc.spawn(i, ran.append, i)
+        conc.finish()
+        self.assertEqual(ran, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for swiftly.client.endpoints.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import time
+import unittest
+
+from swiftly.client.endpoints import EndpointPool
+
+
+class TestEndpointPool(unittest.TestCase):
+
+    def pool(self, **kwargs):
+        return EndpointPool(['a:80', 'http://b:8080/v1'], **kwargs)
+
+    def test_endpoints(self):
+        pool = self.pool()
+        self.assertEqual(
+            [e.netloc for e in pool.endpoints], ['a:80', 'b:8080'])
+        self.assertRaises(ValueError, EndpointPool, ['a'], selection='x')
+
+    def test_least_outstanding(self):
+        pool = self.pool()
+        a, b = pool.endpoints
+        pool.start(a)
+        for _ in xrange(10):
+            self.assertIs(pool.choose(), b)
+        pool.start(b)
+        pool.start(b)
+        self.assertIs(pool.choose(), a)
+        pool.finish(b, 0.1, True)
+        pool.release(b)
+        self.assertIs(pool.choose(), b)
+
+    def test_ewma(self):
+        pool = self.pool(selection='ewma', decay=0.5)
+        a, b = pool.endpoints
+        pool.start(a)
+        pool.finish(a, 1.0, True)
+        # b has no response yet, so it is tried.
+        self.assertIs(pool.choose(), b)
+        pool.start(b)
+        pool.finish(b, 3.0, True)
+        self.assertIs(pool.choose(), a)
+        pool.start(b)
+        pool.finish(b, 0.0, True)
+        self.assertEqual(b.latency, 1.5)
+        pool.start(a)
+        pool.finish(a, 3.0, True)
+        self.assertEqual(a.latency, 2.0)
+        self.assertIs(pool.choose(), b)
+
+    def test_eject_after_failures(self):
+        pool = self.pool(max_failures=2, eject_time=30)
+        a, b = pool.endpoints
+        pool.start(a)
+        pool.finish(a, 0.1, False)
+        self.assertFalse(a.ejected_until)
+        pool.start(a)
+        pool.finish(a, 0.1, False)
+        self.assertTrue(a.ejected_until > time.time() + 25)
+        self.assertFalse(pool.usable(a))
+        self.assertTrue(pool.usable(b))
+        pool.start(a)
+        for _ in xrange(10):
+            self.assertIs(pool.choose(), b)
+        self.assertEqual(pool.stats(), [
+            ('a:80', 3, 2, None), ('b:8080', 0, 0, None)])
+
+    def test_success_resets_failures(self):
+        pool = self.pool(max_failures=2)
+        a = pool.endpoints[0]
+        pool.finish(a, 0.1, False)
+        pool.finish(a, 0.1, True)
+        pool.finish(a, 0.1, False)
+        self.assertFalse(a.ejected_until)
+
+    def test_release_leaves_health(self):
+        pool = self.pool(max_failures=1)
+        a = pool.endpoints[0]
+        pool.start(a)
+        pool.release(a)
+        self.assertEqual(
+            (a.outstanding, a.failures, a.errors, a.latency),
+            (0, 0, 0, None))
+        self.assertFalse(a.ejected_until)
+
+    def test_probe_success(self):
+        pool = self.pool(max_failures=1, eject_time=30)
+        a, b = pool.endpoints
+        pool.finish(a, 0.1, False)
+        a.ejected_until = time.time() - 1
+        self.assertIs(pool.choose(), a)
+        self.assertTrue(a.probing)
+        self.assertTrue(pool.usable(a))
+        # Only one request probes it.
+        self.assertIs(pool.choose(), b)
+        pool.finish(a, 0.1, True)
+        self.assertFalse(a.ejected_until)
+        self.assertFalse(a.probing)
+
+    def test_probe_failure(self):
+        pool = self.pool(max_failures=3, eject_time=30)
+        a = pool.endpoints[0]
+        for _ in xrange(3):
+            pool.finish(a, 0.1, False)
+        a.ejected_until = time.time() - 1
+        self.assertIs(pool.choose(), a)
+        pool.finish(a, 0.1, False)
+        self.assertTrue(a.ejected_until > time.time() + 25)
+        self.assertFalse(a.probing)
+
+    def test_all_ejected(self):
+        pool = self.pool(max_failures=1)
+        a, b = pool.endpoints
+        pool.finish(a, 0.1, False)
+        pool.finish(b, 0.1, False)
+        b.ejected_until = a.ejected_until - 1
+        self.assertIs(pool.choose(), b)
+        self.assertFalse(b.probing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for swiftly.client.retry.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import email.utils
+import time
+import unittest
+
+from swiftly.client.retry import parse_retry_after, parse_retry_rules, \
+    RetryBudget, RetryPolicy
+
+
+class TestParseRetryRules(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(
+            parse_retry_rules(' 0:1, 5XX:2 ,503:0.5,'),
+            {0: 1.0, '5xx': 2.0, 503: 0.5})
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_retry_rules, '503')
+        self.assertRaises(ValueError, parse_retry_rules, 'abc:1')
+        self.assertRaises(ValueError, parse_retry_rules, 'zxx:1')
+        self.assertRaises(ValueError, parse_retry_rules, '503:x')
+
+
+class TestParseRetryAfter(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after('12'), 12.0)
+        self.assertEqual(parse_retry_after('-5'), 0.0)
+
+    def test_date(self):
+        value = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertTrue(25 <= parse_retry_after(value) <= 30)
+
+    def test_unparsable(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after(''))
+        self.assertIsNone(parse_retry_after('soon'))
+
+
+class TestRetryBudget(unittest.TestCase):
+
+    def test_minimum(self):
+        budget = RetryBudget(ratio=0.5, minimum=2)
+        self.assertTrue(budget.spend())
+        self.assertTrue(budget.spend())
+        self.assertFalse(budget.spend())
+        self.assertEqual(
+            (budget.requests, budget.retries, budget.refused), (0, 2, 1))
+
+    def test_earned_by_requests(self):
+        budget = RetryBudget(ratio=0.5, minimum=0)
+        self.assertFalse(budget.spend())
+        budget.record_request()
+        self.assertTrue(budget.spend())
+        self.assertFalse(budget.spend())
+        for _ in xrange(4):
+            budget.record_request()
+        self.assertTrue(budget.spend())
+        self.assertTrue(budget.spend())
+        self.assertFalse(budget.spend())
+        self.assertEqual(
+            (budget.requests, budget.retries, budget.refused), (5, 3, 3))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_factor(self):
+        policy = RetryPolicy(rules='0:1,5xx:2,503:3,404:0')
+        self.assertEqual(policy.factor(0), 1)
+        self.assertEqual(policy.factor(500), 2)
+        self.assertEqual(policy.factor(503), 3)
+        self.assertEqual(policy.factor(404), 0)
+        self.assertEqual(policy.factor(401), 0)
+
+    def test_default_rules(self):
+        policy = RetryPolicy()
+        self.assertEqual(policy.factor(0), 1)
+        self.assertEqual(policy.factor(502), 1)
+        self.assertEqual(policy.factor(429), 4)
+        self.assertEqual(policy.factor(498), 4)
+        self.assertEqual(policy.factor(404), 0)
+
+    def test_no_retry(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.delay(404))
+        self.assertIsNone(policy.delay(200))
+
+    def test_decorrelated_jitter(self):
+        policy = RetryPolicy(backoff=1, max_backoff=60, rules='5xx:2')
+        for _ in xrange(100):
+            self.assertTrue(2 <= policy.delay(503) <= 6)
+            self.assertTrue(2 <= policy.delay(503, previous=10) <= 30)
+            self.assertTrue(2 <= policy.delay(503, previous=50) <= 60)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(backoff=1, max_backoff=60)
+        delay = policy.delay(503, headers={'retry-after': '30'})
+        self.assertTrue(30 <= delay <= 60)
+        delay = policy.delay(503, headers={'retry-after': '3600'})
+        self.assertEqual(delay, 60)
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0, minimum=1)
+        policy = RetryPolicy(backoff=0, budget=budget)
+        policy.record_request()
+        self.assertEqual(budget.requests, 1)
+        self.assertEqual(policy.delay(503), 0)
+        self.assertIsNone(policy.delay(503))
+        self.assertEqual(budget.refused, 1)
+        # A status not retried does not spend the budget.
+        self.assertIsNone(policy.delay(404))
+        self.assertEqual(budget.refused, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests for swiftly.client.spool.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import StringIO
+import unittest
+
+from swiftly.client.spool import Spool
+
+
+class _Unseekable(object):
+    # A body that can only be read once, as a pipe.
+
+    def __init__(self, data):
+        self._fp = StringIO.StringIO(data)
+
+    def read(self, size=-1):
+        return self._fp.read(size)
+
+
+class TestSpool(unittest.TestCase):
+
+    def test_replay(self):
+        spool = Spool(_Unseekable('abcdefghij'))
+        self.assertEqual(spool.read(4), 'abcd')
+        spool.reset()
+        self.assertEqual(spool.read(2), 'ab')
+        self.assertEqual(spool.read(5), 'cd')
+        self.assertEqual(spool.read(5), 'efghi')
+        self.assertEqual(spool.read(), 'j')
+        self.assertEqual(spool.read(), '')
+        spool.reset()
+        self.assertEqual(spool.read(), 'abcdefghij')
+        self.assertEqual(spool.read(), '')
+        spool.close()
+
+    def test_reset_midway(self):
+        spool = Spool(_Unseekable('abcdefghij'))
+        self.assertEqual(spool.read(6), 'abcdef')
+        spool.reset()
+        self.assertEqual(spool.read(3), 'abc')
+        spool.reset()
+        self.assertEqual(spool.read(100), 'abcdef')
+        self.assertEqual(spool.read(100), 'ghij')
+
+    def test_spills_to_file(self):
+        data = ''.join(chr(i % 256) for i in xrange(100000))
+        spool = Spool(_Unseekable(data), memory_size=1024)
+        read = []
+        chunk = spool.read(4096)
+        while chunk:
+            read.append(chunk)
+            chunk = spool.read(4096)
+        self.assertEqual(''.join(read), data)
+        self.assertTrue(spool._spool._rolled)
+        for _ in xrange(2):
+            spool.reset()
+            self.assertEqual(spool.read(), data)
+        spool.close()
+        self.assertTrue(spool._spool.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
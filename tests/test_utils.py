@@ -0,0 +1,94 @@
+"""
+Tests for swiftly.client.utils.
+"""
+"""
+Copyright 2011-2013 Gregory Holt
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import unittest
+import zlib
+
+from swiftly.client.utils import iter_gunzip, iter_json_list
+
+
+def _gzip(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _split(data, size):
+    return [data[i:i + size] for i in xrange(0, len(data), size)]
+
+
+LISTING = [
+    {'name': 'a', 'bytes': 1, 'hash': 'x'},
+    {'name': 'b [1], 2', 'bytes': 12345, 'hash': 'y'},
+    {'subdir': 'c/'},
+    {'name': u'd\xe9', 'bytes': 0, 'content_type': 'text/plain'}]
+
+
+class TestIterGunzip(unittest.TestCase):
+
+    def test_chunks(self):
+        data = 'swiftly ' * 10000
+        for size in (1, 7, 1024, 1 << 20):
+            self.assertEqual(
+                ''.join(iter_gunzip(_split(_gzip(data), size))), data)
+
+    def test_empty(self):
+        self.assertEqual(''.join(iter_gunzip([_gzip('')])), '')
+        self.assertEqual(list(iter_gunzip([])), [])
+
+
+class TestIterJsonList(unittest.TestCase):
+
+    def test_chunks(self):
+        for body in (json.dumps(LISTING), json.dumps(LISTING, indent=2)):
+            for size in (1, 2, 3, 10, 1 << 20):
+                self.assertEqual(
+                    list(iter_json_list(_split(body, size))), LISTING)
+
+    def test_numbers_wait_for_separator(self):
+        self.assertEqual(
+            list(iter_json_list(['[1', '23, 4', '5]'])), [123, 45])
+        self.assertRaises(
+            ValueError, list, iter_json_list(['[1', '2', '3']))
+
+    def test_gzipped(self):
+        body = _gzip(json.dumps(LISTING * 100))
+        for size in (1, 13, 4096):
+            self.assertEqual(
+                list(iter_json_list(iter_gunzip(_split(body, size)))),
+                LISTING * 100)
+
+    def test_streams(self):
+        # Items are given as soon as they arrive, before the list ends.
+        items = iter_json_list(iter(['[{"name": "a"}, ', '{"name"']))
+        self.assertEqual(next(items), {'name': 'a'})
+        self.assertRaises(ValueError, next, items)
+
+    def test_empty(self):
+        self.assertEqual(list(iter_json_list([])), [])
+        self.assertEqual(list(iter_json_list(['', ' \n'])), [])
+        self.assertEqual(list(iter_json_list(['[', ' ]'])), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, list, iter_json_list(['{}']))
+        self.assertRaises(ValueError, list, iter_json_list(['[1, 2']))
+        self.assertRaises(ValueError, list, iter_json_list(['[{"a": ]']))
+
+
+if __name__ == '__main__':
+    unittest.main()